@@ -0,0 +1,2 @@
+# benchmarks
+# Retrieval benchmarks; run from backend/ with `python -m benchmarks.<name>`.
@@ -0,0 +1,161 @@
+# benchmarks/filtered_search.py
+"""
+Filtered-search latency before and after creating payload indexes.
+
+Builds a synthetic collection (100k points by default) in the Qdrant
+instance at QDRANT_URL, times the kinds of filtered searches VectorDBManager
+issues, creates the indexes declared in PAYLOAD_INDEXES and times the same
+searches again.
+
+    cd backend && python -m benchmarks.filtered_search --points 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Dict, List
+import numpy as np
+from dotenv import load_dotenv
+from qdrant_client.http.models import Distance, VectorParams, PointStruct
+from qdrant_store import QdrantStore
+from utils import log_info
+
+load_dotenv()
+
+TOPICS = [f"topic_{i}" for i in range(50)]
+
+
+def synthetic_payload(i: int, rng: random.Random) -> Dict:
+    """Mix of content chunks/pages/topics, diagrams and videos"""
+    topic = rng.choice(TOPICS)
+    roll = rng.random()
+    if roll < 0.02:
+        return {"content_type": "video", "topic": topic, "language": rng.choice(["english", "urdu"])}
+    if roll < 0.07:
+        return {"content_type": "diagram", "topic": topic}
+    level = 3 if roll < 0.9 else 2 if roll < 0.99 else 1
+    return {"topic": topic, "level": level, "page_num": i % 40 + 1}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    return float(np.percentile(samples, pct)) if samples else 0.0
+
+
+async def build_collection(db: QdrantStore, points: int, dim: int, seed: int):
+    if await db.client.collection_exists(db.collection_name):
+        await db.client.delete_collection(db.collection_name)
+    await db.client.create_collection(
+        collection_name=db.collection_name,
+        vectors_config=VectorParams(size=dim, distance=Distance.COSINE)
+    )
+
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    for start in range(0, points, 1000):
+        count = min(1000, points - start)
+        vectors = np_rng.standard_normal((count, dim), dtype=np.float32)
+        await db.client.upsert(
+            collection_name=db.collection_name,
+            points=[
+                PointStruct(id=start + i, vector=vectors[i].tolist(), payload=synthetic_payload(start + i, rng))
+                for i in range(count)
+            ]
+        )
+    await db.wait_until_indexed()
+    log_info(f"Built {db.collection_name} with {points} points")
+
+
+async def time_searches(db: QdrantStore, queries: List[Dict], limit: int) -> Dict[str, Dict]:
+    """Run each query once and collect latency per filter shape"""
+    timings: Dict[str, List[float]] = {}
+    for query in queries:
+        started = time.perf_counter()
+        await db.client.search(
+            collection_name=db.collection_name,
+            query_vector=query["vector"],
+            limit=limit,
+            query_filter=db._build_filter(query["filter"])
+        )
+        timings.setdefault(query["name"], []).append((time.perf_counter() - started) * 1000)
+
+    return {
+        name: {
+            "p50_ms": round(percentile(samples, 50), 3),
+            "p95_ms": round(percentile(samples, 95), 3),
+            "mean_ms": round(float(np.mean(samples)), 3)
+        }
+        for name, samples in timings.items()
+    }
+
+
+def make_queries(count: int, dim: int, seed: int) -> List[Dict]:
+    rng = random.Random(seed + 1)
+    np_rng = np.random.default_rng(seed + 1)
+    shapes = [
+        ("content_chunks", lambda: {"topic": rng.choice(TOPICS), "level": 3}),
+        ("diagrams", lambda: {"content_type": "diagram", "topic": rng.choice(TOPICS)}),
+        ("videos", lambda: {"content_type": "video", "topic": rng.choice(TOPICS), "language": "english"})
+    ]
+    queries = []
+    for i in range(count):
+        name, make_filter = shapes[i % len(shapes)]
+        queries.append({
+            "name": name,
+            "vector": np_rng.standard_normal(dim, dtype=np.float32).tolist(),
+            "filter": make_filter()
+        })
+    return queries
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark filtered search with and without payload indexes")
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=256, help="Synthetic vector size")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--collection", default="bench_filtered_search")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic collection afterwards")
+    args = parser.parse_args()
+
+    db = QdrantStore(
+        url=os.getenv("QDRANT_URL"),
+        api_key=os.getenv("QDRANT_API_KEY"),
+        collection_name=args.collection
+    )
+    await build_collection(db, args.points, args.dim, args.seed)
+    queries = make_queries(args.queries, args.dim, args.seed)
+
+    # Warm up so the first timed query doesn't pay for cold caches
+    await time_searches(db, queries[:10], args.limit)
+    before = await time_searches(db, queries, args.limit)
+
+    await db.ensure_payload_indexes()
+    await db.wait_until_indexed()
+    await time_searches(db, queries[:10], args.limit)
+    after = await time_searches(db, queries, args.limit)
+
+    results = {
+        "points": args.points,
+        "dim": args.dim,
+        "queries": args.queries,
+        "without_indexes": before,
+        "with_indexes": after
+    }
+    print(f"{'filter':<16}{'p50 before':>12}{'p50 after':>12}{'p95 before':>12}{'p95 after':>12}")
+    for name in before:
+        print(f"{name:<16}{before[name]['p50_ms']:>12.2f}{after[name]['p50_ms']:>12.2f}"
+              f"{before[name]['p95_ms']:>12.2f}{after[name]['p95_ms']:>12.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if not args.keep:
+        await db.client.delete_collection(args.collection)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+# benchmarks/hierarchical_search.py
+"""
+Recall and latency of flat versus hierarchical (pages first, then their
+chunks) content search on the live collection.
+
+Queries are short passages taken from sampled chunks, so each has one known
+source chunk. Besides hitting that chunk, hierarchical results are compared
+with flat results to show how much of the flat top k the page pre-selection
+keeps, and the number of chunks each mode has to consider is reported.
+
+    cd backend && python -m benchmarks.hierarchical_search --queries 200 --k 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Dict, List
+import numpy as np
+from dotenv import load_dotenv
+from vectordb_manager import VectorDBManager
+from utils import log_info
+from constants import HIERARCHICAL_PAGES
+
+load_dotenv()
+
+
+async def make_queries(db: VectorDBManager, count: int, seed: int) -> List[Dict]:
+    """Passage queries from randomly sampled chunks"""
+    rng = random.Random(seed)
+    chunks = []
+    async for points in db.store.scroll({"level": 3}):
+        chunks.extend(points)
+    queries = []
+    for point in rng.sample(chunks, min(count, len(chunks))):
+        words = point.payload["content"].split()
+        start = rng.randrange(max(1, len(words) - 12))
+        queries.append({"query": " ".join(words[start:start + 12]), "relevant_id": point.id})
+    return queries
+
+
+async def run_queries(db: VectorDBManager, queries: List[Dict], k: int, hierarchical: bool) -> List[Dict]:
+    runs = []
+    for query in queries:
+        started = time.perf_counter()
+        results = await db.search_content(query["query"], chunk_limit=k, hybrid=False, hierarchical=hierarchical)
+        runs.append({
+            "ids": [result["id"] for result in results],
+            "ms": (time.perf_counter() - started) * 1000
+        })
+    return runs
+
+
+def summarize(queries: List[Dict], runs: List[Dict], k: int) -> Dict:
+    latency = [run["ms"] for run in runs]
+    return {
+        f"hit@{k}": round(float(np.mean([query["relevant_id"] in run["ids"] for query, run in zip(queries, runs)])), 4),
+        "p50_ms": round(float(np.percentile(latency, 50)), 3),
+        "p95_ms": round(float(np.percentile(latency, 95)), 3)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare flat and hierarchical content search")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3, help="chunk_limit used by the chat endpoint")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    db = VectorDBManager(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"), hybrid=False)
+    await db.create_collection()
+    queries = await make_queries(db, args.queries, args.seed)
+    pages = await db.store.count({"level": 2})
+    chunks = await db.store.count({"level": 3})
+    log_info(f"Benchmarking {len(queries)} queries over {pages} pages / {chunks} chunks")
+
+    # Embed every query up front so both runs time retrieval, not the embeddings API
+    await db.generate_embeddings([query["query"] for query in queries])
+    flat = await run_queries(db, queries, args.k, hierarchical=False)
+    hierarchical = await run_queries(db, queries, args.k, hierarchical=True)
+
+    overlap = [
+        len(set(coarse["ids"]) & set(full["ids"])) / len(full["ids"])
+        for coarse, full in zip(hierarchical, flat)
+        if full["ids"]
+    ]
+    results = {
+        "k": args.k,
+        "pages": pages,
+        "chunks": chunks,
+        "flat": {**summarize(queries, flat, args.k), "chunks_considered": chunks},
+        "hierarchical": {
+            **summarize(queries, hierarchical, args.k),
+            # The selected pages' chunks, assuming an average number of chunks per page
+            "chunks_considered": round(HIERARCHICAL_PAGES * chunks / max(pages, 1)),
+            f"recall@{args.k}_vs_flat": round(float(np.mean(overlap)), 4) if overlap else None
+        }
+    }
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    asyncio.run(main())
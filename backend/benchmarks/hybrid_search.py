@@ -0,0 +1,111 @@
+# benchmarks/hybrid_search.py
+"""
+Recall and latency of dense-only versus hybrid (dense + BM25, fused by
+reciprocal rank) content search on the live collection.
+
+Without a query file, known-item queries are generated from sampled chunks:
+"terms" queries use a chunk's rarest terms (drug/gene names, figure numbers)
+and "passage" queries a short span of its text. The source chunk is the one
+relevant result. A JSONL file of {"query", "relevant_ids"} can be supplied
+instead.
+
+    cd backend && python -m benchmarks.hybrid_search --queries 200 --k 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Dict, List
+import numpy as np
+from dotenv import load_dotenv
+from vectordb_manager import VectorDBManager
+from utils import log_info
+
+load_dotenv()
+
+
+async def make_queries(db: VectorDBManager, count: int, seed: int) -> List[Dict]:
+    """Known-item queries drawn from indexed chunks"""
+    rng = random.Random(seed)
+    index = db.sparse_index
+    doc_ids = rng.sample(sorted(index.docs), min(count, len(index.docs)))
+    payloads = await db.store.retrieve(doc_ids, ["content"])
+    queries = []
+    for i, doc_id in enumerate(doc_ids):
+        if i % 2 == 0:
+            rare = sorted(index.docs[doc_id]["terms"], key=index.idf, reverse=True)[:3]
+            queries.append({"style": "terms", "query": " ".join(rare), "relevant_ids": [doc_id]})
+        elif doc_id in payloads:
+            words = payloads[doc_id]["content"].split()
+            start = rng.randrange(max(1, len(words) - 12))
+            queries.append({"style": "passage", "query": " ".join(words[start:start + 12]), "relevant_ids": [doc_id]})
+    return queries
+
+
+async def run_queries(db: VectorDBManager, queries: List[Dict], k: int, hybrid: bool) -> Dict[str, Dict]:
+    """Recall@k, MRR and latency per query style"""
+    stats: Dict[str, Dict[str, List[float]]] = {}
+    for query in queries:
+        started = time.perf_counter()
+        results = await db.search_content(query["query"], chunk_limit=k, hybrid=hybrid)
+        elapsed = (time.perf_counter() - started) * 1000
+        ids = [result["id"] for result in results]
+        relevant = set(query["relevant_ids"])
+        ranks = [rank for rank, point_id in enumerate(ids, 1) if point_id in relevant]
+        style = stats.setdefault(query.get("style", "labelled"), {"recall": [], "mrr": [], "latency": []})
+        style["recall"].append(len(relevant & set(ids)) / len(relevant))
+        style["mrr"].append(1 / ranks[0] if ranks else 0.0)
+        style["latency"].append(elapsed)
+
+    return {
+        name: {
+            "queries": len(values["recall"]),
+            f"recall@{k}": round(float(np.mean(values["recall"])), 4),
+            "mrr": round(float(np.mean(values["mrr"])), 4),
+            "p50_ms": round(float(np.percentile(values["latency"], 50)), 3),
+            "p95_ms": round(float(np.percentile(values["latency"], 95)), 3)
+        }
+        for name, values in stats.items()
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare dense-only and hybrid content search")
+    parser.add_argument("--queries", type=int, default=200, help="Generated known-item queries")
+    parser.add_argument("--queries-file", help='JSONL of {"query", "relevant_ids"}')
+    parser.add_argument("--k", type=int, default=3, help="chunk_limit used by the chat endpoint")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    db = VectorDBManager(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"), hybrid=True)
+    await db.create_collection()
+    if args.queries_file:
+        with open(args.queries_file, "r", encoding="utf-8") as f:
+            queries = [json.loads(line) for line in f if line.strip()]
+    else:
+        queries = await make_queries(db, args.queries, args.seed)
+    log_info(f"Benchmarking {len(queries)} queries over {len(db.sparse_index)} indexed chunks")
+
+    # Embed every query up front so both runs time retrieval, not the embeddings API
+    await db.generate_embeddings([query["query"] for query in queries])
+    dense = await run_queries(db, queries, args.k, hybrid=False)
+    hybrid = await run_queries(db, queries, args.k, hybrid=True)
+
+    results = {"k": args.k, "dense": dense, "hybrid": hybrid}
+    recall = f"recall@{args.k}"
+    print(f"{'queries':<10}{'dense ' + recall:>16}{'hybrid ' + recall:>17}{'dense mrr':>11}{'hybrid mrr':>12}"
+          f"{'dense p50':>11}{'hybrid p50':>12}")
+    for name in dense:
+        print(f"{name:<10}{dense[name][recall]:>16.3f}{hybrid[name][recall]:>17.3f}"
+              f"{dense[name]['mrr']:>11.3f}{hybrid[name]['mrr']:>12.3f}"
+              f"{dense[name]['p50_ms']:>11.2f}{hybrid[name]['p50_ms']:>12.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    asyncio.run(main())
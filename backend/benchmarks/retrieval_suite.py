@@ -0,0 +1,258 @@
+# benchmarks/retrieval_suite.py
+"""
+Offline retrieval benchmark over Data/.
+
+Builds a throwaway embedded index from the topic PDFs (chunked exactly as
+ingest_content does) and the figure/table .txt descriptions, then runs the
+labelled queries in fixtures/retrieval_queries.jsonl through VectorDBManager
+and reports recall@k, MRR and p50/p95/p99 latency per query type.
+
+Texts are embedded from recorded OpenAI embeddings: fixtures/embeddings.sqlite3
+(an EmbeddingCache file) when it exists, or the file given with --embeddings.
+--record fills it with the texts it is missing (this calls OpenAI), e.g.
+after the data, queries or chunking change:
+
+    cd backend && python -m benchmarks.retrieval_suite --record --output results.json --compare baseline.json
+
+Without recorded embeddings (or with --hashed) texts get a deterministic
+hashing embedder instead, so a run needs no network or API key. Its dense
+scores then measure term overlap rather than semantic similarity: such
+runs are labelled "not a production proxy" and are only good for catching
+regressions in the code around the retriever.
+
+Content queries count a hit when a retrieved chunk of the right topic
+contains any of their expected phrases, so the labels survive changes to
+CHUNK_SIZE/PAGE_SIZE; diagram queries name the expected image.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+# Only --record talks to OpenAI; the client just needs a key to be constructed
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+
+import numpy as np
+from vectordb_manager import VectorDBManager
+from embedded_store import EmbeddedStore
+from embedding_cache import EmbeddingCache
+from sparse_index import SparseIndex, tokenize
+from utils import log_info, batched
+from constants import CHUNK_SIZE, PAGE_SIZE, VECTOR_SIZE, UPSERT_BATCH_SIZE
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR / "ingestion scripts"))
+from ingest_content import iter_pdf_pages  # noqa: E402
+
+DATA_DIR = BACKEND_DIR.parent / "Data"
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+RECORDED_EMBEDDINGS = FIXTURES_DIR / "embeddings.sqlite3"
+HASHED_WARNING = "hashed embeddings (lexical overlap, not a production proxy)"
+DIAGRAM_PREFIXES = ["Box", "Fig", "Table", "Summary box"]
+K_VALUES = (1, 3, 5, 10)
+
+
+def load_records(db: VectorDBManager) -> List[Dict]:
+    """Content and diagram records for every topic folder in Data/"""
+    records = []
+    for topic_dir in sorted(path for path in DATA_DIR.iterdir() if path.is_dir()):
+        topic = topic_dir.name.lower()
+        pdf_path = topic_dir / f"{topic_dir.name}.pdf"
+        if pdf_path.exists():
+            records.extend(db._iter_content_records(iter_pdf_pages(str(pdf_path)), topic))
+        for png_file in sorted(topic_dir.glob("*.png")):
+            desc_file = png_file.with_suffix(".txt")
+            prefix = next((prefix for prefix in DIAGRAM_PREFIXES if png_file.name.startswith(prefix)), None)
+            if prefix is None or not desc_file.exists():
+                continue
+            records.append(db._build_diagram_record(
+                image_path=f"/diagrams/{topic}/{png_file.name}",
+                description=desc_file.read_text(encoding="utf-8").strip(),
+                topic=topic,
+                diagram_type=prefix.lower().replace(" ", "_")
+            ))
+    return records
+
+
+def hashed_embedding(text: str, dimensions: int) -> List[float]:
+    """Deterministic stand-in for an OpenAI embedding: signed feature hashing
+    of the text's terms and term bigrams, L2-normalized"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    terms = tokenize(text)
+    for feature in terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        vector[int.from_bytes(digest[:4], "little") % dimensions] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+def prefill_hashed_embeddings(db: VectorDBManager, texts: List[str]):
+    """Put a hashed embedding for every text in the in-memory cache, so
+    generate_embeddings never reaches the API"""
+    db.embedding_cache.set_many(
+        (EmbeddingCache.make_key(db.EMBEDDING_MODEL, db.dimensions, text), hashed_embedding(text, db.dimensions))
+        for text in set(texts)
+    )
+
+
+def missing_embeddings(db: VectorDBManager, texts: List[str]) -> List[str]:
+    keys = {EmbeddingCache.make_key(db.EMBEDDING_MODEL, db.dimensions, text): text for text in texts}
+    found = db.embedding_cache.get_many(keys)
+    return [text for key, text in keys.items() if key not in found]
+
+
+def is_relevant(query: Dict, result: Dict) -> bool:
+    if query["type"] == "diagram":
+        return (result.get("image_path") or "").endswith(f"/{query['expect_image']}")
+    content = result["content"].lower()
+    return result["topic"] == query["topic"] and any(phrase in content for phrase in query["expect_any"])
+
+
+async def run_query(db: VectorDBManager, query: Dict, args: argparse.Namespace) -> Dict:
+    limit = max(K_VALUES)
+    started = time.perf_counter()
+    if query["type"] == "diagram":
+        results = await db.search_diagrams(query["query"], limit=limit)
+    else:
+        results = await db.search_content(
+            query["query"],
+            chunk_limit=limit,
+            hybrid=not args.no_hybrid,
+            hierarchical=args.hierarchical,
+            adaptive=args.adaptive
+        )
+    elapsed = (time.perf_counter() - started) * 1000
+    ranks = [rank for rank, result in enumerate(results, 1) if is_relevant(query, result)]
+    return {"type": query["type"], "query": query["query"], "rank": ranks[0] if ranks else None, "ms": round(elapsed, 3)}
+
+
+def summarize(rows: List[Dict]) -> Dict:
+    latency = [row["ms"] for row in rows]
+    return {
+        "queries": len(rows),
+        **{f"recall@{k}": round(sum(1 for row in rows if row["rank"] and row["rank"] <= k) / len(rows), 4) for k in K_VALUES},
+        "mrr": round(sum(1 / row["rank"] for row in rows if row["rank"]) / len(rows), 4),
+        "p50_ms": round(float(np.percentile(latency, 50)), 3),
+        "p95_ms": round(float(np.percentile(latency, 95)), 3),
+        "p99_ms": round(float(np.percentile(latency, 99)), 3)
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_comparison(results: Dict, baseline: Dict):
+    print(f"\nAgainst {baseline.get('commit', 'baseline')}:")
+    embeddings = (results["config"]["embeddings"], baseline.get("config", {}).get("embeddings"))
+    if embeddings[0] != embeddings[1]:
+        print(f"  WARNING: comparing {embeddings[0]} against {embeddings[1]}")
+    for query_type, metrics in results["metrics"].items():
+        old = baseline.get("metrics", {}).get(query_type)
+        if not old:
+            continue
+        deltas = ", ".join(
+            f"{name} {metrics[name] - old[name]:+.4f}"
+            for name in metrics
+            if name != "queries" and name in old
+        )
+        print(f"  {query_type}: {deltas}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark over Data/")
+    parser.add_argument("--queries-file", default=str(FIXTURES_DIR / "retrieval_queries.jsonl"))
+    parser.add_argument("--embeddings", default=str(RECORDED_EMBEDDINGS) if RECORDED_EMBEDDINGS.exists() else None,
+                        help="Recorded OpenAI embeddings (an EmbeddingCache file); defaults to "
+                             "fixtures/embeddings.sqlite3 when present")
+    parser.add_argument("--record", action="store_true", help="Embed and record texts missing from --embeddings")
+    parser.add_argument("--hashed", action="store_true",
+                        help="Use deterministic hashed embeddings (not a production proxy)")
+    parser.add_argument("--no-hybrid", action="store_true", help="Dense-only content search")
+    parser.add_argument("--hierarchical", action="store_true")
+    parser.add_argument("--adaptive", action="store_true")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Earlier results JSON to print deltas against")
+    args = parser.parse_args()
+    if args.record:
+        args.embeddings = args.embeddings or str(RECORDED_EMBEDDINGS)
+    if args.hashed:
+        if args.record:
+            parser.error("--record and --hashed don't go together")
+        args.embeddings = None
+    if not args.embeddings:
+        log_info(f"No recorded embeddings, using {HASHED_WARNING}")
+
+    with open(args.queries_file, "r", encoding="utf-8") as f:
+        queries = [json.loads(line) for line in f if line.strip()]
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        db = VectorDBManager(
+            store=EmbeddedStore(collection_name="retrieval_fixture", dimensions=VECTOR_SIZE, path=index_dir),
+            sparse_index=SparseIndex("retrieval_fixture", index_dir=index_dir),
+            embedding_cache=EmbeddingCache(path=args.embeddings, memory_size=10 ** 7, max_disk_entries=10 ** 7)
+        )
+        records = load_records(db)
+        texts = [record["text"] for record in records] + [query["query"] for query in queries]
+        if not args.embeddings:
+            prefill_hashed_embeddings(db, texts)
+        missing = missing_embeddings(db, texts)
+        if missing and not args.record:
+            raise SystemExit(f"{len(missing)} texts have no recorded embedding; re-run with --record")
+        if missing:
+            log_info(f"Recording {len(missing)} embeddings to {args.embeddings}")
+            await db.generate_embeddings(missing)
+
+        for batch in batched(records, UPSERT_BATCH_SIZE):
+            await db._embed_and_upsert(batch)
+        log_info(f"Indexed {len(records)} records from {DATA_DIR}")
+
+        rows = [await run_query(db, query, args) for query in queries]
+
+    results = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "chunk_size": CHUNK_SIZE,
+            "page_size": PAGE_SIZE,
+            "dimensions": VECTOR_SIZE,
+            "embeddings": "recorded" if args.embeddings else HASHED_WARNING,
+            "hybrid": not args.no_hybrid,
+            "hierarchical": args.hierarchical,
+            "adaptive": args.adaptive
+        },
+        "records": len(records),
+        "metrics": {
+            query_type: summarize([row for row in rows if row["type"] == query_type])
+            for query_type in sorted({row["type"] for row in rows})
+        },
+        "queries": rows
+    }
+    if not args.embeddings:
+        print(f"NOTE: {HASHED_WARNING}; record real embeddings with --record before reading these as retrieval quality")
+    print(json.dumps(results["metrics"], indent=2))
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(results, json.load(f))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    asyncio.run(main())
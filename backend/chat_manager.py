@@ -2,22 +2,44 @@
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
 import httpx
-from typing import List, Dict, Optional
+from typing import AsyncIterator, Iterable, List, Dict, Optional
 from vectordb_manager import VectorDBManager
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 from datetime import datetime
 import os
-from utils import log_info, log_error
+from utils import log_info, log_error, count_tokens, truncate_tokens
+from context_packer import pack_context
+from client_pool import OpenRouterClientPool
+from intent_classifier import IntentClassifier
+from topic_matcher import TopicMatcher
+from llm_cache import LLMResponseCache
 import uuid
+import asyncio
+from contextlib import AsyncExitStack
 import json
-from constants import VALID_TOPICS, DEFAULT_SYSTEM_PROMPT
+from constants import (
+    VALID_TOPICS, DEFAULT_SYSTEM_PROMPT, CONTEXT_TOKEN_BUDGET, MCQ_CONTEXT_TOKEN_BUDGET, OPENROUTER_BASE_URL,
+    LOCAL_INTENT_CLASSIFIER, PROMPT_CACHE_CONTROL_MODELS,
+    HISTORY_TOKEN_BUDGET, HISTORY_MESSAGE_OVERHEAD, HISTORY_SUMMARY_WORDS, HISTORY_SUMMARY_INPUT_TOKENS,
+    HISTORY_STALE_OVERSHOOT_TOKENS,
+    LLM_CACHE_TTLS, LOOKUP_CHUNK_LIMIT, LOOKUP_DIAGRAM_LIMIT, LOOKUP_VIDEO_LIMIT, SEARCH_TYPES
+)
 MCQ_STORE_PATH = "mcq_store.json"
 load_dotenv()
 
 # Create OpenAI client for fallback
 openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+
+def _is_json(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
 class ChatManager:
     def __init__(self, vectordb: VectorDBManager):
         self.vectordb = vectordb
@@ -25,9 +47,18 @@ class ChatManager:
         self.CHAT_MODEL = "gpt-4o-mini"  # OpenAI fallback model
         self.VALID_TOPICS = VALID_TOPICS
         self.generated_mcqs = {}
+        self.intent_classifier = IntentClassifier(vectordb) if LOCAL_INTENT_CLASSIFIER else None
+        self.topic_matcher = TopicMatcher()
+        self.session_topics = {}  # session_id -> {"seen": messages considered, "result": topic result}
+        self.topic_stats = {"cache_hits": 0, "local_matches": 0, "carried_forward": 0, "llm_calls": 0}
+        self.prompt_cache_stats = {"completions": 0, "cache_hits": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        self.history_summaries = {}  # session_id -> {"summary": text, "covered": messages summarized}
+        self.llm_cache = LLMResponseCache()
+        self._summary_tasks = {}
         self.db = AsyncIOMotorClient(os.getenv("MONGODB_URI"))["test"]
         # OpenRouter configuration
-        self.OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+        self.OPENROUTER_BASE_URL = OPENROUTER_BASE_URL
+        self.openrouter_clients = OpenRouterClientPool(base_url=OPENROUTER_BASE_URL)
         self.DEFAULT_OPENROUTER_MODEL = "anthropic/claude-3-haiku"
         
     
@@ -189,7 +220,28 @@ class ChatManager:
         2) If user_query references a topic not in VALID_TOPICS => return "none" but mark `explicit_invalid=True`.
         3) If user_query does not mention any topic => return "none" + `explicit_invalid=False`.
         """
+        # Explicit mentions of a known topic, and bare requests that name no
+        # topic at all, are settled without the LLM
+        local_topic = self.topic_matcher.match(user_query)
+        if local_topic:
+            self.topic_stats["local_matches"] += 1
+            return {
+                "success": True,
+                "topic": local_topic,
+                "confidence": 1.0,
+                "explicit_invalid": False
+            }
+        if self.topic_matcher.names_no_subject(user_query):
+            self.topic_stats["local_matches"] += 1
+            return {
+                "success": True,
+                "topic": None,
+                "confidence": 0.0,
+                "explicit_invalid": False
+            }
+
         try:
+            self.topic_stats["llm_calls"] += 1
             # Prepare system prompt
             # We will instruct GPT to tell us:
             #   - "topic" is one of {your list} or "none"
@@ -230,13 +282,9 @@ class ChatManager:
                 {"role": "user", "content": user_query}
             ]
 
-            response = await openai_client.chat.completions.create(
-                model=self.CHAT_MODEL,
-                messages=messages,
-                temperature=0.1
+            raw_content = await self._helper_completion(
+                "extract_topic_from_query", messages, temperature=0.1, validate=_is_json
             )
-
-            raw_content = response.choices[0].message.content
             print(f"[extract_topic_from_query] raw LLM response: {raw_content}")
 
             # Parse JSON
@@ -283,18 +331,54 @@ class ChatManager:
     # 2) Existing method: fallback to chat history
     # -------------------------------------------------
     async def extract_topic_from_chat(self, session_id: str) -> Dict:
+        """
+        Topic of the session, cached until new messages arrive. New messages
+        that name exactly one topic switch to it; a known topic is kept while
+        the new user messages name no subject at all (bare requests such as
+        "show me a diagram"), and anything else asks the LLM.
+        """
+        if session_id not in self.chat_histories:
+            return {
+                "success": False,
+                "message": "No chat history found",
+                "topic": None,
+                "confidence": 0.0
+            }
+
+        history = self.chat_histories[session_id]
+        cached = self.session_topics.get(session_id)
+        if cached and cached["seen"] == len(history):
+            self.topic_stats["cache_hits"] += 1
+            return cached["result"]
+
+        # Messages since the topic was last worked out, latest first
+        new_messages = history[cached["seen"]:] if cached else history[-2:]
+        local_topic = next(
+            (topic for topic in (self.topic_matcher.match(msg["content"]) for msg in reversed(new_messages)) if topic),
+            None
+        )
+        if local_topic:
+            self.topic_stats["local_matches"] += 1
+            result = {"success": True, "topic": local_topic, "confidence": 1.0, "message": None}
+        elif cached and cached["result"]["topic"] and all(
+                self.topic_matcher.names_no_subject(msg["content"]) for msg in new_messages if msg["role"] == "user"):
+            self.topic_stats["carried_forward"] += 1
+            result = cached["result"]
+        else:
+            self.topic_stats["llm_calls"] += 1
+            result = await self._extract_topic_from_chat_llm(session_id)
+            if not result["success"]:
+                return result
+
+        self.session_topics[session_id] = {"seen": len(history), "result": result}
+        return result
+
+    async def _extract_topic_from_chat_llm(self, session_id: str) -> Dict:
         """
         Extract the business topic being discussed from chat history,
         using only first 50 words from each message to save tokens.
         """
         try:
-            if session_id not in self.chat_histories:
-                return {
-                    "success": False,
-                    "message": "No chat history found",
-                    "topic": None,
-                    "confidence": 0.0
-                }
 
             # Get recent messages and truncate each to 50 words
             truncated_messages = []
@@ -355,13 +439,9 @@ Provide me with 3 routes to market """
                 }
             ]
 
-            response = await openai_client.chat.completions.create(
-                model=self.CHAT_MODEL,
-                messages=messages,
-                temperature=0.1
+            raw_content = await self._helper_completion(
+                "extract_topic_from_chat", messages, temperature=0.1, validate=_is_json
             )
-
-            raw_content = response.choices[0].message.content
             print(f"[extract_topic_from_chat] raw LLM response: {raw_content}")
 
             # Parse response
@@ -448,6 +528,30 @@ Provide me with 3 routes to market """
             return fallback_check
 
 
+    async def _helper_completion(self, call_site: str, messages: list, temperature: float, validate=None) -> str:
+        """
+        Text of a low-temperature CHAT_MODEL completion. Call sites listed in
+        LLM_CACHE_TTLS reuse an earlier response to identical messages; a new
+        response is only cached if `validate` (when given) accepts it.
+        """
+        ttl = LLM_CACHE_TTLS.get(call_site)
+        key = None
+        if ttl and self.llm_cache is not None:
+            key = LLMResponseCache.make_key(self.CHAT_MODEL, messages, temperature)
+            cached = await asyncio.to_thread(self.llm_cache.get, key, call_site)
+            if cached is not None:
+                return cached
+
+        response = await openai_client.chat.completions.create(
+            model=self.CHAT_MODEL,
+            messages=messages,
+            temperature=temperature
+        )
+        content = response.choices[0].message.content
+        if key and (validate is None or validate(content)):
+            await asyncio.to_thread(self.llm_cache.put, key, content, ttl)
+        return content
+
     def _generate_session_id(self):
         """Generate unique session ID"""
         return str(uuid.uuid4())
@@ -468,6 +572,10 @@ Provide me with 3 routes to market """
 
     async def classify_message_intent(self, message: str) -> Dict:
         """Classify user message to detect if they want MCQ/video/diagram"""
+        if self.intent_classifier:
+            local_result = await self.intent_classifier.classify(message)
+            if local_result:
+                return local_result
         
         # Prepare classification prompt
         messages = [
@@ -511,20 +619,21 @@ Provide me with 3 routes to market """
 
         try:
             # Get classification from GPT
-            response = await openai_client.chat.completions.create(
-                model=self.CHAT_MODEL,
-                messages=messages,
-                temperature=0.1
+            raw_content = await self._helper_completion(
+                "classify_message_intent", messages, temperature=0.1, validate=_is_json
             )
 
-            result = json.loads(response.choices[0].message.content)
+            result = json.loads(raw_content)
             return {
                 "success": True,
                 "intent": result["intent"],
-                "confidence": float(result["confidence"])
+                "confidence": float(result["confidence"]),
+                "source": "llm"
             }
         except Exception as e:
             log_error(f"Error classifying message: {e}")
+            if self.intent_classifier:
+                self.intent_classifier.record_llm_error()
             return {
                 "success": False,
                 "intent": "none",
@@ -532,75 +641,263 @@ Provide me with 3 routes to market """
             }
 
 
-    def get_context_from_db(self, query: str,chunk_limit: int = 3) -> str:
-        """Get relevant context from vector DB"""
-        results = self.vectordb.search_content(query, chunk_limit=chunk_limit)
-        
+    async def get_context_from_db(self, query: str,chunk_limit: int = 3, token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+        """Get relevant context from vector DB, with adjacent chunks merged,
+        near-duplicates dropped and the result packed into token_budget"""
+        results = await self.vectordb.search_content(query, chunk_limit=chunk_limit)
+        return await self.pack_search_results(results, token_budget)
+
+    async def pack_search_results(self, results: List[Dict], token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+        """Content search results with adjacent chunks merged, near-duplicates
+        dropped and the result packed into token_budget"""
         if not results:
             return ""
-        
-        # Format context from results
-        context = ""
-        for result in results:
-            # Include the main content and its context
-            context += f"\nContent: {result['content']}\n"
-            if result['context']['previous_chunk']:
-                context += f"Previous context: {result['context']['previous_chunk']}\n"
-            if result['context']['next_chunk']:
-                context += f"Following context: {result['context']['next_chunk']}\n"
-            context += f"(Relevance: {result['score']:.2f})\n"
-            
-        return context
 
-    async def get_response(self, message: str, session_id: str, openrouter_api_key: str = None, openrouter_model: str = None, system_prompt: str = None) -> str:
-        try:
-            # Add user message to history
-            self.add_message(session_id, {
+        results = await self.vectordb.hydrate_neighbours(results)
+        return pack_context(results, token_budget)
+
+    async def lookup_turn(self, session_id: str, user_query: Optional[str] = None,
+                          types: Iterable[str] = SEARCH_TYPES) -> Dict:
+        """
+        Everything an MCQ, diagram or video reply needs from the vector DB,
+        found with one search_many call: the topic under discussion and the
+        requested `types` of results within it. Each type keeps its own query:
+        content is searched by the topic name, diagrams by a short summary of
+        the last reply plus the topic, and videos by the last three messages.
+        Returns {"success", "topic", "content", "diagrams", "videos"}.
+        """
+        topic_result = await self.resolve_current_topic(user_query, session_id)
+        if not topic_result["success"] or not topic_result["topic"]:
+            return {
+                "success": False,
+                "message": "Couldn't determine the topic of discussion"
+            }
+        topic = topic_result["topic"]
+        history = self.chat_histories.get(session_id, [])
+
+        queries = {"content": topic}
+        if "diagrams" in types:
+            last_ai_message = next((msg["content"] for msg in reversed(history) if msg["role"] == "assistant"), None)
+            short_summary = await self.summarize_for_diagram(last_ai_message or user_query or "diagram")
+            queries["diagrams"] = f"{short_summary} {topic}"
+        if "videos" in types:
+            # The current message isn't in the history until the turn is committed
+            recent = [msg["content"] for msg in history[-3:]]
+            if user_query and user_query.strip():
+                recent = [*recent[-2:], user_query]
+            queries["videos"] = " ".join(recent) or topic
+
+        results = await self.vectordb.search_many(
+            topic,
+            topic=topic,
+            chunk_limit=LOOKUP_CHUNK_LIMIT,
+            diagram_limit=LOOKUP_DIAGRAM_LIMIT,
+            video_limit=LOOKUP_VIDEO_LIMIT,
+            types=types,
+            queries=queries
+        )
+        return {"success": True, "topic": topic, **results}
+
+    @staticmethod
+    def _window_start(history: List[dict], token_budget: int) -> int:
+        """Index of the oldest message that fits, newest first, in
+        `token_budget`; the latest message is always included"""
+        start = len(history)
+        used = 0
+        for i in range(len(history) - 1, -1, -1):
+            tokens = count_tokens(history[i]["content"]) + HISTORY_MESSAGE_OVERHEAD
+            if used + tokens > token_budget and start < len(history):
+                break
+            used += tokens
+            start = i
+        return start
+
+    def _schedule_summary(self, session_id: str, upto: int):
+        """Fold messages before `upto` into the session's summary in the background"""
+        task = self._summary_tasks.get(session_id)
+        if task is not None and not task.done():
+            return
+        self._summary_tasks[session_id] = asyncio.create_task(self._update_summary(session_id, upto))
+
+    async def _update_summary(self, session_id: str, upto: int):
+        """Extend the session's rolling summary with the messages it doesn't cover yet"""
+        history = self.chat_histories.get(session_id, [])
+        summary = self.history_summaries.get(session_id) or {"summary": "", "covered": 0}
+        folded = history[summary["covered"]:upto]
+        if not folded:
+            return
+        transcript = truncate_tokens(
+            "\n\n".join(f"{msg['role']}: {msg['content']}" for msg in folded),
+            HISTORY_SUMMARY_INPUT_TOKENS
+        )
+        messages = [
+            {
+                "role": "system",
+                "content": f"""You maintain a running summary of a conversation between a user and an assistant.
+                Update the summary with the new messages. Keep the facts, names, figures, decisions and open
+                questions the assistant will need later; drop pleasantries. Reply with the updated summary only,
+                in at most {HISTORY_SUMMARY_WORDS} words."""
+            },
+            {
                 "role": "user",
-                "content": message
-            })
+                "content": f"Current summary:\n{summary['summary'] or '(none)'}\n\nNew messages:\n{transcript}"
+            }
+        ]
+        try:
+            response = await openai_client.chat.completions.create(
+                model=self.CHAT_MODEL,
+                messages=messages,
+                temperature=0.2
+            )
+            # The history may have been reloaded while the summary was written
+            if self.chat_histories.get(session_id) is history:
+                self.history_summaries[session_id] = {
+                    "summary": response.choices[0].message.content.strip(),
+                    "covered": upto
+                }
+                log_info(f"Summarized {upto} messages of session {session_id}")
+        except Exception as e:
+            log_error(f"Error summarizing chat history: {e}")
+
+    def _reset_session_state(self, session_id: str):
+        """Forget state derived from a session's history once it is replaced"""
+        self.session_topics.pop(session_id, None)
+        self.history_summaries.pop(session_id, None)
+        task = self._summary_tasks.pop(session_id, None)
+        if task is not None:
+            task.cancel()
+
+    def _build_messages(self, session_id: str, user_message: dict, system_prompt: str = None):
+        """Prompt messages for answering `user_message` (not yet in the
+        session's history), plus the diagram and MCQ context they carry"""
+        # Recent messages that fit the token budget; older ones are covered
+        # by the session's summary, which is brought up to date in the background
+        history = self.chat_histories.get(session_id, []) + [user_message]
+        summary = self.history_summaries.get(session_id)
+        summary_text = summary["summary"] if summary else ""
+        covered = summary["covered"] if summary else 0
+        budget = HISTORY_TOKEN_BUDGET - count_tokens(summary_text)
+        start = self._window_start(history, budget)
+        if start > covered:
+            self._schedule_summary(session_id, start)
+            # Until the summary catches up, keep the messages it doesn't cover
+            # yet, within a small fixed overshoot of the budget
+            start = max(covered, self._window_start(history, budget + HISTORY_STALE_OVERSHOOT_TOKENS))
+        elif start < covered:
+            # The window already holds messages the summary covers; don't send them twice
+            summary_text = ""
+            start = self._window_start(history, HISTORY_TOKEN_BUDGET)
+        chat_history = history[start:]
+
+        # Get recent messages including diagram context
+        diagram_context = None
+        mcq_context = None
+        for msg in chat_history:
+            if "diagram_context" in msg:
+                diagram_context = msg["diagram_context"]
+            if "mcq_context" in msg:
+                mcq_context = msg["mcq_context"]
+
+        # Use custom system prompt if provided, otherwise use default business advisor prompt
+        if system_prompt and system_prompt.strip():
+            system_content = system_prompt.strip()
+            log_info(f"Using custom system prompt: {system_content[:100]}...")
+        else:
+            system_content = DEFAULT_SYSTEM_PROMPT
+            log_info("Using default business advisor system prompt")
+        
+        # Context enhancements for diagrams and MCQs change from turn to turn
+        turn_context = ""
+        if diagram_context:
+            turn_context += f"\n\nThere is a diagram being discussed that shows: {diagram_context['description']}"
+        if mcq_context and mcq_context.get("isAnswered"):
+            turn_context += f"\n\nWe were discussing an MCQ question: {mcq_context['question']}"
+            turn_context += f"\nThe correct answer was: {mcq_context['correct_answer']}"
+        elif mcq_context:
+            turn_context += f"\n\nWe are discussing an MCQ question: {mcq_context['question']}"
+
+        # The system prompt goes first and unchanged on every turn, so providers
+        # can serve it from their prompt cache; per-turn context goes after the
+        # history, just before the latest message
+        messages = [
+            {
+                "role": "system",
+                "content": system_content
+            }
+        ]
+        if summary_text and start > 0:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary_text}"})
+        for msg in chat_history[:-1]:
+            messages.append({"role": msg["role"], "content": msg["content"]})
+        if turn_context:
+            messages.append({"role": "system", "content": turn_context.strip()})
+        messages.append({"role": chat_history[-1]["role"], "content": chat_history[-1]["content"]})
+        return messages, diagram_context, mcq_context
+
+    def _provider_messages(self, messages: list, model: str) -> list:
+        """Mark the system prompt as a cache breakpoint for models whose
+        prompt caching is opt-in (Anthropic via OpenRouter)"""
+        if not model.startswith(PROMPT_CACHE_CONTROL_MODELS):
+            return messages
+        system_message, *rest = messages
+        return [
+            {
+                "role": "system",
+                "content": [{"type": "text", "text": system_message["content"], "cache_control": {"type": "ephemeral"}}]
+            },
+            *rest
+        ]
 
-            # Get recent messages including diagram context
-            diagram_context = None
-            mcq_context = None
-            chat_history = self.chat_histories[session_id][-6:]
-            for msg in chat_history:
-                if "diagram_context" in msg:
-                    diagram_context = msg["diagram_context"]
-                if "mcq_context" in msg:
-                    mcq_context = msg["mcq_context"]
-
-            # Use custom system prompt if provided, otherwise use default business advisor prompt
-            if system_prompt and system_prompt.strip():
-                system_content = system_prompt.strip()
-                log_info(f"Using custom system prompt: {system_content[:100]}...")
-            else:
-                system_content = DEFAULT_SYSTEM_PROMPT
-                log_info("Using default business advisor system prompt")
-            
-            # Add context enhancements for diagrams and MCQs
-            if diagram_context:
-                system_content += f"\n\nThere is a diagram being discussed that shows: {diagram_context['description']}"
-            if mcq_context and mcq_context.get("isAnswered"):
-                system_content += f"\n\nWe were discussing an MCQ question: {mcq_context['question']}"
-                system_content += f"\nThe correct answer was: {mcq_context['correct_answer']}"
-            elif mcq_context:
-                system_content += f"\n\nWe are discussing an MCQ question: {mcq_context['question']}"
+    def _record_usage(self, usage):
+        """Add a completion's prompt and cached-prompt token counts to prompt_cache_stats"""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", None) or 0) if details else 0
+        self.prompt_cache_stats["completions"] += 1
+        self.prompt_cache_stats["prompt_tokens"] += usage.prompt_tokens or 0
+        self.prompt_cache_stats["cached_tokens"] += cached_tokens
+        if cached_tokens:
+            self.prompt_cache_stats["cache_hits"] += 1
+
+    def _assistant_message(self, content: str, diagram_context: Optional[Dict], mcq_context: Optional[Dict]) -> dict:
+        """Assistant response with preserved contexts"""
+        return {
+            "role": "assistant",
+            "content": content,
+            **({"diagram_context": diagram_context} if diagram_context else {}),
+            **({"mcq_context": mcq_context} if mcq_context else {})
+        }
+
+    def commit_turn(self, session_id: str, draft: Dict):
+        """Add a drafted turn's user message, and its reply if there is one, to the history"""
+        self.add_message(session_id, draft["user_message"])
+        if draft["assistant_message"]:
+            self.add_message(session_id, draft["assistant_message"])
 
-            messages = [
-                {
-                    "role": "system",
-                    "content": system_content
-                }
-            ]
-            # Add relevant chat history
-            for msg in chat_history:
-                messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"],
-                    **({"diagram_context": msg.get("diagram_context")} if "diagram_context" in msg else {}),
-                    **({"mcq_context": msg.get("mcq_context")} if "mcq_context" in msg else {})
-                })
+    async def get_response(self, message: str, session_id: str, openrouter_api_key: str = None, openrouter_model: str = None, system_prompt: str = None) -> str:
+        draft = await self.draft_response(message, session_id, openrouter_api_key, openrouter_model, system_prompt)
+        self.commit_turn(session_id, draft)
+        return draft["response"]
+
+    async def draft_response(self, message: str, session_id: str, openrouter_api_key: str = None, openrouter_model: str = None, system_prompt: str = None) -> Dict:
+        """
+        Generate the reply to `message` without touching the chat history, so
+        the draft can be cancelled at any point; commit_turn records it.
+        Returns {"response", "user_message", "assistant_message"}, where
+        assistant_message is None if the completion failed.
+        """
+        user_message = {
+            "role": "user",
+            "content": message
+        }
+        draft = {
+            "response": "I encountered an error while processing your request. Please try again.",
+            "user_message": user_message,
+            "assistant_message": None
+        }
+        try:
+            messages, diagram_context, mcq_context = self._build_messages(session_id, user_message, system_prompt)
 
             try:
                 if openrouter_api_key and openrouter_model:
@@ -624,40 +921,92 @@ Provide me with 3 routes to market """
                     log_info("Using OpenAI (fallback) - no OpenRouter API key provided")
                     assistant_response = await self._get_openai_response(messages)
                 
-                # Add assistant response with preserved contexts
-                self.add_message(session_id, {
-                    "role": "assistant",
-                    "content": assistant_response,
-                    **({"diagram_context": diagram_context} if diagram_context else {}),
-                    **({"mcq_context": mcq_context} if mcq_context else {})
-                })
-
-                return assistant_response
+                draft["response"] = assistant_response
+                draft["assistant_message"] = self._assistant_message(assistant_response, diagram_context, mcq_context)
 
             except Exception as e:
                 log_error(f"Error getting completion: {e}")
-                return "I encountered an error while processing your request. Please try again."
 
         except Exception as e:
             log_error(f"Error getting response: {e}")
-            return "I encountered an error while processing your request. Please try again."
+        return draft
+
+    async def stream_response(self, message: str, session_id: str, openrouter_api_key: str = None, openrouter_model: str = None, system_prompt: str = None) -> AsyncIterator[str]:
+        """
+        Like get_response, but yields the reply as it is generated. The full
+        turn is added to the chat history once the stream completes; if the
+        consumer stops early (client disconnected) the upstream request is
+        closed and the history is left untouched.
+        """
+        user_message = {"role": "user", "content": message}
+        messages, diagram_context, mcq_context = self._build_messages(session_id, user_message, system_prompt)
+
+        if openrouter_api_key:
+            model = openrouter_model or self.DEFAULT_OPENROUTER_MODEL
+            log_info(f"Streaming from OpenRouter with model: {model}")
+        else:
+            model = self.CHAT_MODEL
+            log_info("Streaming from OpenAI (fallback) - no OpenRouter API key provided")
+
+        completion = self._stream_completion(messages, model, openrouter_api_key)
+        parts = []
+        completed = False
+        try:
+            async for token in completion:
+                parts.append(token)
+                yield token
+            completed = True
+        finally:
+            await completion.aclose()
+            if completed:
+                self.commit_turn(session_id, {
+                    "user_message": user_message,
+                    "assistant_message": self._assistant_message("".join(parts), diagram_context, mcq_context)
+                })
+            else:
+                log_info(f"Stream for session {session_id} stopped after {len(parts)} chunks")
+
+    async def _stream_completion(self, messages: list, model: str, openrouter_api_key: str = None) -> AsyncIterator[str]:
+        """Yield content deltas of a streamed chat completion from OpenRouter
+        (with an API key) or OpenAI, closing the upstream response however
+        iteration ends"""
+        async with AsyncExitStack() as stack:
+            client = openai_client
+            options = {"stream_options": {"include_usage": True}}
+            if openrouter_api_key:
+                client = await stack.enter_async_context(self.openrouter_clients.client(openrouter_api_key))
+                messages = self._provider_messages(messages, model)
+                options["extra_body"] = {"usage": {"include": True}}
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0.3,
+                stream=True,
+                **options
+            )
+            stack.push_async_callback(stream.close)
+            async for chunk in stream:
+                # The last chunk carries the usage and no choices
+                if getattr(chunk, "usage", None):
+                    self._record_usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
 
     async def _get_openrouter_response(self, messages: list, api_key: str, model: str) -> str:
         """Get response from OpenRouter API using OpenAI SDK"""
         log_info(f"Making request to OpenRouter API with model: {model}")
         
         try:
-            # Create OpenRouter client using OpenAI SDK with custom base URL
-            openrouter_client = AsyncOpenAI(
-                api_key=api_key,
-                base_url=self.OPENROUTER_BASE_URL
-            )
-            
-            response = await openrouter_client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=0.3
-            )
+            # Pooled OpenRouter client for this API key, reusing its connections
+            async with self.openrouter_clients.client(api_key) as openrouter_client:
+                response = await openrouter_client.chat.completions.create(
+                    model=model,
+                    messages=self._provider_messages(messages, model),
+                    temperature=0.3,
+                    # Ask OpenRouter for token accounting, including cached prompt tokens
+                    extra_body={"usage": {"include": True}}
+                )
+            self._record_usage(response.usage)
             
             log_info(f"OpenRouter API response successful for model: {model}")
             return response.choices[0].message.content
@@ -674,18 +1023,19 @@ Provide me with 3 routes to market """
                 messages=messages,
                 temperature=0.3
             )
+            self._record_usage(response.usage)
             return response.choices[0].message.content
         except Exception as e:
             log_error(f"Error getting OpenAI response: {e}")
             raise Exception(f"Error getting OpenAI response: {e}")
             
-    async def generate_mcq(self, session_id: str) -> Dict:
+    async def generate_mcq(self, session_id: str, lookup: Dict = None) -> Dict:
         """
         MCQ Generation Flow:
-        1) Identify the topic from chat.
-        2) Get context for that topic (chunk_limit=10 or 15).
-        3) Combine that context with last 2 chat messages + previously generated MCQs.
-        4) Generate a new MCQ via GPT, store it, and save to disk.
+        1) Identify the topic and fetch its context (lookup_turn, unless the
+           caller already has the turn's lookup).
+        2) Combine that context with last 2 chat messages + previously generated MCQs.
+        3) Generate a new MCQ via GPT, store it, and save to disk.
         """
         try:
             if session_id not in self.chat_histories:
@@ -695,21 +1045,18 @@ Provide me with 3 routes to market """
                 }
 
             # --------------------------
-            # Step 1) Identify topic
+            # Step 1) Identify topic and fetch its context from DB
             # --------------------------
-            topic_result = await self.extract_topic_from_chat(session_id)
-            if not topic_result["success"] or not topic_result["topic"]:
+            lookup = lookup or await self.lookup_turn(session_id, types=["content"])
+            if not lookup["success"]:
                 return {
                     "success": False,
                     "message": "Couldn't determine the topic of discussion for MCQ."
                 }
-            recognized_topic = topic_result["topic"]
+            recognized_topic = lookup["topic"]
             print(f"[generate_mcq] Identified topic: {recognized_topic}")
 
-            # --------------------------
-            # Step 2) Fetch context from DB for that topic
-      
-            context_for_topic = self.get_context_from_db(recognized_topic, chunk_limit=15)
+            context_for_topic = await self.pack_search_results(lookup["content"], MCQ_CONTEXT_TOKEN_BUDGET)
             if not context_for_topic.strip():
                 return {
                     "success": False,
@@ -729,7 +1076,7 @@ Provide me with 3 routes to market """
             combined_context = f"Context for topic:\n{context_for_topic}\n\nRecent user text:\n{recent_user_text}"
 
             # --------------------------
-            # Step 3) Combine older MCQs to avoid duplication
+            # Step 2) Combine older MCQs to avoid duplication
             # --------------------------
             if session_id not in self.generated_mcqs:
                 self.generated_mcqs[session_id] = []
@@ -815,43 +1162,22 @@ Provide me with 3 routes to market """
                 "message": "Error generating MCQ"
             }
 
-    async def get_relevant_diagram(self, session_id: str, user_query: Optional[str] = None) -> Dict:
+    async def get_relevant_diagram(self, session_id: str, user_query: Optional[str] = None, lookup: Dict = None) -> Dict:
         """
-        Step 1) Summarize the last AI (or user) message to get a short chunk
-        Step 2) Use that short summary to embed & search diagrams
-        Step 3) Return the relevant diagram
+        Step 1) Find the topic and the diagrams matching the recent conversation
+                (lookup_turn, unless the caller already has the turn's lookup)
+        Step 2) Return the relevant diagram
         """
         try:
-            topic_result = await self.resolve_current_topic(user_query, session_id)
-            if not topic_result["success"] or not topic_result["topic"]:
+            lookup = lookup or await self.lookup_turn(session_id, user_query, types=["diagrams"])
+            if not lookup["success"]:
                 return {
                     "success": False,
                     "message": "Couldn't determine a valid topic from user or chat."
                 }
 
-            recognized_topic = topic_result["topic"]
-
-            last_ai_message = None
-            for msg in reversed(self.chat_histories[session_id]):
-                if msg["role"] == "assistant":
-                    last_ai_message = msg["content"]
-                    break
-
-            if not last_ai_message:
-                # fallback to user query or something
-                last_ai_message = user_query or "diagram"
-
-          # Summarize that message to keep it short
-            short_summary = await self.summarize_for_diagram(last_ai_message)
-
-            # 2) Combine with recognized topic and do search
-            combined_query = f"{short_summary} {recognized_topic}"
-
-            diagrams = await self.vectordb.search_diagrams(
-                query=combined_query,
-                topic=recognized_topic,
-                limit=1
-            )
+            recognized_topic = lookup["topic"]
+            diagrams = lookup["diagrams"]
             if not diagrams:
                 return {
                     "success": False,
@@ -908,31 +1234,20 @@ Provide me with 3 routes to market """
             }
 
 
-    async def get_relevant_videos(self, session_id: str) -> Dict:
+    async def get_relevant_videos(self, session_id: str, lookup: Dict = None) -> Dict:
         """Get relevant videos based on chat context"""
         try:
-            # First, determine the topic
-            topic_result = await self.extract_topic_from_chat(session_id)
-            if not topic_result["success"] or not topic_result["topic"]:
+            # First, determine the topic and search for relevant videos
+            # (will get both languages if available)
+            lookup = lookup or await self.lookup_turn(session_id, types=["videos"])
+            if not lookup["success"]:
                 return {
                     "success": False,
                     "message": "Couldn't determine the topic of discussion"
                 }
 
-            topic = topic_result["topic"]
-            
-            # Get recent context for relevance search
-            recent_messages = self.chat_histories[session_id][-3:]
-            context = " ".join([msg["content"] for msg in recent_messages])
-            print(f"Context: {context}")
-            print(f"Topic: {topic}")
-
-            # Search for relevant videos (will get both languages if available)
-            videos = await self.vectordb.search_videos(
-                query=context,
-                topic=topic
-            )
-
+            topic = lookup["topic"]
+            videos = lookup["videos"]
             if not videos:
                 return {
                     "success": False,
@@ -983,12 +1298,7 @@ Provide me with 3 routes to market """
             ]
 
             # Call GPT with low temperature for consistent summarization
-            response = await openai_client.chat.completions.create(
-                model=self.CHAT_MODEL,
-                messages=messages,
-                temperature=0.2
-            )
-            summary = response.choices[0].message.content.strip()
+            summary = (await self._helper_completion("summarize_for_diagram", messages, temperature=0.2)).strip()
 
             return summary
         except Exception as e:
@@ -1036,6 +1346,7 @@ Provide me with 3 routes to market """
             # Reverse so oldest is first
             recent_msgs.reverse()
             self.chat_histories[session_id] = recent_msgs
+            self._reset_session_state(session_id)
 
         except Exception as e:
             log_error(f"Error loading context for chat {chat_id}: {e}")
@@ -0,0 +1,137 @@
+# client_pool.py
+import hashlib
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+import httpx
+from openai import AsyncOpenAI
+from utils import log_info, log_error
+from constants import (
+    OPENROUTER_BASE_URL,
+    OPENROUTER_POOL_SIZE,
+    OPENROUTER_CLIENT_TTL,
+    OPENROUTER_MAX_CONNECTIONS,
+    OPENROUTER_MAX_KEEPALIVE,
+    OPENROUTER_KEEPALIVE_EXPIRY,
+    OPENROUTER_HTTP2
+)
+
+
+class OpenRouterClientPool:
+    """
+    AsyncOpenAI clients for OpenRouter, one per API key, so requests made
+    with the same key reuse its keep-alive connections. Clients idle for
+    longer than `ttl` seconds, or least recently used beyond `max_clients`,
+    are closed; a client still serving a request is closed when released.
+    """
+
+    def __init__(self, base_url: str = OPENROUTER_BASE_URL,
+                 max_clients: int = OPENROUTER_POOL_SIZE,
+                 ttl: float = OPENROUTER_CLIENT_TTL,
+                 max_connections: int = OPENROUTER_MAX_CONNECTIONS,
+                 max_keepalive: int = OPENROUTER_MAX_KEEPALIVE,
+                 keepalive_expiry: float = OPENROUTER_KEEPALIVE_EXPIRY,
+                 http2: bool = OPENROUTER_HTTP2):
+        self.base_url = base_url
+        self.max_clients = max_clients
+        self.ttl = ttl
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2
+        self._clients: "OrderedDict[str, Dict]" = OrderedDict()
+        self._stats = {
+            "clients_created": 0,
+            "clients_reused": 0,
+            "clients_evicted": 0,
+            "requests": 0,
+            "connections_opened": 0
+        }
+
+    @staticmethod
+    def _key(api_key: str) -> str:
+        # Keep raw API keys out of the pool's keys
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+    def _new_client(self, api_key: str) -> AsyncOpenAI:
+        try:
+            http_client = httpx.AsyncClient(
+                limits=self.limits,
+                http2=self.http2,
+                follow_redirects=True,
+                event_hooks={"request": [self._on_request]}
+            )
+        except ImportError as e:
+            log_error(f"HTTP/2 unavailable for OpenRouter clients, using HTTP/1.1: {e}")
+            self.http2 = False
+            return self._new_client(api_key)
+        self._stats["clients_created"] += 1
+        return AsyncOpenAI(api_key=api_key, base_url=self.base_url, http_client=http_client)
+
+    async def _on_request(self, request: httpx.Request):
+        self._stats["requests"] += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: Dict):
+        # httpcore reports a TCP connect only when no pooled connection could be reused
+        if event_name == "connection.connect_tcp.complete":
+            self._stats["connections_opened"] += 1
+
+    async def _evict(self, key: str):
+        entry = self._clients.pop(key)
+        entry["evicted"] = True
+        self._stats["clients_evicted"] += 1
+        if not entry["in_use"]:
+            await entry["client"].close()
+
+    async def _evict_expired(self):
+        now = time.monotonic()
+        expired = [
+            key for key, entry in self._clients.items()
+            if not entry["in_use"] and now - entry["last_used"] > self.ttl
+        ]
+        for key in expired:
+            await self._evict(key)
+
+    @asynccontextmanager
+    async def client(self, api_key: str) -> AsyncIterator[AsyncOpenAI]:
+        """Borrow the client for `api_key` for the duration of the block"""
+        await self._evict_expired()
+        key = self._key(api_key)
+        entry = self._clients.get(key)
+        if entry is None:
+            entry = {"client": self._new_client(api_key), "last_used": time.monotonic(), "in_use": 1, "evicted": False}
+            self._clients[key] = entry
+            while len(self._clients) > self.max_clients:
+                await self._evict(next(iter(self._clients)))
+        else:
+            entry["in_use"] += 1
+            self._clients.move_to_end(key)
+            self._stats["clients_reused"] += 1
+
+        try:
+            yield entry["client"]
+        finally:
+            entry["in_use"] -= 1
+            entry["last_used"] = time.monotonic()
+            if entry["evicted"] and not entry["in_use"]:
+                await entry["client"].close()
+
+    async def close(self):
+        """Close every pooled client"""
+        for key in list(self._clients):
+            await self._evict(key)
+        log_info("Closed OpenRouter client pool")
+
+    def stats(self) -> Dict:
+        """Pool size and client/connection reuse counters"""
+        requests = self._stats["requests"]
+        return {
+            **self._stats,
+            "pool_size": len(self._clients),
+            "in_use": sum(entry["in_use"] for entry in self._clients.values()),
+            "connection_reuse_rate": 1 - self._stats["connections_opened"] / requests if requests else 0.0
+        }
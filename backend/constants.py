@@ -1,9 +1,165 @@
 # constants.py
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
 CHUNK_SIZE = 250  # Words per chunk
 PAGE_SIZE = 1200  # Words per page
-VECTOR_SIZE = 3072  # OpenAI embedding dimension
+# OpenAI embedding dimension; text-embedding-3-large can be shortened (e.g. 1024 or 256)
+VECTOR_SIZE = int(os.getenv("EMBEDDING_DIMENSIONS", "3072"))
+
+# Vector quantization: "none", "scalar" (int8, ~4x smaller) or "binary" (~32x smaller)
+QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+QUANTIZATION_RESCORE = True  # Re-rank quantized candidates with the original vectors
+QUANTIZATION_OVERSAMPLING = 2.0  # Candidates fetched per requested result before rescoring
+
+EMBEDDING_BATCH_SIZE = 2048  # Max inputs per embeddings request
+EMBEDDING_BATCH_TOKENS = 300000  # Max total tokens per embeddings request
+EMBEDDING_MAX_INPUT_TOKENS = 8191  # Max tokens for a single embedding input
+UPSERT_BATCH_SIZE = 256  # Points per Qdrant upsert request
+
+EMBEDDING_CACHE_PATH = "embedding_cache.sqlite3"
+EMBEDDING_CACHE_MEMORY_SIZE = 2048  # Embeddings kept in the in-memory LRU
+EMBEDDING_CACHE_MAX_DISK_ENTRIES = 200000  # Embeddings kept in the SQLite store
+
+# Ingestion pipeline
+OPENAI_EMBEDDING_RPM = 3000  # Embeddings requests-per-minute quota
+OPENAI_EMBEDDING_TPM = 1000000  # Embeddings tokens-per-minute quota
+INGEST_EXTRACT_CONCURRENCY = 4
+INGEST_CHUNK_CONCURRENCY = 2
+INGEST_EMBED_CONCURRENCY = 4
+INGEST_UPSERT_CONCURRENCY = 2
+INGEST_QUEUE_SIZE = 16  # Max items waiting between two stages
+INGEST_EMBED_BATCH_SIZE = 256  # Records per embed/upsert work item
+INGEST_MANIFEST_DIR = "ingest_manifests"  # Per-script records of indexed sources and point IDs
+
+COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "medical_content")
+
+# Vector backend: "qdrant" (QDRANT_URL) or "embedded" (in-process NumPy store on local disk)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant")
+EMBEDDED_STORE_DIR = os.getenv("EMBEDDED_STORE_DIR", "vector_store")
+EMBEDDED_STORE_DTYPE = os.getenv("EMBEDDED_STORE_DTYPE", "float32")  # "float16" halves memory, scores a little slower
+
+# Hybrid retrieval: BM25 over content chunks fused with dense search by reciprocal rank
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+SPARSE_INDEX_DIR = os.getenv("SPARSE_INDEX_DIR", "sparse_index")
+# Seconds between checks for a sparse index file rewritten by an ingestion script
+SPARSE_INDEX_RELOAD_INTERVAL = float(os.getenv("SPARSE_INDEX_RELOAD_INTERVAL", "10"))
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60  # Damps the weight of top ranks in reciprocal rank fusion
+HYBRID_CANDIDATES = 50  # Results taken from each of the dense and sparse rankings before fusion
+
+# Coarse-to-fine content search: find the best pages (level 2), then search only their chunks (level 3)
+HIERARCHICAL_SEARCH = os.getenv("HIERARCHICAL_SEARCH", "false").lower() == "true"
+HIERARCHICAL_PAGES = 5  # Pages whose chunks are searched
+
+# Adaptive top-k: over-fetch content, then cut where the scores fall off (chunk_limit is the maximum)
+ADAPTIVE_TOP_K = os.getenv("ADAPTIVE_TOP_K", "false").lower() == "true"
+ADAPTIVE_OVERFETCH = 2  # Candidates fetched per requested chunk
+ADAPTIVE_MIN_K = 1
+ADAPTIVE_MIN_SCORE_RATIO = 0.8  # Drop chunks scoring below this fraction of the best one
+ADAPTIVE_ELBOW_FACTOR = 2.0  # Cut before a drop this many times the average drop
+
+# Prompt context assembly (context_packer.py)
+CONTEXT_TOKEN_BUDGET = 1500  # Tokens of retrieved context per chat turn
+MCQ_CONTEXT_TOKEN_BUDGET = 3000  # Tokens of retrieved context per generated MCQ
+CONTEXT_MMR_LAMBDA = 0.7  # Relevance vs. novelty trade-off when ordering spans
+CONTEXT_DUPLICATE_THRESHOLD = 0.8  # Term overlap (Jaccard) above which a span is dropped as a duplicate
 
-COLLECTION_NAME = "medical_content"
+# OpenRouter chat clients, pooled one per API key (client_pool.py)
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+OPENROUTER_POOL_SIZE = int(os.getenv("OPENROUTER_POOL_SIZE", "32"))  # Clients (API keys) kept open
+OPENROUTER_CLIENT_TTL = int(os.getenv("OPENROUTER_CLIENT_TTL", "900"))  # Seconds an idle client is kept
+OPENROUTER_MAX_CONNECTIONS = int(os.getenv("OPENROUTER_MAX_CONNECTIONS", "20"))  # Per client
+OPENROUTER_MAX_KEEPALIVE = int(os.getenv("OPENROUTER_MAX_KEEPALIVE", "10"))  # Idle connections kept per client
+OPENROUTER_KEEPALIVE_EXPIRY = float(os.getenv("OPENROUTER_KEEPALIVE_EXPIRY", "60"))  # Seconds
+OPENROUTER_HTTP2 = os.getenv("OPENROUTER_HTTP2", "false").lower() == "true"  # Needs httpx[http2]
+# OpenRouter models that only cache prompt prefixes marked with cache_control
+PROMPT_CACHE_CONTROL_MODELS = ("anthropic/",)
+
+# OpenRouter model catalogue proxied by /openrouter/models (model_catalog.py)
+OPENROUTER_MODELS_TTL = int(os.getenv("OPENROUTER_MODELS_TTL", "600"))  # Seconds a catalogue is served as fresh
+OPENROUTER_MODELS_STALE_TTL = int(os.getenv("OPENROUTER_MODELS_STALE_TTL", "86400"))  # Then served stale while refreshing
+OPENROUTER_MODELS_CACHE_SIZE = 64  # API keys whose catalogue is kept
+
+# Local intent classification in front of the LLM classifier (intent_classifier.py)
+LOCAL_INTENT_CLASSIFIER = os.getenv("LOCAL_INTENT_CLASSIFIER", "true").lower() == "true"
+INTENT_RULE_MAX_WORDS = 12  # Longer messages are never settled by keyword rules alone
+INTENT_RULE_CONFIDENCE = 0.95
+INTENT_PROTOTYPE_THRESHOLD = 0.6  # Cosine similarity to the nearest example phrase
+INTENT_PROTOTYPE_MARGIN = 0.05  # Required lead over the nearest example of another intent
+INTENT_PROTOTYPE_CONFIDENCE = 0.9
+# Example phrases per intent; "none" holds look-alikes that are ordinary questions
+INTENT_EXAMPLES = {
+    "mcq": [
+        "Give me a practice question",
+        "Can I have an MCQ",
+        "Test my knowledge",
+        "Quiz me about this",
+        "Ask me a multiple choice question",
+        "Give me a question on this",
+        "Ask me something about this topic"
+    ],
+    "video": [
+        "Show me a video",
+        "Is there a video about this",
+        "Can I watch something about this",
+        "Do you have a video lecture on this topic"
+    ],
+    "diagram": [
+        "Show me a diagram",
+        "Can I see an illustration",
+        "Is there a picture explaining this",
+        "Can you show me a figure of this"
+    ],
+    "none": [
+        "What does this diagram show",
+        "Can you explain the video",
+        "Could you describe what the diagram shows",
+        "Is there any image finding typical of this disease",
+        "What imaging findings suggest this condition",
+        "What is the correct answer to that question",
+        "How is this condition treated"
+    ]
+}
+
+# Conversation window sent with each chat turn
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))  # Recent messages plus the summary of older ones
+HISTORY_MESSAGE_OVERHEAD = 4  # Tokens of chat formatting per message
+HISTORY_SUMMARY_WORDS = 250  # Target length of the rolling summary
+HISTORY_SUMMARY_INPUT_TOKENS = 8000  # Most tokens of older messages folded in one summary update
+HISTORY_STALE_OVERSHOOT_TOKENS = int(os.getenv("HISTORY_STALE_OVERSHOOT_TOKENS", "500"))  # Extra window while the summary catches up
+
+# Response cache for low-temperature helper LLM calls (llm_cache.py)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3") or None  # Empty: memory only
+LLM_CACHE_MEMORY_SIZE = 1024  # Responses kept in the in-memory LRU
+LLM_CACHE_MAX_DISK_ENTRIES = 50000  # Responses kept in the SQLite store
+# Seconds a response is reused, per call site; call sites not listed are never cached
+LLM_CACHE_TTLS = {
+    "classify_message_intent": 7 * 24 * 3600,
+    "extract_topic_from_query": 24 * 3600,
+    "extract_topic_from_chat": 24 * 3600,
+    "summarize_for_diagram": 7 * 24 * 3600
+}
+
+# Result groups returned by VectorDBManager.search_many
+SEARCH_TYPES = ("content", "diagrams", "videos")
+# Per-type limits of the single search behind an MCQ/diagram/video reply (ChatManager.lookup_turn)
+LOOKUP_CHUNK_LIMIT = 15
+LOOKUP_DIAGRAM_LIMIT = 1
+LOOKUP_VIDEO_LIMIT = 2
+
+# Payload fields used in search filters and the index type each one needs
+PAYLOAD_INDEXES = {
+    "topic": "keyword",
+    "level": "integer",
+    "content_type": "keyword",
+    "language": "keyword",
+    "page_num": "integer",
+    "chunk_num": "integer"
+}
 
 # Default system prompt for AI business advisor
 DEFAULT_SYSTEM_PROMPT = """You are an AI-powered virtual business consultant designed to guide business owners, directors, and managers through a discovery process that identifies digital challenges within their business and explores how AI can help solve them. Your primary objective is to gather relevant business information, uncover inefficiencies or bottlenecks, and deliver a personalised AI-powered solution architecture in clear, actionable language.
@@ -102,4 +258,17 @@ VALID_TOPICS = {
         "colorectal_cancer": "colorectal cancer",
         "lumbar_disc_herniation": "lumbar disc herniation"
         
-    }
\ No newline at end of file
+    }
+
+# Other names for each topic, matched locally before asking the LLM (topic_matcher.py)
+TOPIC_ALIASES = {
+    "tuberculosis": ["tb", "mycobacterium tuberculosis", "koch's disease", "pulmonary tb", "phthisis"],
+    "turner_syndrome": ["turner's syndrome", "turners syndrome", "45,x", "45x", "monosomy x", "ullrich-turner syndrome"],
+    "trigeminal_neuralgia": ["tic douloureux", "trigeminal nerve pain", "fothergill's disease"],
+    "colorectal_cancer": ["colon cancer", "rectal cancer", "bowel cancer", "colorectal carcinoma", "colon carcinoma"],
+    # Only names that can't mean another spinal level ("cervical disc herniation") or another term ("LDH")
+    "lumbar_disc_herniation": ["lumber disc herniation", "herniated lumbar disc", "lumbar disc prolapse",
+                               "prolapsed lumbar disc", "slipped lumbar disc", "lumbar herniated disc"]
+}
+TOPIC_FUZZY_THRESHOLD = 0.85  # Similarity at which a misspelt topic name still counts as a mention
+TOPIC_FUZZY_MIN_LENGTH = 8  # Shorter names and aliases must match exactly
\ No newline at end of file
@@ -0,0 +1,95 @@
+# context_packer.py
+from typing import Dict, List, Set
+from sparse_index import tokenize
+from utils import log_info, count_tokens, truncate_tokens
+from constants import CONTEXT_TOKEN_BUDGET, CONTEXT_MMR_LAMBDA, CONTEXT_DUPLICATE_THRESHOLD
+
+
+def merge_spans(results: List[Dict]) -> List[Dict]:
+    """
+    Turn hydrated search hits into contiguous spans of text. Hits and their
+    previous/next neighbours on the same page are laid out by chunk number,
+    and runs of consecutive chunks become one span, so text shared by
+    adjacent hits appears once. A span scores as its best hit.
+    """
+    pages = {}
+    for result in results:
+        page = pages.setdefault((result["topic"], result["page_num"]), {"chunks": {}, "scores": {}})
+        chunk_num = result["chunk_num"]
+        page["chunks"][chunk_num] = result["content"]
+        page["scores"][chunk_num] = max(page["scores"].get(chunk_num, 0.0), result["score"] or 0.0)
+        context = result.get("context") or {}
+        if context.get("previous_chunk") and chunk_num > 0:
+            page["chunks"].setdefault(chunk_num - 1, context["previous_chunk"])
+        if context.get("next_chunk"):
+            page["chunks"].setdefault(chunk_num + 1, context["next_chunk"])
+
+    spans = []
+    for (topic, page_num), page in pages.items():
+        run: List[int] = []
+        for chunk_num in sorted(page["chunks"]) + [None]:
+            if run and (chunk_num is None or chunk_num != run[-1] + 1):
+                spans.append({
+                    "topic": topic,
+                    "page_num": page_num,
+                    "chunk_nums": run,
+                    "text": " ".join(page["chunks"][num] for num in run),
+                    "score": max(page["scores"].get(num, 0.0) for num in run)
+                })
+                run = []
+            if chunk_num is not None:
+                run.append(chunk_num)
+    return spans
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def select_mmr(spans: List[Dict], mmr_lambda: float = CONTEXT_MMR_LAMBDA,
+               duplicate_threshold: float = CONTEXT_DUPLICATE_THRESHOLD) -> List[Dict]:
+    """Order spans by maximal marginal relevance (score against term overlap
+    with spans already chosen), dropping near-duplicates of a chosen span"""
+    terms = [set(tokenize(span["text"])) for span in spans]
+    remaining = list(range(len(spans)))
+    selected: List[int] = []
+
+    def redundancy(i: int) -> float:
+        return max((_jaccard(terms[i], terms[j]) for j in selected), default=0.0)
+
+    while remaining:
+        best = max(remaining, key=lambda i: mmr_lambda * spans[i]["score"] - (1 - mmr_lambda) * redundancy(i))
+        remaining.remove(best)
+        if redundancy(best) < duplicate_threshold:
+            selected.append(best)
+    return [spans[i] for i in selected]
+
+
+def pack_context(results: List[Dict], token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """Merge, de-duplicate and pack hydrated search hits into at most
+    `token_budget` tokens of prompt context"""
+    spans = select_mmr(merge_spans(results))
+    context = ""
+    used = 0
+    packed = 0
+    for span in spans:
+        block = f"\nContent: {span['text']}\n(Relevance: {span['score']:.2f})\n"
+        tokens = count_tokens(block)
+        if used + tokens > token_budget:
+            if packed:
+                continue
+            # Always keep the best span, cut down to the budget
+            block = truncate_tokens(block, token_budget)
+            tokens = token_budget
+        context += block
+        used += tokens
+        packed += 1
+
+    raw_tokens = sum(
+        count_tokens(result["content"])
+        + count_tokens((result.get("context") or {}).get("previous_chunk") or "")
+        + count_tokens((result.get("context") or {}).get("next_chunk") or "")
+        for result in results
+    )
+    log_info(f"Packed {len(results)} hits into {packed}/{len(spans)} spans: {used} tokens (unpacked {raw_tokens})")
+    return context
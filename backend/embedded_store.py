@@ -0,0 +1,266 @@
+# embedded_store.py
+import json
+import os
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+import numpy as np
+from vector_store import VectorStore, Point, SearchHit
+from utils import log_info, log_error
+from constants import (
+    VECTOR_SIZE, COLLECTION_NAME, QUANTIZATION, PAYLOAD_INDEXES,
+    EMBEDDED_STORE_DIR, EMBEDDED_STORE_DTYPE
+)
+
+# Rows scored per matrix-vector product, bounding the float32 copy of float16 rows
+_SCORE_BLOCK_ROWS = 8192
+
+
+class EmbeddedStore(VectorStore):
+    """
+    In-process collection for single-node deployments.
+
+    Vectors are kept unit-normalized in a float32 (or float16) matrix that is
+    memory-mapped from disk, so cosine similarity is a plain dot product.
+    Payloads are held in memory alongside one row bitmap per value of every
+    PAYLOAD_INDEXES field, and a search ANDs the bitmaps of its conditions,
+    scores only the selected rows and partially sorts for the top k.
+
+    Writes are buffered in memory and persisted by flush().
+    """
+
+    def __init__(self, collection_name: str = COLLECTION_NAME, dimensions: int = VECTOR_SIZE,
+                 quantization: str = QUANTIZATION, path: str = EMBEDDED_STORE_DIR,
+                 dtype: str = EMBEDDED_STORE_DTYPE):
+        self.collection_name = collection_name
+        self.dimensions = dimensions
+        self.quantization = quantization
+        self.path = Path(path) / collection_name
+        self.dtype = np.dtype(dtype)
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.payloads: List[Optional[Dict[str, Any]]] = []  # None marks a deleted row
+        self._vectors = np.empty((0, dimensions), dtype=self.dtype)
+        self._alive = np.empty(0, dtype=bool)
+        self._bitmaps: Optional[Dict[str, Dict[Any, np.ndarray]]] = None
+        self._dirty = False
+        self._load()
+
+    @property
+    def size(self) -> int:
+        """Rows in use, including deleted ones awaiting compaction"""
+        return len(self.ids)
+
+    def _load(self):
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            return
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+            with open(self.path / "points.jsonl", "r", encoding="utf-8") as f:
+                for line in f:
+                    point = json.loads(line)
+                    self.rows[point["id"]] = len(self.ids)
+                    self.ids.append(point["id"])
+                    self.payloads.append(point["payload"])
+        except (OSError, ValueError) as e:
+            log_error(f"Error loading embedded collection {self.path}: {e}")
+            raise e
+        self.dimensions = meta["dimensions"]
+        self.dtype = vectors.dtype
+        self._vectors = vectors
+        self._alive = np.ones(len(self.ids), dtype=bool)
+        log_info(f"Loaded embedded collection {self.collection_name} ({len(self.ids)} points, {self.dimensions}d {self.dtype})")
+
+    async def ensure_collection(self):
+        if self.quantization not in ("none", None):
+            log_info(f"Embedded store ignores quantization={self.quantization}; it stores {self.dtype} vectors")
+        if (self.path / "meta.json").exists():
+            log_info(f"Collection {self.collection_name} already exists")
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._dirty = True
+        await self.flush()
+        log_info(f"Embedded collection {self.collection_name} created ({self.dimensions}d {self.dtype}) at {self.path}")
+
+    async def load_collection_config(self):
+        # The stored matrix already determined the vector size when the collection was loaded
+        self.quantization = "none"
+
+    def _reserve(self, rows: int):
+        """Make room for `rows` more rows, growing geometrically; the first write
+        also moves a memory-mapped matrix into a writable in-memory buffer"""
+        needed = self.size + rows
+        if needed <= len(self._vectors) and not isinstance(self._vectors, np.memmap):
+            return
+        capacity = max(needed, 2 * len(self._vectors), 1024)
+        vectors = np.empty((capacity, self.dimensions), dtype=self.dtype)
+        vectors[:self.size] = self._vectors[:self.size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self.size] = self._alive[:self.size]
+        self._vectors = vectors
+        self._alive = alive
+
+    async def upsert(self, points: List[Point]):
+        self._reserve(len(points))
+        for point in points:
+            point_id = str(point.id)
+            vector = np.asarray(point.vector, dtype=np.float32)
+            if vector.shape != (self.dimensions,):
+                raise ValueError(f"Expected a {self.dimensions}d vector for point {point_id}, got {vector.shape}")
+            norm = np.linalg.norm(vector)
+            row = self.rows.get(point_id)
+            if row is None:
+                row = self.size
+                self.rows[point_id] = row
+                self.ids.append(point_id)
+                self.payloads.append(None)
+            self._vectors[row] = vector / norm if norm else vector
+            self._alive[row] = True
+            self.payloads[row] = point.payload
+        self._bitmaps = None
+        self._dirty = True
+
+    def _build_bitmaps(self) -> Dict[str, Dict[Any, np.ndarray]]:
+        """One boolean row mask per value of every indexed payload field"""
+        value_rows: Dict[str, Dict[Any, List[int]]] = {field: {} for field in PAYLOAD_INDEXES}
+        for row, payload in enumerate(self.payloads):
+            if payload is None:
+                continue
+            for field, values in value_rows.items():
+                value = payload.get(field)
+                # Like Qdrant, a list value matches each of its elements
+                for item in value if isinstance(value, list) else [value]:
+                    if item is not None:
+                        values.setdefault(item, []).append(row)
+        bitmaps = {}
+        for field, values in value_rows.items():
+            bitmaps[field] = {}
+            for value, rows in values.items():
+                bitmap = np.zeros(self.size, dtype=bool)
+                bitmap[rows] = True
+                bitmaps[field][value] = bitmap
+        return bitmaps
+
+    def _mask(self, conditions: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Rows that are alive and match every condition"""
+        mask = self._alive[:self.size].copy()
+        if not conditions:
+            return mask
+        if self._bitmaps is None:
+            self._bitmaps = self._build_bitmaps()
+        for field, value in conditions.items():
+            values = value if isinstance(value, list) else [value]
+            if field in self._bitmaps:
+                matches = np.zeros(self.size, dtype=bool)
+                for candidate in values:
+                    bitmap = self._bitmaps[field].get(candidate)
+                    if bitmap is not None:
+                        matches |= bitmap
+            else:
+                # Unindexed field: fall back to scanning the payloads
+                matches = np.fromiter(
+                    (payload is not None and payload.get(field) in values for payload in self.payloads),
+                    dtype=bool,
+                    count=self.size
+                )
+            mask &= matches
+        return mask
+
+    async def search(self, vector: List[float], conditions: Dict[str, Any], limit: int,
+                     exact: bool = False) -> List[SearchHit]:
+        # Search is always exact here, there is no approximate index to bypass
+        limit = limit or 10
+        rows = np.flatnonzero(self._mask(conditions))
+        if not len(rows):
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        if len(rows) == self.size and self.dtype == np.float32:
+            scores = self._vectors[:self.size] @ query
+        else:
+            scores = np.concatenate([
+                self._vectors[rows[i:i + _SCORE_BLOCK_ROWS]].astype(np.float32, copy=False) @ query
+                for i in range(0, len(rows), _SCORE_BLOCK_ROWS)
+            ])
+
+        if limit < len(scores):
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.argsort(-scores)
+        return [
+            SearchHit(self.ids[rows[i]], float(scores[i]), self.payloads[rows[i]])
+            for i in top
+        ]
+
+    async def retrieve(self, ids: List[str], fields: Optional[List[str]] = None) -> Dict[str, Dict]:
+        found = {}
+        for point_id in ids:
+            row = self.rows.get(str(point_id))
+            if row is None:
+                continue
+            payload = self.payloads[row]
+            found[str(point_id)] = {field: payload.get(field) for field in fields} if fields else payload
+        return found
+
+    async def scroll(self, conditions: Optional[Dict[str, Any]] = None, batch_size: int = 256,
+                     with_vectors: bool = False) -> AsyncIterator[List[Point]]:
+        rows = np.flatnonzero(self._mask(conditions))
+        for i in range(0, len(rows), batch_size):
+            yield [
+                Point(
+                    self.ids[row],
+                    self._vectors[row].astype(np.float32).tolist() if with_vectors else None,
+                    self.payloads[row]
+                )
+                for row in rows[i:i + batch_size]
+            ]
+
+    async def delete(self, ids: List[str]):
+        for point_id in ids:
+            row = self.rows.pop(str(point_id), None)
+            if row is not None:
+                self._alive[row] = False
+                self.payloads[row] = None
+        self._bitmaps = None
+        self._dirty = True
+
+    async def delete_by_filter(self, conditions: Dict[str, Any]):
+        await self.delete([self.ids[row] for row in np.flatnonzero(self._mask(conditions))])
+
+    async def count(self, conditions: Optional[Dict[str, Any]] = None) -> int:
+        return int(self._mask(conditions).sum())
+
+    async def flush(self):
+        """Compact away deleted rows and atomically rewrite the collection files"""
+        if not self._dirty:
+            return
+        alive_rows = np.flatnonzero(self._alive[:self.size])
+        vectors = np.ascontiguousarray(self._vectors[alive_rows])
+        ids = [self.ids[row] for row in alive_rows]
+        payloads = [self.payloads[row] for row in alive_rows]
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.path / "vectors.npy.tmp", "wb") as f:
+            np.save(f, vectors)
+        with open(self.path / "points.jsonl.tmp", "w", encoding="utf-8") as f:
+            for point_id, payload in zip(ids, payloads):
+                f.write(json.dumps({"id": point_id, "payload": payload}) + "\n")
+        with open(self.path / "meta.json.tmp", "w", encoding="utf-8") as f:
+            json.dump({"dimensions": self.dimensions, "dtype": self.dtype.name, "count": len(ids)}, f)
+        for name in ("vectors.npy", "points.jsonl", "meta.json"):
+            os.replace(self.path / f"{name}.tmp", self.path / name)
+
+        self.ids = ids
+        self.rows = {point_id: row for row, point_id in enumerate(ids)}
+        self.payloads = payloads
+        self._vectors = vectors
+        self._alive = np.ones(len(ids), dtype=bool)
+        self._bitmaps = None
+        self._dirty = False
+        log_info(f"Saved embedded collection {self.collection_name} ({len(ids)} points) to {self.path}")
@@ -0,0 +1,46 @@
+# embedding_cache.py
+import hashlib
+import unicodedata
+from array import array
+from typing import List, Optional
+from kv_cache import KVCache
+from constants import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MEMORY_SIZE, EMBEDDING_CACHE_MAX_DISK_ENTRIES
+
+
+def normalize_text(text: str) -> str:
+    """Normalize unicode and whitespace so trivially different inputs share a cache entry"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache(KVCache):
+    """Two-tier (in-memory LRU + SQLite) content-addressed embedding cache"""
+
+    TABLE = "embeddings"
+    VALUE_COLUMN = "vector"
+    NAME = "embedding cache"
+
+    def __init__(self, path: Optional[str] = EMBEDDING_CACHE_PATH,
+                 memory_size: int = EMBEDDING_CACHE_MEMORY_SIZE,
+                 max_disk_entries: int = EMBEDDING_CACHE_MAX_DISK_ENTRIES):
+        super().__init__(path, memory_size, max_disk_entries)
+
+    def _create_table(self):
+        super()._create_table()
+        # Superseded by the per-table index
+        self._db.execute("DROP INDEX IF EXISTS idx_last_used")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, dimensions: int, text: str) -> str:
+        """Hash (model, dimensions, normalized text) into a cache key"""
+        raw = f"{model}\x00{dimensions}\x00{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _encode(self, embedding: List[float]) -> bytes:
+        # float32 keeps both tiers at 4 bytes per dimension
+        return array("f", embedding).tobytes()
+
+    def _decode(self, blob: bytes) -> List[float]:
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
@@ -0,0 +1,70 @@
+# ingest_manifest.py
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Set
+from utils import log_info, log_error
+from constants import INGEST_MANIFEST_DIR
+
+
+def file_fingerprint(*paths) -> str:
+    """Hash the bytes of one or more source files"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """
+    Records which sources have been ingested, the fingerprint of their input
+    files and the point IDs they produced, so a re-run only embeds new or
+    changed records and deletes the ones that disappeared.
+    """
+
+    def __init__(self, namespace: str, manifest_dir: str = INGEST_MANIFEST_DIR):
+        self.path = Path(manifest_dir) / f"{namespace}.json"
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                log_error(f"Error reading manifest {self.path}, starting fresh: {e}")
+
+    def is_unchanged(self, key: str, fingerprint: str) -> bool:
+        entry = self.entries.get(key)
+        return bool(entry) and entry.get("fingerprint") == fingerprint
+
+    def indexed_ids(self, key: str) -> Set[str]:
+        """Point IDs recorded for a source by its last completed ingest"""
+        return set(self.entries.get(key, {}).get("point_ids", []))
+
+    def commit(self, key: str, fingerprint: str, point_ids: List[str]):
+        """Mark a source as fully ingested"""
+        self.entries[key] = {"fingerprint": fingerprint, "point_ids": sorted(set(point_ids))}
+        self.save()
+
+    def remove(self, key: str) -> List[str]:
+        """Forget a source and return its point IDs"""
+        entry = self.entries.pop(key, None)
+        self.save()
+        return entry["point_ids"] if entry else []
+
+    def keys(self) -> Set[str]:
+        return set(self.entries)
+
+    def clear(self):
+        self.entries = {}
+        self.save()
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+        log_info(f"Saved ingest manifest {self.path} ({len(self.entries)} sources)")
@@ -1,57 +1,73 @@
 # ingest.py
+import argparse
+import asyncio
 import os
 from pathlib import Path
 import PyPDF2
-from typing import List
-from tqdm import tqdm
+from typing import Iterator, Optional
 from vectordb_manager import VectorDBManager
+from ingestion_pipeline import add_pipeline_arguments, manifest_from_args, pipeline_from_args, rate_limiter_from_args
+from ingest_manifest import file_fingerprint
 from utils import get_file_paths, log_info, log_error
-from constants import TOPICS
+from constants import TOPICS, PAGE_SIZE, CHUNK_SIZE
 
-def read_pdf_content(pdf_path: str) -> str:
-    """Read and extract text from PDF"""
+def iter_pdf_pages(pdf_path: str) -> Iterator[str]:
+    """Lazily extract text from PDF, one page at a time"""
     try:
         with open(pdf_path, 'rb') as file:
             reader = PyPDF2.PdfReader(file)
-            text = ""
             for page in reader.pages:
-                text += page.extract_text() + "\n"
-        return text
+                yield (page.extract_text() or "") + "\n"
     except Exception as e:
+        # Re-raise so a partially read PDF is never recorded as ingested
         log_error(f"Error reading PDF {pdf_path}: {e}")
-        return ""
+        raise
 
-def ingest_topic_content(db_manager: VectorDBManager, topic: str):
-    """Process and ingest content for a topic"""
+def extract_topic_content(topic: str) -> Optional[Iterator[str]]:
+    """Extract stage: stream the topic's PDF pages"""
     log_info(f"\nProcessing topic: {topic}")
     
     # Get paths
     paths = get_file_paths(topic)
-    
-    # Read PDF content
-    content = read_pdf_content(paths["content"])
-    if not content:
+    if not paths or not paths["content"].exists():
         log_error(f"No content found for topic: {topic}")
-        return
+        return None
     
-    # Add to vector database
-    db_manager.add_medical_content(content, topic)
-    log_info(f"Completed processing topic: {topic}")
+    # Pages are read as the chunker consumes them
+    return iter_pdf_pages(paths["content"])
+
+def topic_fingerprint(topic: str) -> str:
+    """Fingerprint of the topic's PDF plus the chunking parameters that shape its records"""
+    return f"{file_fingerprint(get_file_paths(topic)['content'])}:{PAGE_SIZE}:{CHUNK_SIZE}"
+
+async def main():
+    parser = argparse.ArgumentParser(description="Ingest topic PDFs into the vector database")
+    add_pipeline_arguments(parser)
+    args = parser.parse_args()
 
-def main():
     # Initialize VectorDB
     db_manager = VectorDBManager(
         url=os.getenv("QDRANT_URL"),
-        api_key=os.getenv("QDRANT_API_KEY")
+        api_key=os.getenv("QDRANT_API_KEY"),
+        rate_limiter=rate_limiter_from_args(args)
     )
+    await db_manager.create_collection()
     
-    # Process each topic
-    for topic in tqdm(TOPICS, desc="Processing topics"):
-        try:
-            ingest_topic_content(db_manager, topic)
-        except Exception as e:
-            log_error(f"Error processing topic {topic}: {e}")
-            continue
+    # Only new or changed chunks are embedded; chunks that disappeared are deleted
+    manifest = await manifest_from_args(db_manager, "content", args, reset_conditions={"level": [1, 2, 3]})
+
+    # Process all topics concurrently through the pipeline
+    pipeline = pipeline_from_args(db_manager, args)
+    await pipeline.run(
+        TOPICS,
+        extract=extract_topic_content,
+        chunk=lambda topic, pages: db_manager._iter_content_records(pages, topic),
+        desc="Processing topics",
+        manifest=manifest,
+        source_key=lambda topic: topic,
+        fingerprint=topic_fingerprint,
+        force=args.force
+    )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
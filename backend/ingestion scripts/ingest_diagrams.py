@@ -1,9 +1,12 @@
 # backend/ingest_diagrams.py
+import argparse
 import os
 from pathlib import Path
-from typing import Dict, List
-from tqdm import tqdm
+from typing import Dict, List, Optional, Tuple
 from vectordb_manager import VectorDBManager
+from ingestion_pipeline import add_pipeline_arguments, manifest_from_args, pipeline_from_args, rate_limiter_from_args
+from ingest_manifest import file_fingerprint
+from rate_limiter import OpenAIRateLimiter
 from utils import log_info, log_error
 from dotenv import load_dotenv
 import shutil
@@ -11,10 +14,11 @@ import shutil
 load_dotenv()
 
 class DiagramIngester:
-    def __init__(self):
+    def __init__(self, rate_limiter: OpenAIRateLimiter = None):
         self.vectordb = VectorDBManager(
             url=os.getenv("QDRANT_URL"),
-            api_key=os.getenv("QDRANT_API_KEY")
+            api_key=os.getenv("QDRANT_API_KEY"),
+            rate_limiter=rate_limiter
         )
         # Update paths to match your structure
         self.root_dir = Path(__file__).parent.parent  # Gets CHATBOT-APP root
@@ -38,13 +42,13 @@ class DiagramIngester:
                 return prefix.lower().replace(' ', '_')
         return "unknown"
 
-    async def process_topic_diagrams(self, topic: str):
-        """Process all diagrams for a topic"""
+    def list_topic_diagrams(self, topic: str) -> List[Tuple[str, Path]]:
+        """List (topic, png_file) sources for a topic's diagrams"""
         topic_path = self.data_path / topic
         
         if not topic_path.exists():
             log_error(f"Topic path not found: {topic_path}")
-            return
+            return []
 
         log_info(f"Processing diagrams for topic: {topic}")
         
@@ -52,51 +56,70 @@ class DiagramIngester:
         public_diagrams_path = self.public_path / "diagrams" / topic
         public_diagrams_path.mkdir(parents=True, exist_ok=True)
         
-        # Get all PNG files
-        png_files = list(topic_path.glob("*.png"))
-        
-        for png_file in tqdm(png_files, desc=f"Processing {topic} diagrams"):
-            # Check if it's a diagram file
-            if not any(png_file.name.startswith(prefix) for prefix in self.VALID_PREFIXES):
-                continue
-
-            # Get corresponding description file
-            desc_file = png_file.with_suffix('.txt')
-            if not desc_file.exists():
-                log_error(f"Description file not found for {png_file}")
-                continue
-
-            # Read description
-            description = self.read_description_file(str(desc_file))
-            if not description:
-                continue
-
-            # Prepare paths
-            relative_path = f"/diagrams/{topic}/{png_file.name}"
-            target_path = public_diagrams_path / png_file.name
-
-            # Copy image to public folder
-            try:
-                shutil.copy2(png_file, target_path)
-                log_info(f"Copied {png_file.name} to public folder")
-            except Exception as e:
-                log_error(f"Error copying file: {e}")
-                continue
-
-            # Store in vector database
-            try:
-                await self.vectordb.add_diagram(
-                    image_path=relative_path,
-                    description=description,
-                    topic=topic,
-                    diagram_type=self.get_diagram_type(png_file.name)
-                )
-                log_info(f"Added diagram {png_file.name} to vector database")
-            except Exception as e:
-                log_error(f"Error adding diagram to vector database: {e}")
+        # Get all PNG files that are diagrams
+        return [
+            (topic, png_file) for png_file in topic_path.glob("*.png")
+            if any(png_file.name.startswith(prefix) for prefix in self.VALID_PREFIXES)
+        ]
+
+    def extract_diagram(self, source: Tuple[str, Path]) -> Optional[Dict]:
+        """Extract stage: read the description and publish the image"""
+        topic, png_file = source
+
+        # Get corresponding description file
+        desc_file = png_file.with_suffix('.txt')
+        if not desc_file.exists():
+            log_error(f"Description file not found for {png_file}")
+            return None
+
+        # Read description
+        description = self.read_description_file(str(desc_file))
+        if not description:
+            return None
+
+        # Prepare paths
+        relative_path = f"/diagrams/{topic}/{png_file.name}"
+        target_path = self.public_path / "diagrams" / topic / png_file.name
+
+        # Copy image to public folder
+        try:
+            shutil.copy2(png_file, target_path)
+            log_info(f"Copied {png_file.name} to public folder")
+        except Exception as e:
+            log_error(f"Error copying file: {e}")
+            return None
+
+        return {"image_path": relative_path, "description": description}
+
+    def diagram_key(self, source: Tuple[str, Path]) -> str:
+        topic, png_file = source
+        return f"{topic}/{png_file.name}"
+
+    def diagram_fingerprint(self, source: Tuple[str, Path]) -> str:
+        """Fingerprint of the image and its description file"""
+        topic, png_file = source
+        desc_file = png_file.with_suffix('.txt')
+        if not desc_file.exists():
+            return file_fingerprint(png_file)
+        return file_fingerprint(png_file, desc_file)
+
+    def build_diagram_records(self, source: Tuple[str, Path], diagram: Dict) -> List[Dict]:
+        """Chunk stage: one record per diagram"""
+        topic, png_file = source
+        return [self.vectordb._build_diagram_record(
+            image_path=diagram["image_path"],
+            description=diagram["description"],
+            topic=topic,
+            diagram_type=self.get_diagram_type(png_file.name)
+        )]
 
 async def main():
-    ingester = DiagramIngester()
+    parser = argparse.ArgumentParser(description="Ingest diagrams into the vector database")
+    add_pipeline_arguments(parser)
+    args = parser.parse_args()
+
+    ingester = DiagramIngester(rate_limiter=rate_limiter_from_args(args))
+    await ingester.vectordb.create_collection()
     
     topics = [
         "tuberculosis",
@@ -106,13 +129,23 @@ async def main():
         "lumbar_disc_herniation"
     ]
 
+    sources = []
     for topic in topics:
-        try:
-            await ingester.process_topic_diagrams(topic)
-        except Exception as e:
-            log_error(f"Error processing topic {topic}: {e}")
-            continue
+        sources.extend(ingester.list_topic_diagrams(topic))
+
+    manifest = await manifest_from_args(ingester.vectordb, "diagrams", args, reset_conditions={"content_type": "diagram"})
+    pipeline = pipeline_from_args(ingester.vectordb, args)
+    await pipeline.run(
+        sources,
+        extract=ingester.extract_diagram,
+        chunk=ingester.build_diagram_records,
+        desc="Processing diagrams",
+        manifest=manifest,
+        source_key=ingester.diagram_key,
+        fingerprint=ingester.diagram_fingerprint,
+        force=args.force
+    )
 
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -1,9 +1,12 @@
 # ingest_videos.py
+import argparse
 import os
 from pathlib import Path
 from typing import Dict, List, Optional
-from tqdm import tqdm
 from vectordb_manager import VectorDBManager
+from ingestion_pipeline import add_pipeline_arguments, manifest_from_args, pipeline_from_args, rate_limiter_from_args
+from ingest_manifest import file_fingerprint
+from rate_limiter import OpenAIRateLimiter
 from utils import log_info, log_error
 from dotenv import load_dotenv
 from typing import Any
@@ -11,16 +14,17 @@ from typing import Any
 load_dotenv()
 
 class VideoIngester:
-    def __init__(self):
+    def __init__(self, rate_limiter: OpenAIRateLimiter = None):
         self.vectordb = VectorDBManager(
             url=os.getenv("QDRANT_URL"),
-            api_key=os.getenv("QDRANT_API_KEY")
+            api_key=os.getenv("QDRANT_API_KEY"),
+            rate_limiter=rate_limiter
         )
         # Update base_path to point to Data in root directory
         self.base_path = Path(__file__).parent.parent / "Data"  # This will go up one level from backend to root
 
-    async def process_topic_videos(self, topic: str):
-        """Process videos for a topic"""
+    def extract_topic_videos(self, topic: str) -> Optional[Dict[str, Any]]:
+        """Extract stage: parse the topic's Video.txt"""
         topic_path = self.base_path / topic
         video_file = topic_path / "Video.txt"
         
@@ -29,36 +33,38 @@ class VideoIngester:
         
         if not video_file.exists():
             log_info(f"No video file found for topic: {topic} at path: {video_file}")
-            return
+            return None
 
-        video_data = self.parse_video_file(str(video_file))
-        if not video_data:
-            return
+        return self.parse_video_file(str(video_file))
 
-        # Create embeddings for each language version if available
-        try:
-            description = video_data["description"]
-            if video_data["urdu_url"]:
-                await self.vectordb.add_video(
-                    url=video_data["urdu_url"],
-                    description=description,
-                    topic=topic,
-                    language="urdu"
-                )
-                print(f"Added Urdu video for {topic}")
-
-            if video_data["english_url"]:
-                await self.vectordb.add_video(
-                    url=video_data["english_url"],
-                    description=description,
-                    topic=topic,
-                    language="english"
-                )
-                print(f"Added English video for {topic}")
-
-            log_info(f"Processed videos for topic: {topic}")
-        except Exception as e:
-            log_error(f"Error processing videos for topic {topic}: {e}")
+    def video_fingerprint(self, topic: str) -> str:
+        video_file = self.base_path / topic / "Video.txt"
+        if not video_file.exists():
+            return ""
+        return file_fingerprint(video_file)
+
+    def build_video_records(self, topic: str, video_data: Dict[str, Any]) -> List[Dict]:
+        """Chunk stage: one record for each language version available"""
+        records = []
+        description = video_data["description"]
+        if video_data["urdu_url"]:
+            records.append(self.vectordb._build_video_record(
+                url=video_data["urdu_url"],
+                description=description,
+                topic=topic,
+                language="urdu"
+            ))
+
+        if video_data["english_url"]:
+            records.append(self.vectordb._build_video_record(
+                url=video_data["english_url"],
+                description=description,
+                topic=topic,
+                language="english"
+            ))
+
+        log_info(f"Processed videos for topic: {topic}")
+        return records
 
     def parse_video_file(self, file_path: str) -> Dict[str, Any]:
         """Parse video.txt file to extract description and URLs"""
@@ -99,7 +105,12 @@ class VideoIngester:
     
 
 async def main():
-    ingester = VideoIngester()
+    parser = argparse.ArgumentParser(description="Ingest videos into the vector database")
+    add_pipeline_arguments(parser)
+    args = parser.parse_args()
+
+    ingester = VideoIngester(rate_limiter=rate_limiter_from_args(args))
+    await ingester.vectordb.create_collection()
     
     topics = [
         "tuberculosis",
@@ -109,13 +120,19 @@ async def main():
         "lumbar_disc_herniation"
     ]
 
-    for topic in tqdm(topics):
-        try:
-            await ingester.process_topic_videos(topic)
-        except Exception as e:
-            log_error(f"Error processing topic {topic}: {e}")
-            continue
+    manifest = await manifest_from_args(ingester.vectordb, "videos", args, reset_conditions={"content_type": "video"})
+    pipeline = pipeline_from_args(ingester.vectordb, args)
+    await pipeline.run(
+        topics,
+        extract=ingester.extract_topic_videos,
+        chunk=ingester.build_video_records,
+        desc="Processing videos",
+        manifest=manifest,
+        source_key=lambda topic: topic,
+        fingerprint=ingester.video_fingerprint,
+        force=args.force
+    )
 
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,176 @@
+# migrate_collection.py
+"""
+Re-project an existing collection into a new one with shorter embeddings
+and/or vector quantization, then report what the change costs in recall.
+
+text-embedding-3 embeddings are shortened by truncating and re-normalizing
+them (which is what the API's `dimensions` parameter does), so nothing is
+re-embedded. Point IDs and payloads are copied unchanged.
+
+    python migrate_collection.py --target medical_content_1024 --dimensions 1024 --quantization scalar
+
+Afterwards point the app at the new collection with QDRANT_COLLECTION,
+EMBEDDING_DIMENSIONS and VECTOR_QUANTIZATION. Source and target may live in
+different backends, e.g. to export Qdrant into the embedded store:
+
+    python migrate_collection.py --target medical_content --target-backend embedded
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Dict, List, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from vectordb_manager import VectorDBManager
+from vector_store import Point
+from embedding_cache import EmbeddingCache
+from utils import log_info
+from constants import COLLECTION_NAME, VECTOR_SIZE, QUANTIZATION, VECTOR_BACKEND, UPSERT_BATCH_SIZE
+
+load_dotenv()
+
+
+def reproject(vector: List[float], dimensions: int) -> List[float]:
+    """Shorten an embedding to its first `dimensions` components and re-normalize"""
+    shortened = np.asarray(vector[:dimensions], dtype=np.float32)
+    norm = np.linalg.norm(shortened)
+    return (shortened / norm if norm else shortened).tolist()
+
+
+async def copy_points(source: VectorDBManager, target: VectorDBManager) -> int:
+    copied = 0
+    async for points in source.store.scroll(batch_size=UPSERT_BATCH_SIZE, with_vectors=True):
+        await target._upsert_points([
+            Point(point.id, reproject(point.vector, target.dimensions), point.payload)
+            for point in points
+        ])
+        copied += len(points)
+        log_info(f"Copied {copied} points")
+    await target.flush()
+    return copied
+
+
+async def sample_chunk_points(source: VectorDBManager, count: int, seed: int) -> List:
+    """Random level-3 points whose stored vectors serve as realistic queries"""
+    chunks = []
+    async for points in source.store.scroll({"level": 3}, batch_size=UPSERT_BATCH_SIZE, with_vectors=True):
+        chunks.extend(points)
+    random.Random(seed).shuffle(chunks)
+    return chunks[:count]
+
+
+async def timed_search(db: VectorDBManager, vector: List[float], limit: int, exact: bool = False) -> Tuple[List[str], float]:
+    started = time.perf_counter()
+    hits = await db.store.search(vector, {"level": 3}, limit, exact=exact)
+    return [hit.id for hit in hits], (time.perf_counter() - started) * 1000
+
+
+def footprint(dimensions: int, quantization: str, points: int) -> Dict:
+    """Approximate vector storage, and what has to stay in RAM for search"""
+    original = dimensions * 4
+    quantized = {"scalar": dimensions, "binary": dimensions / 8}.get(quantization, 0)
+    return {
+        "dimensions": dimensions,
+        "quantization": quantization,
+        "bytes_per_point": original + quantized,
+        "search_ram_bytes_per_point": quantized or original,
+        "vector_storage_mb": round(points * (original + quantized) / 2 ** 20, 2),
+        "search_ram_mb": round(points * (quantized or original) / 2 ** 20, 2)
+    }
+
+
+async def recall_report(source: VectorDBManager, target: VectorDBManager, queries: int, k: int, seed: int) -> Dict:
+    """Compare target results with exact search over the original vectors"""
+    recalls = []
+    source_latency = []
+    target_latency = []
+    for point in await sample_chunk_points(source, queries, seed):
+        query_id = point.id
+        truth, _ = await timed_search(source, point.vector, k + 1, exact=True)
+        _, source_ms = await timed_search(source, point.vector, k + 1)
+        found, target_ms = await timed_search(target, reproject(point.vector, target.dimensions), k + 1)
+        # The query point always matches itself, so leave it out of both lists
+        truth = [point_id for point_id in truth if point_id != query_id][:k]
+        found = [point_id for point_id in found if point_id != query_id][:k]
+        if truth:
+            recalls.append(len(set(truth) & set(found)) / len(truth))
+        source_latency.append(source_ms)
+        target_latency.append(target_ms)
+
+    source_count = await source.store.count()
+    target_count = await target.store.count()
+    return {
+        "queries": len(recalls),
+        "k": k,
+        f"recall@{k}": round(float(np.mean(recalls)), 4) if recalls else None,
+        "source": {
+            "collection": source.collection_name,
+            "points": source_count,
+            "latency_p50_ms": round(float(np.percentile(source_latency, 50)), 3) if source_latency else None,
+            "latency_p95_ms": round(float(np.percentile(source_latency, 95)), 3) if source_latency else None,
+            **footprint(source.dimensions, source.quantization, source_count)
+        },
+        "target": {
+            "collection": target.collection_name,
+            "points": target_count,
+            "latency_p50_ms": round(float(np.percentile(target_latency, 50)), 3) if target_latency else None,
+            "latency_p95_ms": round(float(np.percentile(target_latency, 95)), 3) if target_latency else None,
+            **footprint(target.dimensions, target.quantization, target_count)
+        }
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Re-project a collection to shorter and/or quantized vectors")
+    parser.add_argument("--source", default=COLLECTION_NAME)
+    parser.add_argument("--target", required=True)
+    parser.add_argument("--source-backend", choices=["qdrant", "embedded"], default=VECTOR_BACKEND)
+    parser.add_argument("--target-backend", choices=["qdrant", "embedded"], default=VECTOR_BACKEND)
+    parser.add_argument("--dimensions", type=int, default=VECTOR_SIZE)
+    parser.add_argument("--quantization", choices=["none", "scalar", "binary"], default=QUANTIZATION)
+    parser.add_argument("--queries", type=int, default=200, help="Sampled chunks used as recall queries")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--skip-copy", action="store_true", help="Only compare two existing collections")
+    parser.add_argument("--report", help="Write the recall/footprint report as JSON to this path")
+    args = parser.parse_args()
+
+    url = os.getenv("QDRANT_URL")
+    api_key = os.getenv("QDRANT_API_KEY")
+    source = VectorDBManager(
+        url, api_key,
+        embedding_cache=EmbeddingCache(path=None),
+        collection_name=args.source,
+        backend=args.source_backend
+    )
+    await source.store.load_collection_config()
+    source.dimensions = source.store.dimensions
+    source.quantization = source.store.quantization
+    if args.dimensions > source.dimensions:
+        parser.error(f"Cannot project {source.dimensions}d vectors up to {args.dimensions}d")
+
+    target = VectorDBManager(
+        url, api_key,
+        embedding_cache=EmbeddingCache(path=None),
+        collection_name=args.target,
+        dimensions=args.dimensions,
+        quantization=args.quantization,
+        backend=args.target_backend
+    )
+    if not args.skip_copy:
+        await target.create_collection()
+        copied = await copy_points(source, target)
+        log_info(f"Re-projected {copied} points from {args.source} into {args.target}")
+    await target.store.wait_until_indexed()
+
+    report = await recall_report(source, target, args.queries, args.k, args.seed)
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    asyncio.run(main())
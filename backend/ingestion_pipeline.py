@@ -0,0 +1,263 @@
+# ingestion_pipeline.py
+import argparse
+import asyncio
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+from tqdm import tqdm
+from vectordb_manager import VectorDBManager
+from rate_limiter import OpenAIRateLimiter
+from ingest_manifest import IngestManifest
+from utils import log_info, log_error, batched
+from constants import (
+    OPENAI_EMBEDDING_RPM, OPENAI_EMBEDDING_TPM,
+    INGEST_EXTRACT_CONCURRENCY, INGEST_CHUNK_CONCURRENCY, INGEST_EMBED_CONCURRENCY,
+    INGEST_UPSERT_CONCURRENCY, INGEST_QUEUE_SIZE, INGEST_EMBED_BATCH_SIZE
+)
+
+# Sentinel telling a stage worker that its input is exhausted
+_DONE = object()
+
+
+class IngestionPipeline:
+    """
+    extract -> chunk -> embed -> upsert, each stage running its own pool of
+    workers connected by bounded queues.
+
+    `extract(source)` turns a source (topic, file, ...) into raw data and
+    `chunk(source, data)` turns that into an iterable of records
+    ({"id", "text", "payload"}). Both run in worker threads since PDF parsing
+    and file I/O block, while the embed and upsert stages await the async
+    OpenAI and Qdrant clients. Records are pulled a batch at a time, so a lazy
+    extractor/chunker keeps memory flat regardless of source size.
+
+    With a manifest, sources whose fingerprint is unchanged are skipped,
+    only records whose IDs are not yet indexed are embedded, and points that
+    a source (or a vanished source) no longer produces are deleted once its
+    replacements are all upserted.
+    """
+
+    def __init__(self, vectordb: VectorDBManager,
+                 extract_concurrency: int = INGEST_EXTRACT_CONCURRENCY,
+                 chunk_concurrency: int = INGEST_CHUNK_CONCURRENCY,
+                 embed_concurrency: int = INGEST_EMBED_CONCURRENCY,
+                 upsert_concurrency: int = INGEST_UPSERT_CONCURRENCY,
+                 queue_size: int = INGEST_QUEUE_SIZE,
+                 batch_size: int = INGEST_EMBED_BATCH_SIZE):
+        self.vectordb = vectordb
+        self.concurrency = {
+            "extract": extract_concurrency,
+            "chunk": chunk_concurrency,
+            "embed": embed_concurrency,
+            "upsert": upsert_concurrency
+        }
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.stats = {"sources": 0, "unchanged": 0, "records": 0, "points": 0, "deleted": 0, "errors": 0}
+
+    async def run(self, sources: Iterable[Any], extract: Callable[[Any], Any],
+                  chunk: Callable[[Any, Any], Iterable[Dict[str, Any]]], desc: str = "Ingesting",
+                  manifest: IngestManifest = None, source_key: Callable[[Any], str] = None,
+                  fingerprint: Callable[[Any], str] = None, force: bool = False) -> Dict:
+        """Push every source through the pipeline and return run statistics"""
+        started = time.monotonic()
+        seen_keys = set()
+        pending = {}  # source key -> fingerprint, point IDs and outstanding batches
+        chunk_queue = asyncio.Queue(self.queue_size)
+        embed_queue = asyncio.Queue(self.queue_size)
+        upsert_queue = asyncio.Queue(self.queue_size)
+        source_queue = asyncio.Queue(self.queue_size)
+        progress = tqdm(desc=desc, unit="points")
+
+        async def finish_batch(key, failed=False):
+            """Once all of a source's batches are upserted, delete the points it no
+            longer produces and commit it to the manifest. A failed source keeps
+            its old points, since nothing has replaced them."""
+            state = pending.get(key)
+            if state is None:
+                return
+            state["failed"] = state["failed"] or failed
+            state["batches"] -= 1
+            if state["batches"] > 0:
+                return
+            del pending[key]
+            if state["failed"]:
+                return
+            if state["stale_ids"]:
+                await self.vectordb.delete_points(state["stale_ids"])
+                self.stats["deleted"] += len(state["stale_ids"])
+            manifest.commit(key, state["fingerprint"], state["point_ids"])
+
+        async def extract_stage(source):
+            key = source_fingerprint = None
+            if manifest is not None:
+                key = source_key(source)
+                seen_keys.add(key)
+                source_fingerprint = await asyncio.to_thread(fingerprint, source)
+                if not force and manifest.is_unchanged(key, source_fingerprint):
+                    self.stats["unchanged"] += 1
+                    return
+            data = await asyncio.to_thread(extract, source)
+            if not data:
+                return
+            self.stats["sources"] += 1
+            yield (source, key, source_fingerprint, data)
+
+        async def chunk_stage(item):
+            source, key, source_fingerprint, data = item
+            records = await asyncio.to_thread(chunk, source, data)
+            batches = batched(records, self.batch_size)
+            if manifest is None:
+                while batch := await asyncio.to_thread(next, batches, None):
+                    self.stats["records"] += len(batch)
+                    yield (key, batch)
+                return
+
+            indexed = manifest.indexed_ids(key)
+            point_ids = []
+            # Hold one batch open so the source can't be committed while still chunking
+            pending[key] = {
+                "fingerprint": source_fingerprint,
+                "point_ids": point_ids,
+                "stale_ids": [],
+                "batches": 1,
+                "failed": False
+            }
+            failed = False
+            try:
+                while batch := await asyncio.to_thread(next, batches, None):
+                    point_ids.extend(record["id"] for record in batch)
+                    if not force:
+                        batch = [record for record in batch if record["id"] not in indexed]
+                    if not batch:
+                        continue
+                    pending[key]["batches"] += 1
+                    self.stats["records"] += len(batch)
+                    yield (key, batch)
+
+                pending[key]["stale_ids"] = sorted(indexed - set(point_ids))
+            except Exception:
+                failed = True
+                raise
+            finally:
+                await finish_batch(key, failed=failed)
+
+        async def embed_stage(item):
+            key, records = item
+            texts = [record["text"] for record in records]
+            try:
+                embeddings = await self.vectordb.generate_embeddings(texts)
+            except Exception:
+                await finish_batch(key, failed=True)
+                raise
+            yield (key, records, embeddings)
+
+        async def upsert_stage(item):
+            key, records, embeddings = item
+            points = self.vectordb._build_points(records, embeddings)
+            try:
+                await self.vectordb._upsert_points(points)
+            except Exception:
+                await finish_batch(key, failed=True)
+                raise
+            self.stats["points"] += len(points)
+            progress.update(len(points))
+            await finish_batch(key)
+
+        try:
+            await asyncio.gather(
+                self._feed(sources, source_queue),
+                self._stage("extract", extract_stage, source_queue, chunk_queue, "chunk"),
+                self._stage("chunk", chunk_stage, chunk_queue, embed_queue, "embed"),
+                self._stage("embed", embed_stage, embed_queue, upsert_queue, "upsert"),
+                self._stage("upsert", upsert_stage, upsert_queue, None, None)
+            )
+        finally:
+            progress.close()
+
+        if manifest is not None:
+            # Sources that no longer exist leave stale points behind; forget them
+            # only once their points are gone, so a failed delete is retried next run
+            for key in manifest.keys() - seen_keys:
+                stale_ids = sorted(manifest.indexed_ids(key))
+                await self.vectordb.delete_points(stale_ids)
+                manifest.remove(key)
+                self.stats["deleted"] += len(stale_ids)
+                log_info(f"Removed {len(stale_ids)} points for vanished source: {key}")
+
+        await self.vectordb.flush()
+        self.stats["seconds"] = round(time.monotonic() - started, 2)
+        log_info(f"{desc} finished: {self.stats}")
+        return self.stats
+
+    async def _feed(self, sources: Iterable[Any], outbox: asyncio.Queue):
+        for source in sources:
+            await outbox.put(source)
+        for _ in range(self.concurrency["extract"]):
+            await outbox.put(_DONE)
+
+    async def _stage(self, name: str, handler: Callable, inbox: asyncio.Queue,
+                     outbox: Optional[asyncio.Queue], next_stage: Optional[str]):
+        """Run `concurrency[name]` workers until the inbox is drained, then
+        signal every worker of the next stage to stop. Handlers are async
+        generators whose outputs are queued as soon as they are produced,
+        except for the final stage whose handler is a plain coroutine."""
+        async def worker():
+            while True:
+                item = await inbox.get()
+                if item is _DONE:
+                    return
+                try:
+                    if outbox is None:
+                        await handler(item)
+                        continue
+                    async for output in handler(item):
+                        await outbox.put(output)
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    log_error(f"Ingestion {name} stage failed: {e}")
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency[name])))
+        if outbox is not None:
+            for _ in range(self.concurrency[next_stage]):
+                await outbox.put(_DONE)
+
+
+def add_pipeline_arguments(parser: argparse.ArgumentParser):
+    """Command line options shared by the ingestion scripts"""
+    parser.add_argument("--extract-concurrency", type=int, default=INGEST_EXTRACT_CONCURRENCY)
+    parser.add_argument("--chunk-concurrency", type=int, default=INGEST_CHUNK_CONCURRENCY)
+    parser.add_argument("--embed-concurrency", type=int, default=INGEST_EMBED_CONCURRENCY)
+    parser.add_argument("--upsert-concurrency", type=int, default=INGEST_UPSERT_CONCURRENCY)
+    parser.add_argument("--queue-size", type=int, default=INGEST_QUEUE_SIZE)
+    parser.add_argument("--batch-size", type=int, default=INGEST_EMBED_BATCH_SIZE)
+    parser.add_argument("--rpm", type=int, default=OPENAI_EMBEDDING_RPM, help="Embeddings requests per minute")
+    parser.add_argument("--tpm", type=int, default=OPENAI_EMBEDDING_TPM, help="Embeddings tokens per minute")
+    parser.add_argument("--force", action="store_true", help="Re-embed and upsert every source, ignoring the manifest")
+    parser.add_argument("--reset", action="store_true",
+                        help="Delete all previously ingested points of this kind (including ones with legacy random IDs) first")
+
+
+def rate_limiter_from_args(args: argparse.Namespace) -> OpenAIRateLimiter:
+    return OpenAIRateLimiter(requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+
+
+async def manifest_from_args(vectordb: VectorDBManager, namespace: str, args: argparse.Namespace,
+                       reset_conditions: Dict[str, Any]) -> IngestManifest:
+    """Load the script's manifest, wiping it and the matching points on --reset"""
+    manifest = IngestManifest(namespace)
+    if args.reset:
+        await vectordb.delete_by_filter(reset_conditions)
+        manifest.clear()
+    return manifest
+
+
+def pipeline_from_args(vectordb: VectorDBManager, args: argparse.Namespace) -> IngestionPipeline:
+    return IngestionPipeline(
+        vectordb,
+        extract_concurrency=args.extract_concurrency,
+        chunk_concurrency=args.chunk_concurrency,
+        embed_concurrency=args.embed_concurrency,
+        upsert_concurrency=args.upsert_concurrency,
+        queue_size=args.queue_size,
+        batch_size=args.batch_size
+    )
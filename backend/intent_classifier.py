@@ -0,0 +1,128 @@
+# intent_classifier.py
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+from vectordb_manager import VectorDBManager
+from utils import log_info, log_error
+from constants import (
+    INTENT_EXAMPLES,
+    INTENT_RULE_MAX_WORDS,
+    INTENT_RULE_CONFIDENCE,
+    INTENT_PROTOTYPE_THRESHOLD,
+    INTENT_PROTOTYPE_MARGIN,
+    INTENT_PROTOTYPE_CONFIDENCE
+)
+
+# Unambiguous requests for each resource: an imperative ("show me a diagram
+# of ...", "quiz me on ...") or "can I see/have ...", at the start of the message
+_POLITE = r"^((can|could|would|will) you )?(please )?"
+_ARTICLE = r"(an? |some |another |more |the )?"
+INTENT_REQUESTS = {
+    "mcq": re.compile(
+        _POLITE + r"(quiz me|test (me|my knowledge)"
+        r"|(give|send|ask) me " + _ARTICLE + r"(mcqs?|multiple[- ]choice questions?|practice questions?|quiz(zes)?))\b"
+        r"|^(can|could|may) i (have|get|try) " + _ARTICLE + r"(mcqs?|multiple[- ]choice questions?|practice questions?|quiz(zes)?)\b"
+    ),
+    "video": re.compile(
+        _POLITE + r"(show|give|send|find|play) me " + _ARTICLE + r"(videos?|clips?|video lectures?)\b"
+        r"|^(can|could|may) i (see|watch|have|get) " + _ARTICLE + r"(videos?|clips?|video lectures?)\b"
+    ),
+    "diagram": re.compile(
+        _POLITE + r"(show|give|send|find|draw) me " + _ARTICLE + r"(diagrams?|illustrations?|pictures?|images?|figures?|charts?|flowcharts?|schematics?)\b"
+        r"|^(can|could|may) i (see|have|get) " + _ARTICLE + r"(diagrams?|illustrations?|pictures?|images?|figures?|charts?|flowcharts?|schematics?)\b"
+    )
+}
+# Words that name each kind of resource (or ask to be tested); a request rule only
+# fires when one kind is named, and a message naming none is not a request at all
+INTENT_KEYWORDS = {
+    "mcq": re.compile(r"\b(mcqs?|quiz\w*|multiple[- ]choice|questions?|test (me|my)|ask me)\b"),
+    "video": re.compile(r"\b(videos?|clips?|watch|youtube|lectures?)\b"),
+    "diagram": re.compile(r"\b(diagrams?|illustrations?|pictures?|images?|figures?|charts?|drawings?|flowcharts?|schematics?|visuals?)\b")
+}
+# Asking about a resource rather than for one ("explain the video", "what does the diagram show")
+EXPLANATION = re.compile(r"\b(explain\w*|describ\w*|interpret\w*|mean\w*|what (does|do|is|are)\b.*\bshow\w*)\b")
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class IntentClassifier:
+    """
+    Local first stage for ChatManager.classify_message_intent. Messages
+    that name no resource are "none", and short, unambiguous requests
+    ("show me a diagram of ...", "quiz me on ...") are that intent, neither
+    needing a model call. Anything else, including questions about a
+    resource, is matched against embeddings of INTENT_EXAMPLES. Anything
+    still ambiguous returns None so the caller asks the LLM.
+    """
+
+    def __init__(self, vectordb: VectorDBManager, examples: Dict[str, List[str]] = INTENT_EXAMPLES):
+        self.vectordb = vectordb
+        self.examples = examples
+        self._prototypes: Optional[List[Tuple[str, List[float]]]] = None
+        self._stats = {"rule": 0, "prototype": 0, "llm": 0, "llm_errors": 0}
+
+    def classify_by_rules(self, message: str) -> Optional[Dict]:
+        """"none" for a message naming no resource, the intent of an
+        unambiguous request, or None to look further"""
+        text = " ".join(re.findall(r"[a-z0-9'-]+", message.lower()))
+        named = [intent for intent, pattern in INTENT_KEYWORDS.items() if pattern.search(text)]
+        if not named:
+            # Most turns are ordinary questions; settle them without a model call
+            return {"success": True, "intent": "none", "confidence": INTENT_RULE_CONFIDENCE, "source": "rule"}
+        if len(text.split()) > INTENT_RULE_MAX_WORDS or EXPLANATION.search(text):
+            return None
+        if len(named) != 1 or not INTENT_REQUESTS[named[0]].search(text):
+            return None
+        return {"success": True, "intent": named[0], "confidence": INTENT_RULE_CONFIDENCE, "source": "rule"}
+
+    async def _load_prototypes(self) -> List[Tuple[str, List[float]]]:
+        if self._prototypes is None:
+            labelled = [(intent, phrase) for intent, phrases in self.examples.items() for phrase in phrases]
+            vectors = await self.vectordb.generate_embeddings([phrase for _, phrase in labelled])
+            self._prototypes = [(intent, vector) for (intent, _), vector in zip(labelled, vectors)]
+            log_info(f"Embedded {len(self._prototypes)} intent examples")
+        return self._prototypes
+
+    async def classify_by_prototype(self, message: str) -> Optional[Dict]:
+        """Nearest example phrase, if it is close enough and clearly ahead of other intents"""
+        prototypes = await self._load_prototypes()
+        vector = await self.vectordb.generate_embedding(message)
+        best: Dict[str, float] = {}
+        for intent, prototype in prototypes:
+            best[intent] = max(best.get(intent, -1.0), _cosine(vector, prototype))
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        (intent, score), runner_up = ranked[0], (ranked[1][1] if len(ranked) > 1 else -1.0)
+        if score >= INTENT_PROTOTYPE_THRESHOLD and score - runner_up >= INTENT_PROTOTYPE_MARGIN:
+            return {"success": True, "intent": intent, "confidence": INTENT_PROTOTYPE_CONFIDENCE, "source": "prototype"}
+        return None
+
+    async def classify(self, message: str) -> Optional[Dict]:
+        """Intent result in classify_message_intent's format, or None to escalate to the LLM"""
+        result = self.classify_by_rules(message)
+        if result is None:
+            try:
+                result = await self.classify_by_prototype(message)
+            except Exception as e:
+                log_error(f"Error matching intent examples: {e}")
+                result = None
+
+        if result is None:
+            self._stats["llm"] += 1
+        else:
+            self._stats[result["source"]] += 1
+        return result
+
+    def record_llm_error(self):
+        self._stats["llm_errors"] += 1
+
+    def stats(self) -> Dict:
+        """How often each classification path answered"""
+        total = self._stats["rule"] + self._stats["prototype"] + self._stats["llm"]
+        return {
+            **self._stats,
+            "local_rate": 1 - self._stats["llm"] / total if total else 0.0
+        }
@@ -0,0 +1,216 @@
+# kv_cache.py
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from utils import log_info, log_error
+
+# SQLite limits bound parameters per statement, so batch lookups in slices
+_SQL_BATCH = 500
+
+
+class KVCache:
+    """
+    Two-tier (in-memory LRU + SQLite) key-value cache. Entries may expire;
+    the disk tier is bounded by least-recently-used eviction.
+
+    Subclasses name the SQLite table and value column and convert values
+    to and from what is stored (`_encode`/`_decode`). Every method takes a
+    lock and the disk tier blocks, so async callers go through
+    asyncio.to_thread.
+    """
+
+    TABLE = "entries"
+    VALUE_COLUMN = "value"
+    NAME = "cache"
+
+    def __init__(self, path: Optional[str], memory_size: int, max_disk_entries: int):
+        self.memory_size = memory_size
+        self.max_disk_entries = max_disk_entries
+        # key -> (stored value, expires_at or None)
+        self._memory: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0
+        }
+        self._db = None
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._create_table()
+                log_info(f"{self.NAME[0].upper()}{self.NAME[1:]} opened at {path}")
+            except sqlite3.Error as e:
+                log_error(f"Error opening {self.NAME} {path}, using memory only: {e}")
+                self._db = None
+
+    def _create_table(self):
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+            f"key TEXT PRIMARY KEY, {self.VALUE_COLUMN} BLOB NOT NULL, expires_at REAL, last_used REAL NOT NULL)"
+        )
+        # Tables written before entries could expire have no expires_at column
+        columns = {row[1] for row in self._db.execute(f"PRAGMA table_info({self.TABLE})")}
+        if "expires_at" not in columns:
+            self._db.execute(f"ALTER TABLE {self.TABLE} ADD COLUMN expires_at REAL")
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE}_last_used ON {self.TABLE}(last_used)")
+        self._db.commit()
+
+    def _encode(self, value: Any) -> Any:
+        """Value as stored in memory and in the SQLite value column"""
+        return value
+
+    def _decode(self, stored: Any) -> Any:
+        """Stored value as returned to callers"""
+        return stored
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Look up keys in memory, then on disk; returns only the unexpired keys that were found"""
+        found = {}
+        seen = set()
+        disk_lookups = []
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                if key in seen:
+                    continue
+                seen.add(key)
+                entry = self._memory.get(key)
+                if entry is not None and entry[1] is not None and entry[1] <= now:
+                    del self._memory[key]
+                    if self._db is None:
+                        # Otherwise counted when the disk copy is found expired too
+                        self._stats["expired"] += 1
+                    entry = None
+                if entry is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = self._decode(entry[0])
+                    self._stats["memory_hits"] += 1
+                else:
+                    disk_lookups.append(key)
+
+            if disk_lookups and self._db is not None:
+                disk_found = self._read_disk(disk_lookups, now)
+                for key, entry in disk_found.items():
+                    self._remember(key, entry)
+                    found[key] = self._decode(entry[0])
+                self._stats["disk_hits"] += len(disk_found)
+
+            self._stats["misses"] += sum(1 for key in disk_lookups if key not in found)
+        return found
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: Iterable[Tuple[str, Any]], ttl: Optional[float] = None):
+        """Store values in both tiers, expiring after `ttl` seconds if given"""
+        rows = []
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock:
+            for key, value in items:
+                stored = self._encode(value)
+                self._remember(key, (stored, expires_at))
+                rows.append((key, stored, expires_at, now))
+
+            if rows and self._db is not None:
+                try:
+                    self._db.executemany(
+                        f"INSERT OR REPLACE INTO {self.TABLE} (key, {self.VALUE_COLUMN}, expires_at, last_used) "
+                        "VALUES (?, ?, ?, ?)",
+                        rows
+                    )
+                    self._db.commit()
+                    self._evict_disk(now)
+                except sqlite3.Error as e:
+                    log_error(f"Error writing {self.NAME}: {e}")
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.set_many([(key, value)], ttl)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current tier sizes"""
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._count_disk()
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key: str, entry: Tuple[Any, Optional[float]]):
+        """Insert into the in-memory LRU, evicting the least recently used entries"""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self._stats["memory_evictions"] += 1
+
+    def _read_disk(self, keys: List[str], now: float) -> Dict[str, Tuple[Any, Optional[float]]]:
+        found = {}
+        expired = []
+        try:
+            for i in range(0, len(keys), _SQL_BATCH):
+                batch = keys[i:i + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    f"SELECT key, {self.VALUE_COLUMN}, expires_at FROM {self.TABLE} WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, stored, expires_at in rows:
+                    if expires_at is not None and expires_at <= now:
+                        expired.append((key,))
+                    else:
+                        found[key] = (stored, expires_at)
+            if expired:
+                self._db.executemany(f"DELETE FROM {self.TABLE} WHERE key = ?", expired)
+                self._stats["expired"] += len(expired)
+            if found:
+                self._db.executemany(
+                    f"UPDATE {self.TABLE} SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+            if expired or found:
+                self._db.commit()
+        except sqlite3.Error as e:
+            log_error(f"Error reading {self.NAME}: {e}")
+        return found
+
+    def _count_disk(self) -> int:
+        if self._db is None:
+            return 0
+        try:
+            return self._db.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def _evict_disk(self, now: float):
+        """Drop expired rows, then least recently used ones once the table exceeds its size bound"""
+        self._db.execute(
+            f"DELETE FROM {self.TABLE} WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+        )
+        overflow = self._count_disk() - self.max_disk_entries
+        if overflow > 0:
+            # Evict down to 90% of the bound so we don't evict on every write
+            to_delete = overflow + self.max_disk_entries // 10
+            self._db.execute(
+                f"DELETE FROM {self.TABLE} WHERE key IN "
+                f"(SELECT key FROM {self.TABLE} ORDER BY last_used ASC LIMIT ?)",
+                (to_delete,)
+            )
+            self._stats["disk_evictions"] += to_delete
+            log_info(f"Evicted {to_delete} entries from {self.NAME}")
+        self._db.commit()
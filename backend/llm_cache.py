@@ -0,0 +1,51 @@
+# llm_cache.py
+import hashlib
+import json
+from typing import Dict, List, Optional
+from kv_cache import KVCache
+from constants import LLM_CACHE_PATH, LLM_CACHE_MEMORY_SIZE, LLM_CACHE_MAX_DISK_ENTRIES
+
+
+class LLMResponseCache(KVCache):
+    """Two-tier (in-memory LRU + SQLite) cache of chat completion texts, with a TTL per entry"""
+
+    TABLE = "responses"
+    VALUE_COLUMN = "content"
+    NAME = "LLM response cache"
+
+    def __init__(self, path: Optional[str] = LLM_CACHE_PATH,
+                 memory_size: int = LLM_CACHE_MEMORY_SIZE,
+                 max_disk_entries: int = LLM_CACHE_MAX_DISK_ENTRIES):
+        super().__init__(path, memory_size, max_disk_entries)
+        self._call_sites: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict], temperature: float, **params) -> str:
+        """Hash everything that determines a completion into a cache key"""
+        raw = json.dumps(
+            {"model": model, "messages": messages, "temperature": temperature, "params": params},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, call_site: str = "other") -> Optional[str]:
+        """Cached, unexpired completion text for `key`, from memory or disk"""
+        content = super().get(key)
+        with self._lock:
+            site = self._call_sites.setdefault(call_site, {"hits": 0, "misses": 0})
+            site["hits" if content is not None else "misses"] += 1
+        return content
+
+    def put(self, key: str, content: str, ttl: float):
+        """Store a completion text for `ttl` seconds"""
+        self.set(key, content, ttl)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters overall and per call site"""
+        stats = super().stats()
+        with self._lock:
+            stats["call_sites"] = {
+                name: {**site, "hit_rate": site["hits"] / (site["hits"] + site["misses"]) if site["hits"] + site["misses"] else 0.0}
+                for name, site in self._call_sites.items()
+            }
+        return stats
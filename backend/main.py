@@ -1,14 +1,19 @@
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 import uvicorn
 import httpx
 from vectordb_manager import VectorDBManager
 from chat_manager import ChatManager
+from model_catalog import ModelCatalog
+from utils import log_error
 import os
 from dotenv import load_dotenv
 import urllib.parse
+import asyncio
+import json
 from user_manager import UserManager
 import jwt
 from datetime import datetime, timedelta
@@ -43,6 +48,20 @@ async def health_check():
     """Health check endpoint that doesn't require authentication"""
     return {"status": "healthy", "message": "Backend is running"}
 
+@app.get("/metrics")
+async def metrics():
+    """Cache and client statistics for monitoring"""
+    return {
+        "embedding_cache": await asyncio.to_thread(vectordb.embedding_cache.stats),
+        "openrouter_clients": chat_manager.openrouter_clients.stats(),
+        "openrouter_models": model_catalog.stats(),
+        "intent_classifier": chat_manager.intent_classifier.stats() if chat_manager.intent_classifier else None,
+        "chat_turns": turn_stats,
+        "topics": chat_manager.topic_stats,
+        "prompt_cache": chat_manager.prompt_cache_stats,
+        "llm_cache": await asyncio.to_thread(chat_manager.llm_cache.stats)
+    }
+
 # Authentication middleware disabled for demo/development
 # @app.middleware("http")
 # async def auth_middleware(request, call_next):
@@ -62,9 +81,23 @@ vectordb = VectorDBManager(
     api_key=os.getenv("QDRANT_API_KEY")
 )
 chat_manager = ChatManager(vectordb)
+# Shared HTTP client and per-key cache for the OpenRouter model catalogue
+model_catalog = ModelCatalog()
 # Initialize user manager
 user_manager = UserManager()
 
+@app.on_event("startup")
+async def startup():
+    """Make sure the vector collection exists before serving requests"""
+    await vectordb.create_collection()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close pooled upstream connections"""
+    await chat_manager.openrouter_clients.close()
+    await model_catalog.close()
+    chat_manager.llm_cache.close()
+
 class ChatMessage(BaseModel):
     message: str
     session_id: Optional[str] = None
@@ -136,6 +169,102 @@ async def create_session(request: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Outcomes of the speculative reply drafted alongside intent classification
+turn_stats = {"drafts_committed": 0, "drafts_cancelled": 0}
+
+async def special_intent_response(session_id: str, message: str) -> Optional[ChatResponse]:
+    """MCQ/video/diagram response when the message confidently asks for one"""
+    intent_result = await chat_manager.classify_message_intent(message)
+    print(f"Intent result: {intent_result}")
+    
+    if (intent_result["success"] and intent_result["confidence"] > 0.85
+            and intent_result["intent"] in ("mcq", "video", "diagram")):
+        # Only search for what this reply needs
+        types = {"mcq": ["content"], "video": ["videos"], "diagram": ["diagrams"]}[intent_result["intent"]]
+        lookup = await chat_manager.lookup_turn(session_id, message, types=types)
+        if intent_result["intent"] == "mcq":
+            mcq_result = await chat_manager.generate_mcq(session_id, lookup)
+            if mcq_result["success"]:
+                
+                return ChatResponse(
+                    response=mcq_result["mcq"]["question"],
+                    session_id=session_id,
+                    type="mcq",
+                    data=mcq_result["mcq"]
+                )
+                
+        elif intent_result["intent"] == "video":
+            video_result = await chat_manager.get_relevant_videos(session_id, lookup)
+            if video_result["success"]:
+                return ChatResponse(
+                    response=f"I found some relevant videos about {video_result['topic']}",
+                    session_id=session_id,
+                    type="video",
+                    data=video_result["videos"]
+                )
+                
+        elif intent_result["intent"] == "diagram":
+            
+            diagram_result = await chat_manager.get_relevant_diagram(session_id, message, lookup)
+            
+            if diagram_result["success"]:
+                return ChatResponse(
+                    response="Here's a relevant diagram:",
+                    session_id=session_id,
+                    type="diagram",
+                    data=diagram_result["diagram"]
+                )
+    return None
+
+async def run_chat_turn(message: str, session_id: str, openrouter_api_key: str = None,
+                        openrouter_model: str = None, system_prompt: str = None) -> ChatResponse:
+    """
+    Classify the message intent and draft the normal reply concurrently, so
+    plain-text turns don't wait for classification first. The draft leaves
+    the chat history alone until it is committed: it is cancelled when an
+    MCQ/video/diagram response wins, and recorded otherwise.
+    """
+    draft_task = asyncio.create_task(chat_manager.draft_response(
+        message=message,
+        session_id=session_id,
+        openrouter_api_key=openrouter_api_key,
+        openrouter_model=openrouter_model,
+        system_prompt=system_prompt
+    ))
+    try:
+        special_response = await special_intent_response(session_id, message)
+        if special_response:
+            turn_stats["drafts_cancelled"] += 1
+            return special_response
+
+        # If no special intent or low confidence, use the normal response
+        draft = await draft_task
+        chat_manager.commit_turn(session_id, draft)
+        turn_stats["drafts_committed"] += 1
+        return ChatResponse(
+            response=draft["response"],
+            session_id=session_id,
+            type="text"
+        )
+    finally:
+        if not draft_task.done():
+            draft_task.cancel()
+
+def get_chat_settings(request: Request):
+    """OpenRouter key, model and system prompt from the request headers"""
+    openrouter_api_key = request.headers.get("X-OpenRouter-API-Key")
+    openrouter_model = request.headers.get("X-OpenRouter-Model")
+    system_prompt_encoded = request.headers.get("X-System-Prompt", "")
+    
+    # Decode the URL-encoded system prompt
+    system_prompt = urllib.parse.unquote(system_prompt_encoded) if system_prompt_encoded else ""
+    
+    # Debug log the received headers
+    print(f"Received headers - API Key: {'Present' if openrouter_api_key else 'Missing'}, Model: {openrouter_model}, System Prompt: {'Present' if system_prompt else 'Missing'}")
+    if system_prompt:
+        print(f"System Prompt (first 100 chars): {system_prompt[:100]}...")
+    return openrouter_api_key, openrouter_model, system_prompt
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(chat_message: ChatMessage, request: Request):
     """Handle chat messages"""
@@ -145,80 +274,115 @@ async def chat_endpoint(chat_message: ChatMessage, request: Request):
         # if not user_email:
         #     raise HTTPException(status_code=401, detail="User not authenticated")
         
-        # Get OpenRouter settings from request headers
-        openrouter_api_key = request.headers.get("X-OpenRouter-API-Key")
-        openrouter_model = request.headers.get("X-OpenRouter-Model")
-        system_prompt_encoded = request.headers.get("X-System-Prompt", "")
-        
-        # Decode the URL-encoded system prompt
-        system_prompt = urllib.parse.unquote(system_prompt_encoded) if system_prompt_encoded else ""
-        
-        # Debug log the received headers
-        print(f"Received headers - API Key: {'Present' if openrouter_api_key else 'Missing'}, Model: {openrouter_model}, System Prompt: {'Present' if system_prompt else 'Missing'}")
-        if system_prompt:
-            print(f"System Prompt (first 100 chars): {system_prompt[:100]}...")
+        openrouter_api_key, openrouter_model, system_prompt = get_chat_settings(request)
         
         # Create new session if none provided
         session_id = chat_message.session_id
         if not session_id:
             session_id = chat_manager.create_session()
 
-        # First classify the message intent
-        intent_result = await chat_manager.classify_message_intent(chat_message.message)
-        print(f"Intent result: {intent_result}")
-        
-        if intent_result["success"] and intent_result["confidence"] > 0.85:
-            if intent_result["intent"] == "mcq":
-                mcq_result = await chat_manager.generate_mcq(session_id)
-                if mcq_result["success"]:
-                    
-                    return ChatResponse(
-                        response=mcq_result["mcq"]["question"],
-                        session_id=session_id,
-                        type="mcq",
-                        data=mcq_result["mcq"]
-                    )
-                    
-            elif intent_result["intent"] == "video":
-                video_result = await chat_manager.get_relevant_videos(session_id)
-                if video_result["success"]:
-                    return ChatResponse(
-                        response=f"I found some relevant videos about {video_result['topic']}",
-                        session_id=session_id,
-                        type="video",
-                        data=video_result["videos"]
-                    )
-                    
-            elif intent_result["intent"] == "diagram":
-                
-                diagram_result = await chat_manager.get_relevant_diagram(session_id,chat_message.message)
-                
-                if diagram_result["success"]:
-                    return ChatResponse(
-                        response="Here's a relevant diagram:",
-                        session_id=session_id,
-                        type="diagram",
-                        data=diagram_result["diagram"]
-                    )
-
-        # If no special intent or low confidence, get normal response
-        response = await chat_manager.get_response(
+        return await run_chat_turn(
             message=chat_message.message,
             session_id=session_id,
             openrouter_api_key=openrouter_api_key,
             openrouter_model=openrouter_model,
             system_prompt=system_prompt
         )
-        
-        return ChatResponse(
-            response=response,
-            session_id=session_id,
-            type="text"
-        )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_event(event: Dict) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(chat_message: ChatMessage, request: Request):
+    """
+    Handle chat messages as a server-sent event stream: a "start" event with
+    the session id, then either one "result" event carrying an MCQ/video/
+    diagram response, or "token" events followed by "done". Failures end the
+    stream with an "error" event. Disconnecting cancels the upstream completion.
+
+    As in run_chat_turn, the reply starts while the intent is classified; its
+    first token is held back until the turn turns out to be a plain reply,
+    and the reply is dropped if an MCQ/video/diagram response wins.
+    """
+    openrouter_api_key, openrouter_model, system_prompt = get_chat_settings(request)
+    session_id = chat_message.session_id or chat_manager.create_session()
+
+    async def events():
+        yield sse_event({"type": "start", "session_id": session_id})
+        tokens = chat_manager.stream_response(
+            message=chat_message.message,
+            session_id=session_id,
+            openrouter_api_key=openrouter_api_key,
+            openrouter_model=openrouter_model,
+            system_prompt=system_prompt
+        )
+        queue = asyncio.Queue()
+        # The first token is drafted straight away, each later one on request
+        want_next = asyncio.Event()
+        want_next.set()
+
+        async def pump():
+            # The only task that iterates `tokens`, one token per request, so
+            # the reply never runs ahead of what the client has been sent
+            try:
+                while True:
+                    await want_next.wait()
+                    want_next.clear()
+                    token = await anext(tokens, None)
+                    await queue.put(token)
+                    if token is None:
+                        return
+            except Exception as e:
+                await queue.put(e)
+            finally:
+                await tokens.aclose()
+
+        def commit_user_message():
+            # Like /chat, a turn whose reply failed still records the user's message
+            chat_manager.commit_turn(session_id, {
+                "user_message": {"role": "user", "content": chat_message.message},
+                "assistant_message": None
+            })
+
+        reply = asyncio.create_task(pump())
+        try:
+            try:
+                special_response = await special_intent_response(session_id, chat_message.message)
+            except Exception:
+                commit_user_message()
+                raise
+            if special_response:
+                turn_stats["drafts_cancelled"] += 1
+                yield sse_event({"type": "result", "result": special_response.dict()})
+                return
+
+            while (token := await queue.get()) is not None:
+                if isinstance(token, Exception):
+                    commit_user_message()
+                    raise token
+                if await request.is_disconnected():
+                    return
+                yield sse_event({"type": "token", "content": token})
+                want_next.set()
+            turn_stats["drafts_committed"] += 1
+            yield sse_event({"type": "done"})
+        except Exception as e:
+            log_error(f"Chat stream error: {e}")
+            yield sse_event({"type": "error", "detail": "I encountered an error while processing your request. Please try again."})
+        finally:
+            reply.cancel()
+            await asyncio.gather(reply, return_exceptions=True)
+            await tokens.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/extract_topic")
 async def extract_topic_endpoint(topic_request: TopicRequest, request: Request):
     """Extract topic from chat history"""
@@ -383,20 +547,23 @@ async def get_openrouter_models(request: Request):
         if not api_key:
             raise HTTPException(status_code=400, detail="OpenRouter API key required")
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://openrouter.ai/api/v1/models",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                }
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(status_code=response.status_code, detail="Failed to fetch models")
+        try:
+            entry = await model_catalog.get(api_key)
+        except httpx.HTTPStatusError as e:
+            raise HTTPException(status_code=e.response.status_code, detail="Failed to fetch models")
+
+        headers = {
+            "ETag": entry["etag"],
+            # Private: the catalogue is fetched with the caller's API key
+            "Cache-Control": f"private, max-age={model_catalog.max_age(entry)}, stale-while-revalidate={model_catalog.stale_ttl}",
+            "Vary": "X-OpenRouter-API-Key"
+        }
+        if request.headers.get("If-None-Match") == entry["etag"]:
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry["body"], media_type="application/json", headers=headers)
                 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,130 @@
+# model_catalog.py
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict
+import httpx
+from utils import log_info, log_error
+from constants import (
+    OPENROUTER_BASE_URL,
+    OPENROUTER_MODELS_TTL,
+    OPENROUTER_MODELS_STALE_TTL,
+    OPENROUTER_MODELS_CACHE_SIZE
+)
+
+
+class ModelCatalog:
+    """
+    OpenRouter model catalogue, fetched over one shared HTTP client and
+    cached per API key. Fresh entries are served as is; stale ones are
+    served while a background fetch refreshes them. Concurrent fetches for
+    the same key share a single upstream request.
+    """
+
+    def __init__(self, url: str = f"{OPENROUTER_BASE_URL}/models",
+                 ttl: int = OPENROUTER_MODELS_TTL,
+                 stale_ttl: int = OPENROUTER_MODELS_STALE_TTL,
+                 max_entries: int = OPENROUTER_MODELS_CACHE_SIZE):
+        self.url = url
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.http_client = httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=10.0))
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "fetches": 0,
+            "not_modified": 0,
+            "coalesced": 0
+        }
+
+    @staticmethod
+    def _key(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+    def max_age(self, entry: Dict) -> int:
+        """Seconds until `entry` stops being fresh"""
+        return max(0, int(self.ttl - (time.monotonic() - entry["fetched_at"])))
+
+    async def get(self, api_key: str) -> Dict:
+        """
+        Cache entry for `api_key`: {"body", "etag", "fetched_at"}, where body
+        is the raw JSON returned by OpenRouter. Raises httpx.HTTPStatusError
+        when there is nothing cached and the fetch fails.
+        """
+        key = self._key(api_key)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            age = time.monotonic() - entry["fetched_at"]
+            if age < self.ttl:
+                self._stats["hits"] += 1
+                return entry
+            if age < self.ttl + self.stale_ttl:
+                self._stats["stale_hits"] += 1
+                self._refresh(key, api_key)
+                return entry
+
+        self._stats["misses"] += 1
+        # Shielded so a caller that goes away doesn't cancel the fetch others are waiting on
+        return await asyncio.shield(self._refresh(key, api_key))
+
+    def _refresh(self, key: str, api_key: str) -> asyncio.Task:
+        """Start a fetch for `key`, or join the one already running"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+            return task
+        task = asyncio.create_task(self._fetch(key, api_key))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._fetch_done(key, done))
+        return task
+
+    def _fetch_done(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            log_error(f"Error fetching OpenRouter models: {task.exception()}")
+
+    async def _fetch(self, key: str, api_key: str) -> Dict:
+        entry = self._entries.get(key)
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        if entry is not None and entry["upstream_etag"]:
+            headers["If-None-Match"] = entry["upstream_etag"]
+
+        self._stats["fetches"] += 1
+        response = await self.http_client.get(self.url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            self._stats["not_modified"] += 1
+            entry["fetched_at"] = time.monotonic()
+            return entry
+        response.raise_for_status()
+
+        body = response.content
+        entry = {
+            "body": body,
+            "etag": f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            "upstream_etag": response.headers.get("etag"),
+            "fetched_at": time.monotonic()
+        }
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        log_info(f"Fetched OpenRouter model catalogue ({len(body)} bytes)")
+        return entry
+
+    async def close(self):
+        for task in list(self._inflight.values()):
+            task.cancel()
+        await self.http_client.aclose()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and cached catalogue count"""
+        return {**self._stats, "entries": len(self._entries), "inflight": len(self._inflight)}
@@ -0,0 +1,205 @@
+# qdrant_store.py
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import (
+    Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue, MatchAny,
+    PointIdsList, FilterSelector, Disabled, PayloadSchemaType, CollectionStatus, SearchParams, QuantizationSearchParams,
+    SearchRequest, ScalarQuantization, ScalarQuantizationConfig, ScalarType, BinaryQuantization, BinaryQuantizationConfig
+)
+from vector_store import VectorStore, Point, SearchHit, SearchQuery
+from utils import log_info
+from constants import (
+    VECTOR_SIZE, COLLECTION_NAME, PAYLOAD_INDEXES,
+    QUANTIZATION, QUANTIZATION_RESCORE, QUANTIZATION_OVERSAMPLING
+)
+
+
+class QdrantStore(VectorStore):
+    """Collection in a (usually remote) Qdrant instance"""
+
+    def __init__(self, url: str, api_key: str, collection_name: str = COLLECTION_NAME,
+                 dimensions: int = VECTOR_SIZE, quantization: str = QUANTIZATION):
+        self.client = AsyncQdrantClient(url=url, api_key=api_key)
+        self.collection_name = collection_name
+        self.dimensions = dimensions
+        self.quantization = quantization
+
+    async def ensure_collection(self):
+        """Create collection if it doesn't exist and make sure every filtered
+        field has a payload index"""
+        if not await self.client.collection_exists(self.collection_name):
+            await self.client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=VectorParams(
+                    size=self.dimensions,
+                    distance=Distance.COSINE
+                ),
+                quantization_config=self._quantization_config()
+            )
+            log_info(f"Collection {self.collection_name} created ({self.dimensions}d, quantization={self.quantization})")
+        else:
+            log_info(f"Collection {self.collection_name} already exists")
+            await self._check_vector_config()
+        await self.ensure_payload_indexes()
+
+    def _quantization_config(self):
+        """Qdrant quantization config for the configured mode (none, scalar or binary)"""
+        if self.quantization == "scalar":
+            return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True))
+        if self.quantization == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def _search_params(self, exact: bool = False):
+        """Search with quantized vectors, then rescore the candidates with the originals"""
+        if exact:
+            return SearchParams(exact=True)
+        if self.quantization not in ("scalar", "binary"):
+            return None
+        return SearchParams(quantization=QuantizationSearchParams(
+            rescore=QUANTIZATION_RESCORE,
+            oversampling=QUANTIZATION_OVERSAMPLING
+        ))
+
+    async def _check_vector_config(self):
+        """Refuse a collection of another vector size and bring quantization in line with settings"""
+        info = await self.client.get_collection(self.collection_name)
+        vectors = info.config.params.vectors
+        if vectors.size != self.dimensions:
+            # Every query and upsert would fail, so stop at startup instead
+            raise ValueError(
+                f"Collection {self.collection_name} holds {vectors.size}d vectors but {self.dimensions}d are configured; "
+                f"set EMBEDDING_DIMENSIONS={vectors.size} or run 'ingestion scripts/migrate_collection.py' to re-project it"
+            )
+        current = type(info.config.quantization_config).__name__ if info.config.quantization_config else None
+        wanted = self._quantization_config()
+        if current != (type(wanted).__name__ if wanted else None):
+            log_info(f"Updating {self.collection_name} quantization to {self.quantization}")
+            await self.client.update_collection(
+                collection_name=self.collection_name,
+                quantization_config=wanted if wanted else Disabled.DISABLED
+            )
+
+    async def load_collection_config(self):
+        """Adopt the vector size and quantization of the existing collection"""
+        info = await self.client.get_collection(self.collection_name)
+        self.dimensions = info.config.params.vectors.size
+        quantization_config = info.config.quantization_config
+        self.quantization = "scalar" if getattr(quantization_config, "scalar", None) else \
+            "binary" if getattr(quantization_config, "binary", None) else "none"
+
+    async def wait_until_indexed(self):
+        while (await self.client.get_collection(self.collection_name)).status != CollectionStatus.GREEN:
+            await asyncio.sleep(1)
+
+    async def ensure_payload_indexes(self):
+        """Create missing payload indexes for filter fields and rebuild ones
+        declared with a different type"""
+        info = await self.client.get_collection(self.collection_name)
+        existing = info.payload_schema or {}
+        for field, schema in PAYLOAD_INDEXES.items():
+            schema_type = PayloadSchemaType(schema)
+            current = existing.get(field)
+            if current is not None and current.data_type == schema_type:
+                continue
+            if current is not None:
+                log_info(f"Migrating payload index {field}: {current.data_type} -> {schema_type}")
+                await self.client.delete_payload_index(self.collection_name, field_name=field, wait=True)
+            await self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field,
+                field_schema=schema_type,
+                wait=True
+            )
+            log_info(f"Created {schema} payload index on {field}")
+
+    def _build_filter(self, conditions: Optional[Dict[str, Any]]) -> Optional[Filter]:
+        """Build a Filter from {field: value}; list values match any of the values"""
+        if not conditions:
+            return None
+        return Filter(must=[
+            FieldCondition(key=key, match=MatchAny(any=value) if isinstance(value, list) else MatchValue(value=value))
+            for key, value in conditions.items()
+        ])
+
+    async def upsert(self, points: List[Point]):
+        await self.client.upsert(
+            collection_name=self.collection_name,
+            points=[PointStruct(id=point.id, vector=point.vector, payload=point.payload) for point in points]
+        )
+
+    async def search(self, vector: List[float], conditions: Dict[str, Any], limit: int,
+                     exact: bool = False) -> List[SearchHit]:
+        results = await self.client.search(
+            collection_name=self.collection_name,
+            query_vector=vector,
+            limit=limit,
+            query_filter=self._build_filter(conditions),
+            search_params=self._search_params(exact)
+        )
+        return [SearchHit(str(hit.id), hit.score, hit.payload) for hit in results]
+
+    async def search_batch(self, queries: List[SearchQuery]) -> List[List[SearchHit]]:
+        if not queries:
+            return []
+        results = await self.client.search_batch(
+            collection_name=self.collection_name,
+            requests=[
+                SearchRequest(
+                    vector=query.vector,
+                    filter=self._build_filter(query.conditions),
+                    limit=query.limit,
+                    params=self._search_params(),
+                    with_payload=True
+                )
+                for query in queries
+            ]
+        )
+        return [[SearchHit(str(hit.id), hit.score, hit.payload) for hit in hits] for hits in results]
+
+    async def retrieve(self, ids: List[str], fields: Optional[List[str]] = None) -> Dict[str, Dict]:
+        points = await self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=ids,
+            with_payload=fields if fields else True,
+            with_vectors=False
+        )
+        return {str(point.id): point.payload for point in points}
+
+    async def scroll(self, conditions: Optional[Dict[str, Any]] = None, batch_size: int = 256,
+                     with_vectors: bool = False) -> AsyncIterator[List[Point]]:
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=self._build_filter(conditions),
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=with_vectors
+            )
+            if points:
+                yield [Point(str(point.id), point.vector, point.payload) for point in points]
+            if offset is None:
+                return
+
+    async def delete(self, ids: List[str]):
+        await self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=PointIdsList(points=ids)
+        )
+
+    async def delete_by_filter(self, conditions: Dict[str, Any]):
+        await self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=FilterSelector(filter=self._build_filter(conditions))
+        )
+
+    async def count(self, conditions: Optional[Dict[str, Any]] = None) -> int:
+        result = await self.client.count(
+            collection_name=self.collection_name,
+            count_filter=self._build_filter(conditions),
+            exact=True
+        )
+        return result.count
@@ -0,0 +1,44 @@
+# rate_limiter.py
+import asyncio
+import time
+from constants import OPENAI_EMBEDDING_RPM, OPENAI_EMBEDDING_TPM
+
+
+class TokenBucket:
+    """Token bucket that refills continuously up to its capacity"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` from the bucket (possibly going into debt) and return
+        how many seconds the caller must wait before using it"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+        # A single request larger than the bucket can never fit, so charge at most a full bucket
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.refill_per_second
+
+
+class OpenAIRateLimiter:
+    """Limits calls to both requests-per-minute and tokens-per-minute quotas"""
+
+    def __init__(self, requests_per_minute: int = OPENAI_EMBEDDING_RPM,
+                 tokens_per_minute: int = OPENAI_EMBEDDING_TPM):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.total_wait = 0.0
+
+    async def acquire(self, tokens: int):
+        """Wait until one request carrying `tokens` tokens fits within the quotas"""
+        # Reserving debits both buckets up front, so concurrent callers queue up fairly
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        self.total_wait += wait
+        if wait:
+            await asyncio.sleep(wait)
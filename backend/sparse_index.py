@@ -0,0 +1,166 @@
+# sparse_index.py
+import json
+import math
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from utils import log_info, log_error
+from constants import SPARSE_INDEX_DIR, BM25_K1, BM25_B, RRF_K
+
+# Words, numbers and dotted/hyphenated identifiers such as "77.4", "il-6" or "brca1"
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+_STOPWORDS = frozenset("""
+a an and are as at be but by for from has have how in is it its of on or that the
+their there these this to was were what when where which who why will with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; exact terms matter for medical text, so nothing is stemmed"""
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Merge ranked ID lists by summing 1 / (k + rank) across the lists"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, point_id in enumerate(ranking, 1):
+            scores[point_id] = scores.get(point_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class SparseIndex:
+    """
+    BM25 inverted index over content chunks, persisted next to the vector
+    collection as a JSON file of per-chunk term counts.
+
+    Document frequencies and the average length are kept up to date as chunks
+    are added and removed, so incremental ingestion needs no rebuild. Another
+    process (an ingestion script) picks up those changes with reloaded().
+    """
+
+    def __init__(self, collection_name: str, index_dir: str = SPARSE_INDEX_DIR,
+                 k1: float = BM25_K1, b: float = BM25_B):
+        self.collection_name = collection_name
+        self.index_dir = index_dir
+        self.path = Path(index_dir) / f"{collection_name}.json"
+        self.k1 = k1
+        self.b = b
+        self.docs: Dict[str, Dict[str, Any]] = {}  # id -> {"topic", "level", "length", "terms"}
+        self.postings: Dict[str, Dict[str, int]] = {}  # term -> {id: term frequency}
+        self.total_length = 0
+        self._dirty = False
+        self._version = self._file_version()
+        if self._version is not None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for doc_id, doc in json.load(f).items():
+                        self._insert(doc_id, doc)
+                log_info(f"Loaded sparse index {self.path} ({len(self.docs)} chunks)")
+            except (OSError, ValueError) as e:
+                log_error(f"Error reading sparse index {self.path}, starting fresh: {e}")
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def _file_version(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reloaded(self) -> Optional["SparseIndex"]:
+        """A fresh index read from the file if another process has rewritten
+        it since this one was loaded or saved, else None. Unsaved changes of
+        this index win, so it is never replaced while dirty."""
+        version = self._file_version()
+        if self._dirty or version is None or version == self._version:
+            return None
+        return SparseIndex(self.collection_name, index_dir=self.index_dir, k1=self.k1, b=self.b)
+
+    def clear(self):
+        self.docs = {}
+        self.postings = {}
+        self.total_length = 0
+        self._dirty = True
+
+    def _insert(self, doc_id: str, doc: Dict[str, Any]):
+        self.docs[doc_id] = doc
+        self.total_length += doc["length"]
+        for term, frequency in doc["terms"].items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+
+    def add(self, doc_id: str, text: str, topic: str = None, level: int = 3):
+        """Index (or re-index) one chunk"""
+        self.remove([doc_id])
+        tokens = tokenize(text)
+        self._insert(doc_id, {
+            "topic": topic,
+            "level": level,
+            "length": len(tokens),
+            "terms": dict(Counter(tokens))
+        })
+        self._dirty = True
+
+    def remove(self, doc_ids: Iterable[str]):
+        for doc_id in doc_ids:
+            doc = self.docs.pop(doc_id, None)
+            if doc is None:
+                continue
+            self.total_length -= doc["length"]
+            for term in doc["terms"]:
+                posting = self.postings.get(term)
+                if posting is not None:
+                    posting.pop(doc_id, None)
+                    if not posting:
+                        del self.postings[term]
+            self._dirty = True
+
+    def remove_matching(self, conditions: Dict[str, Any]):
+        """Remove chunks whose stored topic/level match every condition; other
+        fields are not stored, so conditions on them match nothing"""
+        def matches(doc):
+            for field, value in conditions.items():
+                values = value if isinstance(value, list) else [value]
+                if field not in ("topic", "level") or doc[field] not in values:
+                    return False
+            return True
+        self.remove([doc_id for doc_id, doc in self.docs.items() if matches(doc)])
+
+    def idf(self, term: str) -> float:
+        frequency = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.docs) - frequency + 0.5) / (frequency + 0.5))
+
+    def search(self, query: str, topic: str = None, limit: int = 10) -> List[Tuple[str, float]]:
+        """Top chunks by BM25 score as (id, score), optionally within one topic"""
+        if not self.docs:
+            return []
+        average_length = self.total_length / len(self.docs) or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = self.idf(term)
+            for doc_id, frequency in posting.items():
+                doc = self.docs[doc_id]
+                if topic and doc["topic"] != topic:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * doc["length"] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def save(self):
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.docs, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self._version = self._file_version()
+        log_info(f"Saved sparse index {self.path} ({len(self.docs)} chunks)")
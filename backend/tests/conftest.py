@@ -0,0 +1,45 @@
+# conftest.py
+import hashlib
+import os
+import sys
+import pytest
+
+# Backend modules import each other by bare name, as when run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Module-level OpenAI clients need a key to construct; tests never call the API
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from embedded_store import EmbeddedStore
+from embedding_cache import EmbeddingCache
+from vectordb_manager import VectorDBManager
+
+TEST_DIMENSIONS = 8
+
+
+def fake_embedding(text: str):
+    """Deterministic stand-in for an OpenAI embedding"""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [byte / 255 for byte in digest[:TEST_DIMENSIONS]]
+
+
+@pytest.fixture
+def vectordb(tmp_path):
+    """VectorDBManager over an embedded store in a temp dir, embedding with fake_embedding"""
+    store = EmbeddedStore(collection_name="test", dimensions=TEST_DIMENSIONS, path=str(tmp_path / "vector_store"))
+    db = VectorDBManager(embedding_cache=EmbeddingCache(path=None), store=store, hybrid=False)
+    db.embedded_texts = []
+
+    async def generate_embeddings(texts):
+        db.embedded_texts.extend(texts)
+        return [fake_embedding(text) for text in texts]
+
+    db.generate_embeddings = generate_embeddings
+    return db
+
+
+@pytest.fixture
+def chat_manager(vectordb, tmp_path, monkeypatch):
+    """ChatManager over the fake vectordb, keeping its cache files in a temp dir"""
+    from chat_manager import ChatManager
+    monkeypatch.chdir(tmp_path)
+    return ChatManager(vectordb)
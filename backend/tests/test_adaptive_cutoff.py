@@ -0,0 +1,48 @@
+# test_adaptive_cutoff.py
+import asyncio
+from sparse_index import SparseIndex
+from vector_store import SearchHit
+from vectordb_manager import adaptive_cutoff
+
+
+def test_ratio_rule_stops_at_first_score_far_below_the_best():
+    k, reason = adaptive_cutoff([0.9, 0.85, 0.8, 0.6, 0.55], max_k=5, min_k=1, min_score_ratio=0.8, elbow_factor=10)
+    assert k == 3
+    assert "below 80% of top" in reason
+
+
+def test_elbow_rule_stops_before_a_sharp_drop():
+    scores = [0.90, 0.89, 0.88, 0.75, 0.74, 0.73]
+    k, reason = adaptive_cutoff(scores, max_k=6, min_k=1, min_score_ratio=0.5, elbow_factor=2.0)
+    assert k == 3
+    assert reason.startswith("elbow")
+
+
+def test_flat_scores_keep_max_k():
+    assert adaptive_cutoff([0.8, 0.79, 0.78, 0.77, 0.76], max_k=3, min_k=1) == (3, "max_k")
+
+
+def test_min_k_is_kept_even_after_a_steep_drop():
+    k, _ = adaptive_cutoff([0.9, 0.3, 0.29, 0.28], max_k=4, min_k=2, min_score_ratio=0.8)
+    assert k == 2
+
+
+def test_fewer_candidates_than_min_k():
+    assert adaptive_cutoff([0.9], max_k=5, min_k=2) == (1, "fewer candidates than min_k")
+
+
+def test_hybrid_search_cuts_on_dense_scores_not_fused_ranks(vectordb, tmp_path):
+    vectordb.sparse_index = SparseIndex("test", index_dir=str(tmp_path))
+    dense_scores = [0.9, 0.88, 0.4, 0.39, 0.38, 0.37]
+    hits = [
+        SearchHit(str(i), score, {"content": f"chunk {i}", "topic": "tb", "level": 3, "page_num": 1, "chunk_num": i})
+        for i, score in enumerate(dense_scores)
+    ]
+
+    async def search_batch(queries):
+        return [hits[:query.limit] for query in queries]
+
+    vectordb.store.search_batch = search_batch
+    results = asyncio.run(vectordb.search_many("query", types=["content"], chunk_limit=3, hybrid=True, adaptive=True))
+
+    assert [result["id"] for result in results["content"]] == ["0", "1"]
@@ -0,0 +1,81 @@
+# test_chat_manager.py
+import asyncio
+from types import SimpleNamespace
+import chat_manager as chat_manager_module
+
+
+class FakeCompletions:
+    """Stands in for openai_client.chat.completions, answering with a fixed text"""
+
+    def __init__(self, content):
+        self.content = content
+        self.calls = []
+
+    async def create(self, model, messages, temperature):
+        self.calls.append(messages)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.content))])
+
+
+def fake_openai(monkeypatch, content):
+    completions = FakeCompletions(content)
+    monkeypatch.setattr(chat_manager_module, "openai_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    return completions
+
+
+def test_lookup_turn_finds_content_diagrams_and_videos_in_one_search(chat_manager, monkeypatch):
+    completions = fake_openai(monkeypatch, "chest x-ray cavitation")
+    vectordb = chat_manager.vectordb
+    records = [
+        {"id": "c1", "text": "rifampicin", "payload": {
+            "content": "rifampicin", "topic": "tuberculosis", "level": 3, "page_num": 1, "chunk_num": 0}},
+        vectordb._build_diagram_record("tb.png", "chest x-ray", "tuberculosis", "radiology"),
+        vectordb._build_video_record("https://example.com/tb", "tb lecture", "tuberculosis", "english"),
+        vectordb._build_diagram_record("crc.png", "colon", "colorectal_cancer", "anatomy")
+    ]
+    batches = []
+    search_batch = vectordb.store.search_batch
+
+    async def counting_search_batch(queries):
+        batches.append(queries)
+        return await search_batch(queries)
+
+    vectordb.store.search_batch = counting_search_batch
+    chat_manager.chat_histories["s"] = [
+        {"role": "user", "content": "Tell me about tuberculosis"},
+        {"role": "assistant", "content": "Tuberculosis often shows cavities on a chest x-ray."}
+    ]
+
+    async def scenario():
+        await vectordb._upsert_points(vectordb._build_points(records, await vectordb.generate_embeddings(
+            [record["text"] for record in records])))
+        vectordb.embedded_texts.clear()
+        return await chat_manager.lookup_turn("s", "Show me a diagram")
+
+    lookup = asyncio.run(scenario())
+
+    assert lookup["success"] and lookup["topic"] == "tuberculosis"
+    assert [result["content"] for result in lookup["content"]] == ["rifampicin"]
+    assert [diagram["image_path"] for diagram in lookup["diagrams"]] == ["tb.png"]
+    assert [video["url"] for video in lookup["videos"]] == ["https://example.com/tb"]
+    assert len(batches) == 1 and len(batches[0]) == 3
+    # Each type keeps its own query, all embedded together
+    assert vectordb.embedded_texts == [
+        "tuberculosis",
+        "chest x-ray cavitation tuberculosis",
+        "Tell me about tuberculosis Tuberculosis often shows cavities on a chest x-ray. Show me a diagram"
+    ]
+    assert completions.calls[0][1]["content"] == "Tuberculosis often shows cavities on a chest x-ray."
+
+
+def test_lookup_turn_only_summarizes_for_diagrams_and_caches_the_summary(chat_manager, monkeypatch):
+    completions = fake_openai(monkeypatch, "cavitation")
+    chat_manager.chat_histories["s"] = [{"role": "assistant", "content": "Tuberculosis causes cavities."}]
+
+    async def scenario():
+        await chat_manager.lookup_turn("s", "Quiz me on tuberculosis", types=["content"])
+        await chat_manager.lookup_turn("s", "Show me a tuberculosis diagram", types=["diagrams"])
+        await chat_manager.lookup_turn("s", "Another tuberculosis diagram", types=["diagrams"])
+
+    asyncio.run(scenario())
+    assert len(completions.calls) == 1
+    assert chat_manager.llm_cache.stats()["call_sites"]["summarize_for_diagram"]["hits"] == 1
@@ -0,0 +1,122 @@
+# test_chat_stream.py
+import asyncio
+import json
+import pytest
+import chat_manager as chat_manager_module
+
+
+class FakeRequest:
+    """Just what chat_stream_endpoint reads from a request; reports a
+    disconnect once `connected_checks` checks have passed"""
+
+    def __init__(self, connected_checks: int = None):
+        self.headers = {}
+        self.connected_checks = connected_checks
+
+    async def is_disconnected(self) -> bool:
+        if self.connected_checks is None:
+            return False
+        self.connected_checks -= 1
+        return self.connected_checks < 0
+
+
+class FakeCompletion:
+    """Stands in for ChatManager._stream_completion, recording whether it was closed"""
+
+    def __init__(self, tokens, error: Exception = None):
+        self.tokens = tokens
+        self.error = error
+        self.started = asyncio.Event()
+        self.closed = False
+
+    async def stream(self, messages, model, openrouter_api_key=None):
+        try:
+            for token in self.tokens:
+                self.started.set()
+                yield token
+            if self.error:
+                raise self.error
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def main(chat_manager, monkeypatch):
+    monkeypatch.setattr(chat_manager_module, "count_tokens", lambda text: len(text.split()))
+    import main
+    monkeypatch.setattr(main, "chat_manager", chat_manager)
+    main.turn_stats.update(drafts_committed=0, drafts_cancelled=0)
+    chat_manager.chat_histories["s"] = []
+    return main
+
+
+def stream(main, completion, special_response=None, request=None):
+    """Run one /chat/stream turn; returns its events"""
+    async def special_intent_response(session_id, message):
+        # Let the reply get going before the intent is decided
+        await completion.started.wait()
+        if isinstance(special_response, Exception):
+            raise special_response
+        return special_response
+
+    main.chat_manager._stream_completion = completion.stream
+    main.special_intent_response = special_intent_response
+
+    async def scenario():
+        response = await main.chat_stream_endpoint(
+            main.ChatMessage(message="Explain tuberculosis", session_id="s"), request or FakeRequest()
+        )
+        return [json.loads(chunk[len("data: "):]) async for chunk in response.body_iterator]
+
+    return asyncio.run(scenario())
+
+
+def test_plain_reply_streams_tokens_and_commits_the_turn(main):
+    completion = FakeCompletion(["TB ", "is ", "an infection"])
+    events = stream(main, completion)
+
+    assert [event["type"] for event in events] == ["start", "token", "token", "token", "done"]
+    assert "".join(event["content"] for event in events if event["type"] == "token") == "TB is an infection"
+    assert [msg["content"] for msg in main.chat_manager.chat_histories["s"]] == ["Explain tuberculosis", "TB is an infection"]
+    assert completion.closed
+
+
+def test_special_intent_drops_the_reply_unfinished(main):
+    completion = FakeCompletion(["TB ", "is ", "an infection"])
+    special = main.ChatResponse(response="Here's a relevant diagram:", session_id="s", type="diagram", data={"image_path": "tb.png"})
+    events = stream(main, completion, special_response=special)
+
+    assert [event["type"] for event in events] == ["start", "result"]
+    assert events[1]["result"]["type"] == "diagram"
+    # The held-back reply never ran to completion, so it never reached the history
+    assert main.chat_manager.chat_histories["s"] == []
+    assert completion.closed
+    assert main.turn_stats["drafts_cancelled"] == 1
+
+
+def test_client_disconnect_closes_the_reply_without_committing(main):
+    completion = FakeCompletion(["TB ", "is ", "an infection"])
+    events = stream(main, completion, request=FakeRequest(connected_checks=1))
+
+    assert [event["type"] for event in events] == ["start", "token"]
+    assert main.chat_manager.chat_histories["s"] == []
+    assert completion.closed
+    assert main.turn_stats["drafts_committed"] == 0
+
+
+def test_failed_reply_records_the_user_message(main):
+    completion = FakeCompletion(["TB "], error=RuntimeError("upstream reset"))
+    events = stream(main, completion)
+
+    assert [event["type"] for event in events] == ["start", "token", "error"]
+    assert main.chat_manager.chat_histories["s"] == [{"role": "user", "content": "Explain tuberculosis"}]
+    assert completion.closed
+
+
+def test_failed_intent_check_records_the_user_message(main):
+    completion = FakeCompletion(["TB ", "is ", "an infection"])
+    events = stream(main, completion, special_response=RuntimeError("classifier down"))
+
+    assert [event["type"] for event in events] == ["start", "error"]
+    assert main.chat_manager.chat_histories["s"] == [{"role": "user", "content": "Explain tuberculosis"}]
+    assert completion.closed
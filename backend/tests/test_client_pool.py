@@ -0,0 +1,97 @@
+# test_client_pool.py
+import asyncio
+import client_pool
+from client_pool import OpenRouterClientPool
+
+
+class FakeClient:
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def make_pool(monkeypatch, **kwargs):
+    pool = OpenRouterClientPool(**kwargs)
+    monkeypatch.setattr(pool, "_new_client", FakeClient)
+    return pool
+
+
+def test_same_key_reuses_one_client(monkeypatch):
+    async def scenario():
+        pool = make_pool(monkeypatch)
+        async with pool.client("key-a") as first:
+            pass
+        async with pool.client("key-a") as second:
+            pass
+        async with pool.client("key-b") as other:
+            pass
+        assert first is second and other is not first
+        stats = pool.stats()
+        assert (stats["clients_reused"], stats["pool_size"], stats["in_use"]) == (1, 2, 0)
+
+    asyncio.run(scenario())
+
+
+def test_client_evicted_while_in_use_is_closed_on_release(monkeypatch):
+    async def scenario():
+        pool = make_pool(monkeypatch, max_clients=1)
+        async with pool.client("key-a") as busy:
+            async with pool.client("key-b") as newer:
+                # key-a is least recently used and over the bound, but still serving
+                assert not busy.closed
+            assert pool.stats()["clients_evicted"] == 1
+            assert not busy.closed
+        assert busy.closed and not newer.closed
+
+        # An evicted key gets a fresh client
+        async with pool.client("key-a") as fresh:
+            assert fresh is not busy and not fresh.closed
+        assert newer.closed
+
+    asyncio.run(scenario())
+
+
+def test_idle_clients_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    # Patch the module's clock only; the event loop needs the real time.monotonic
+    monkeypatch.setattr(client_pool, "time", clock)
+
+    async def scenario():
+        pool = make_pool(monkeypatch, ttl=60)
+        async with pool.client("key-a") as idle:
+            pass
+        async with pool.client("key-b") as busy:
+            clock.now += 61
+            async with pool.client("key-c"):
+                pass
+            assert idle.closed
+            # A client in use is never expired
+            assert not busy.closed
+        assert pool.stats()["pool_size"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_close_closes_every_idle_client(monkeypatch):
+    async def scenario():
+        pool = make_pool(monkeypatch)
+        async with pool.client("key-a") as a:
+            pass
+        async with pool.client("key-b") as b:
+            pass
+        await pool.close()
+        assert a.closed and b.closed
+        assert pool.stats()["pool_size"] == 0
+
+    asyncio.run(scenario())
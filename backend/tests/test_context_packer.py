@@ -0,0 +1,64 @@
+# test_context_packer.py
+import pytest
+import context_packer
+from context_packer import merge_spans, select_mmr, pack_context
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    """Count words instead of tiktoken tokens, so budgets are easy to reason about"""
+    monkeypatch.setattr(context_packer, "count_tokens", lambda text: len(text.split()))
+    monkeypatch.setattr(context_packer, "truncate_tokens", lambda text, limit: " ".join(text.split()[:limit]))
+
+
+def hit(chunk_num, content, score, previous="", next_="", page_num=1, topic="tuberculosis"):
+    return {
+        "topic": topic,
+        "page_num": page_num,
+        "chunk_num": chunk_num,
+        "content": content,
+        "score": score,
+        "context": {"previous_chunk": previous, "current_chunk": content, "next_chunk": next_}
+    }
+
+
+def test_merge_spans_joins_adjacent_hits_and_their_neighbours_once():
+    spans = merge_spans([
+        hit(1, "b", 0.9, previous="a", next_="c"),
+        hit(2, "c", 0.5, previous="b", next_="d"),
+        hit(5, "f", 0.7)
+    ])
+
+    assert [(span["chunk_nums"], span["text"], span["score"]) for span in spans] == [
+        ([0, 1, 2, 3], "a b c d", 0.9),
+        ([5], "f", 0.7)
+    ]
+
+
+def test_merge_spans_keeps_pages_apart():
+    spans = merge_spans([hit(0, "a", 0.9, page_num=1), hit(1, "b", 0.8, page_num=2)])
+    assert [(span["page_num"], span["chunk_nums"]) for span in spans] == [(1, [0]), (2, [1])]
+
+
+def test_select_mmr_drops_near_duplicates_and_prefers_novel_spans():
+    spans = [
+        {"text": "rifampicin isoniazid regimen", "score": 0.9},
+        {"text": "rifampicin isoniazid regimen", "score": 0.85},
+        {"text": "rifampicin isoniazid dosing", "score": 0.8},
+        {"text": "spinal tuberculosis imaging", "score": 0.7}
+    ]
+
+    chosen = select_mmr(spans, mmr_lambda=0.5, duplicate_threshold=0.9)
+
+    assert [span["score"] for span in chosen] == [0.9, 0.7, 0.8]
+
+
+def test_pack_context_stays_within_budget_but_keeps_the_best_span():
+    results = [hit(0, "one two three four", 0.9), hit(3, "five six", 0.5)]
+
+    packed = pack_context(results, token_budget=10)
+    assert "one two three four" in packed and "five six" not in packed
+    assert len(packed.split()) <= 10
+
+    truncated = pack_context(results, token_budget=3)
+    assert truncated.split() == ["Content:", "one", "two"]
@@ -0,0 +1,95 @@
+# test_embedded_store.py
+import asyncio
+import numpy as np
+from embedded_store import EmbeddedStore
+from vector_store import Point
+
+
+def make_store(tmp_path):
+    return EmbeddedStore(collection_name="test", dimensions=2, path=str(tmp_path))
+
+
+POINTS = [
+    Point("a", [1.0, 0.0], {"topic": "TB", "level": 3, "tags": "x"}),
+    Point("b", [0.8, 0.6], {"topic": "TB", "level": 1, "tags": "y"}),
+    Point("c", [0.6, 0.8], {"topic": ["Asthma", "COPD"], "level": 3, "tags": "x"}),
+    Point("d", [0.0, 1.0], {"topic": "COPD", "level": 3, "tags": "y"})
+]
+
+
+def test_search_filters_by_indexed_and_unindexed_fields(tmp_path):
+    async def scenario():
+        store = make_store(tmp_path)
+        await store.upsert(POINTS)
+
+        hits = await store.search([1.0, 0.0], {"topic": "TB"}, limit=10)
+        assert [hit.id for hit in hits] == ["a", "b"]
+        # A list condition matches any value; a list payload matches each element
+        hits = await store.search([0.0, 1.0], {"topic": ["COPD", "TB"], "level": 3}, limit=10)
+        assert [hit.id for hit in hits] == ["d", "c", "a"]
+        # "tags" has no bitmap and is matched by scanning the payloads
+        hits = await store.search([0.0, 1.0], {"tags": "x"}, limit=1)
+        assert [hit.id for hit in hits] == ["c"]
+        assert await store.search([1.0, 0.0], {"topic": "Missing"}, limit=10) == []
+
+    asyncio.run(scenario())
+
+
+def test_scores_are_cosine_similarities(tmp_path):
+    async def scenario():
+        store = make_store(tmp_path)
+        await store.upsert([Point("a", [3.0, 4.0], {"topic": "TB"})])
+        hits = await store.search([10.0, 0.0], {}, limit=1)
+        assert np.isclose(hits[0].score, 0.6)
+
+    asyncio.run(scenario())
+
+
+def test_delete_hides_points_and_refreshes_bitmaps(tmp_path):
+    async def scenario():
+        store = make_store(tmp_path)
+        await store.upsert(POINTS)
+        assert await store.count({"topic": "TB"}) == 2
+
+        await store.delete(["a"])
+        assert [hit.id for hit in await store.search([1.0, 0.0], {"topic": "TB"}, limit=10)] == ["b"]
+        await store.delete_by_filter({"topic": "COPD"})
+        assert await store.count() == 1
+        assert await store.retrieve(["a", "b", "c"]) == {"b": POINTS[1].payload}
+
+        # Upserting a deleted ID brings it back with its new payload
+        await store.upsert([Point("a", [1.0, 0.0], {"topic": "COPD", "level": 3})])
+        assert [hit.id for hit in await store.search([1.0, 0.0], {"topic": "COPD"}, limit=10)] == ["a"]
+
+    asyncio.run(scenario())
+
+
+def test_flush_compacts_deleted_rows_and_reloads(tmp_path):
+    async def scenario():
+        store = make_store(tmp_path)
+        await store.upsert(POINTS)
+        await store.delete(["b", "c"])
+        assert store.size == 4
+        await store.flush()
+        assert store.size == 2
+        assert [hit.id for hit in await store.search([1.0, 0.0], {"level": 3}, limit=10)] == ["a", "d"]
+
+        reloaded = make_store(tmp_path)
+        assert reloaded.ids == ["a", "d"]
+        assert [hit.id for hit in await reloaded.search([0.0, 1.0], {"topic": "COPD"}, limit=10)] == ["d"]
+        # Writes after a reload move the memory-mapped matrix into memory
+        await reloaded.upsert([Point("e", [0.6, 0.8], {"topic": "COPD"})])
+        assert [hit.id for hit in await reloaded.search([0.0, 1.0], {"topic": "COPD"}, limit=10)] == ["d", "e"]
+
+    asyncio.run(scenario())
+
+
+def test_scroll_returns_matching_points_in_batches(tmp_path):
+    async def scenario():
+        store = make_store(tmp_path)
+        await store.upsert(POINTS)
+        batches = [batch async for batch in store.scroll({"level": 3}, batch_size=2, with_vectors=True)]
+        assert [[point.id for point in batch] for batch in batches] == [["a", "c"], ["d"]]
+        assert batches[0][0].vector == [1.0, 0.0]
+
+    asyncio.run(scenario())
@@ -0,0 +1,76 @@
+# test_embedding_cache.py
+import asyncio
+import sqlite3
+from array import array
+from embedded_store import EmbeddedStore
+from embedding_cache import EmbeddingCache
+from vectordb_manager import VectorDBManager
+
+
+def test_make_key_ignores_whitespace_but_not_model_or_dimensions():
+    key = EmbeddingCache.make_key("model", 1024, "chest  pain\n")
+    assert key == EmbeddingCache.make_key("model", 1024, "chest pain")
+    assert key != EmbeddingCache.make_key("model", 512, "chest pain")
+    assert key != EmbeddingCache.make_key("other", 1024, "chest pain")
+    assert key != EmbeddingCache.make_key("model", 1024, "Chest pain")
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = EmbeddingCache(path=None, memory_size=2)
+    cache.set_many([("a", [1.0]), ("b", [2.0])])
+    cache.get("a")
+    cache.set("c", [3.0])
+
+    assert cache.get_many(["a", "b", "c"]) == {"a": [1.0], "c": [3.0]}
+    assert cache.stats()["memory_evictions"] == 1
+
+
+def test_disk_tier_survives_reopen(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    cache = EmbeddingCache(path=path)
+    cache.set("a", [0.5, 0.25])
+    cache.close()
+
+    reopened = EmbeddingCache(path=path)
+    assert reopened.get("a") == [0.5, 0.25]
+    assert reopened.get("missing") is None
+    stats = reopened.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (0, 1, 1)
+    reopened.close()
+
+
+def test_disk_tier_evicts_down_below_bound(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "embeddings.sqlite3"), memory_size=1, max_disk_entries=10)
+    for i in range(11):
+        cache.set(str(i), [float(i)])
+
+    assert cache.stats()["disk_entries"] == 9
+    assert cache.get("0") is None
+    assert cache.get("10") == [10.0]
+    cache.close()
+
+
+def test_generate_embeddings_serves_cached_texts_without_api_calls(tmp_path):
+    cache = EmbeddingCache(path=None)
+    store = EmbeddedStore(collection_name="test", dimensions=2, path=str(tmp_path))
+    db = VectorDBManager(embedding_cache=cache, store=store, hybrid=False)
+    cache.set(EmbeddingCache.make_key(db.EMBEDDING_MODEL, db.dimensions, "chest pain"), [1.0, 0.0])
+
+    assert asyncio.run(db.generate_embeddings(["chest pain", " chest pain "])) == [[1.0, 0.0], [1.0, 0.0]]
+
+
+def test_opens_cache_written_before_expiry_column(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)")
+    db.execute("CREATE INDEX idx_last_used ON embeddings(last_used)")
+    db.execute("INSERT INTO embeddings VALUES (?, ?, ?)", ("a", array("f", [0.5]).tobytes(), 1.0))
+    db.commit()
+    db.close()
+
+    cache = EmbeddingCache(path=path)
+    assert cache.get("a") == [0.5]
+    cache.set("b", [1.5])
+    assert cache.get_many(["a", "b"]) == {"a": [0.5], "b": [1.5]}
+    assert cache.stats()["expired"] == 0
+    cache.close()
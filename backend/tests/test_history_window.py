@@ -0,0 +1,91 @@
+# test_history_window.py
+import pytest
+import chat_manager as chat_manager_module
+from chat_manager import ChatManager
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    """Count words instead of tiktoken tokens, so budgets are easy to reason about"""
+    monkeypatch.setattr(chat_manager_module, "count_tokens", lambda text: len(text.split()))
+    monkeypatch.setattr(chat_manager_module, "HISTORY_MESSAGE_OVERHEAD", 0)
+
+
+def messages(*word_counts):
+    return [{"role": "user", "content": " ".join(["word"] * count)} for count in word_counts]
+
+
+def test_window_keeps_the_newest_messages_that_fit():
+    assert ChatManager._window_start(messages(5, 5, 5, 5), token_budget=10) == 2
+    assert ChatManager._window_start(messages(5, 5, 5, 5), token_budget=11) == 2
+    assert ChatManager._window_start(messages(5, 5, 5, 5), token_budget=100) == 0
+
+
+def test_window_always_keeps_the_latest_message():
+    assert ChatManager._window_start(messages(5, 50), token_budget=10) == 1
+    assert ChatManager._window_start([], token_budget=10) == 0
+
+
+def test_messages_between_a_stale_summary_and_the_window_are_kept(chat_manager, monkeypatch):
+    monkeypatch.setattr(chat_manager_module, "HISTORY_TOKEN_BUDGET", 12)
+    monkeypatch.setattr(chat_manager_module, "HISTORY_STALE_OVERSHOOT_TOKENS", 100)
+    scheduled = []
+    monkeypatch.setattr(chat_manager, "_schedule_summary", lambda session_id, upto: scheduled.append(upto))
+    chat_manager.chat_histories["s"] = [
+        {"role": "user", "content": f"message {i} " + "word " * 3} for i in range(6)
+    ]
+    chat_manager.history_summaries["s"] = {"summary": "earlier", "covered": 2}
+
+    prompt, _, _ = chat_manager._build_messages("s", {"role": "user", "content": "latest"})
+
+    contents = [message["content"] for message in prompt]
+    assert contents[1] == "Summary of the earlier conversation:\nearlier"
+    assert [content.split()[1] for content in contents[2:-1]] == ["2", "3", "4", "5"]
+    assert contents[-1] == "latest"
+    assert scheduled == [4]
+
+
+def test_up_to_date_summary_leaves_the_window_alone(chat_manager, monkeypatch):
+    monkeypatch.setattr(chat_manager_module, "HISTORY_TOKEN_BUDGET", 12)
+    monkeypatch.setattr(chat_manager, "_schedule_summary", lambda session_id, upto: pytest.fail("scheduled"))
+    chat_manager.chat_histories["s"] = [
+        {"role": "user", "content": f"message {i} " + "word " * 3} for i in range(6)
+    ]
+    chat_manager.history_summaries["s"] = {"summary": "earlier", "covered": 4}
+
+    prompt, _, _ = chat_manager._build_messages("s", {"role": "user", "content": "latest"})
+
+    assert [message["content"].split()[1] for message in prompt[2:-1]] == ["4", "5"]
+
+
+def test_stale_window_is_capped_at_the_overshoot(chat_manager, monkeypatch):
+    monkeypatch.setattr(chat_manager_module, "HISTORY_TOKEN_BUDGET", 12)
+    monkeypatch.setattr(chat_manager_module, "HISTORY_STALE_OVERSHOOT_TOKENS", 6)
+    scheduled = []
+    monkeypatch.setattr(chat_manager, "_schedule_summary", lambda session_id, upto: scheduled.append(upto))
+    chat_manager.chat_histories["s"] = [
+        {"role": "user", "content": f"message {i} " + "word " * 3} for i in range(6)
+    ]
+    chat_manager.history_summaries["s"] = {"summary": "earlier", "covered": 1}
+
+    prompt, _, _ = chat_manager._build_messages("s", {"role": "user", "content": "latest"})
+
+    # Messages 1 and 2 are past the overshoot and wait for the summary to fold them in
+    assert [message["content"].split()[1] for message in prompt[2:-1]] == ["3", "4", "5"]
+    # Budget less the one-word summary, plus the overshoot
+    assert sum(len(message["content"].split()) for message in prompt[2:]) <= 11 + 6
+    assert scheduled == [4]
+
+
+def test_summary_is_dropped_when_the_window_holds_what_it_covers(chat_manager, monkeypatch):
+    monkeypatch.setattr(chat_manager_module, "HISTORY_TOKEN_BUDGET", 12)
+    monkeypatch.setattr(chat_manager, "_schedule_summary", lambda session_id, upto: pytest.fail("scheduled"))
+    chat_manager.chat_histories["s"] = [
+        {"role": "user", "content": f"message {i} " + "word " * 3} for i in range(6)
+    ]
+    chat_manager.history_summaries["s"] = {"summary": "earlier", "covered": 5}
+
+    prompt, _, _ = chat_manager._build_messages("s", {"role": "user", "content": "latest"})
+
+    assert all(not message["content"].startswith("Summary of the earlier") for message in prompt)
+    assert [message["content"].split()[1] for message in prompt[1:-1]] == ["4", "5"]
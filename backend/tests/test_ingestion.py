@@ -0,0 +1,120 @@
+# test_ingestion.py
+import asyncio
+import vectordb_manager
+from ingest_manifest import IngestManifest
+from ingestion_pipeline import IngestionPipeline
+from vectordb_manager import make_point_id
+
+
+def test_make_point_id_is_deterministic_uuid():
+    point_id = make_point_id("TB", 3, 1, 2, "text")
+    assert point_id == make_point_id("TB", 3, 1, 2, "text")
+    assert point_id != make_point_id("TB", 3, 1, 2, "other text")
+    assert len(point_id) == 36 and point_id.count("-") == 4
+
+
+def test_make_point_id_separates_parts():
+    assert make_point_id("ab", "c") != make_point_id("a", "bc")
+
+
+def ingest(vectordb, manifest, sources):
+    """Ingest {source: [line, ...]} with one record per line"""
+    def chunk(source, lines):
+        return [
+            {"id": make_point_id(source, line), "text": line, "payload": {"content": line, "topic": source}}
+            for line in lines
+        ]
+
+    pipeline = IngestionPipeline(vectordb)
+    return asyncio.run(pipeline.run(
+        list(sources), extract=sources.get, chunk=chunk, manifest=manifest,
+        source_key=str, fingerprint=lambda source: "|".join(sources[source])
+    ))
+
+
+async def stored_content(vectordb):
+    points = [point async for batch in vectordb.store.scroll() for point in batch]
+    return sorted(point.payload["content"] for point in points)
+
+
+def test_reingest_only_embeds_changes_and_deletes_stale_points(vectordb, tmp_path):
+    manifest = IngestManifest("test", manifest_dir=str(tmp_path / "manifests"))
+    ingest(vectordb, manifest, {"a": ["a1", "a2"], "b": ["b1"], "c": ["c1"]})
+    vectordb.embedded_texts.clear()
+
+    stats = ingest(vectordb, IngestManifest("test", manifest_dir=str(tmp_path / "manifests")),
+                   {"a": ["a1", "a2 edited"], "b": ["b1"]})
+
+    assert vectordb.embedded_texts == ["a2 edited"]
+    assert (stats["unchanged"], stats["records"], stats["deleted"]) == (1, 1, 2)
+    assert asyncio.run(stored_content(vectordb)) == ["a1", "a2 edited", "b1"]
+
+
+def test_neighbours_follow_an_edited_chunk_after_reingest(vectordb, tmp_path, monkeypatch):
+    monkeypatch.setattr(vectordb_manager, "CHUNK_SIZE", 3)
+    pages = {"TB": ["a b c d e f g h i"]}
+
+    def reingest():
+        pipeline = IngestionPipeline(vectordb)
+        asyncio.run(pipeline.run(
+            ["TB"], extract=pages.get, chunk=lambda topic, texts: vectordb._iter_content_records(texts, topic),
+            manifest=IngestManifest("content", manifest_dir=str(tmp_path / "manifests")),
+            source_key=str, fingerprint=lambda topic: "|".join(pages[topic])
+        ))
+
+    reingest()
+    pages["TB"] = ["a b c d e EDITED g h i"]
+    reingest()
+
+    async def hydrate_outer_chunks():
+        points = [point async for batch in vectordb.store.scroll({"level": 3}) for point in batch]
+        results = [
+            vectordb._content_result(point.id, point.payload, 1.0)
+            for point in points if point.payload["chunk_num"] != 1
+        ]
+        return {result["chunk_num"]: result["context"] for result in await vectordb.hydrate_neighbours(results)}
+
+    contexts = asyncio.run(hydrate_outer_chunks())
+    assert contexts[0]["next_chunk"] == "d e EDITED"
+    assert contexts[2]["previous_chunk"] == "d e EDITED"
+    assert contexts[0]["previous_chunk"] == contexts[2]["next_chunk"] == ""
+
+
+def test_failed_reingest_keeps_the_old_points(vectordb, tmp_path):
+    ingest(vectordb, IngestManifest("test", manifest_dir=str(tmp_path / "manifests")), {"a": ["a1", "a2"]})
+    upsert = vectordb._upsert_points
+
+    async def failing_upsert(points):
+        raise RuntimeError("store unavailable")
+
+    vectordb._upsert_points = failing_upsert
+    stats = ingest(vectordb, IngestManifest("test", manifest_dir=str(tmp_path / "manifests")),
+                   {"a": ["a1", "a2 edited"]})
+    assert (stats["errors"], stats["deleted"]) == (1, 0)
+    assert asyncio.run(stored_content(vectordb)) == ["a1", "a2"]
+
+    # The manifest still describes the old points, so the next run retries the edit
+    vectordb._upsert_points = upsert
+    ingest(vectordb, IngestManifest("test", manifest_dir=str(tmp_path / "manifests")), {"a": ["a1", "a2 edited"]})
+    assert asyncio.run(stored_content(vectordb)) == ["a1", "a2 edited"]
+
+
+def test_stale_points_survive_until_replacements_are_upserted(vectordb, tmp_path):
+    ingest(vectordb, IngestManifest("test", manifest_dir=str(tmp_path / "manifests")), {"a": ["a1", "a2"]})
+    upsert = vectordb._upsert_points
+    seen_during_upsert = []
+
+    async def observing_upsert(points):
+        seen_during_upsert.append(await stored_content(vectordb))
+        await upsert(points)
+
+    async def slow_embeddings(texts, embed=vectordb.generate_embeddings):
+        # Let chunking finish well before anything is upserted
+        await asyncio.sleep(0.05)
+        return await embed(texts)
+
+    vectordb._upsert_points = observing_upsert
+    vectordb.generate_embeddings = slow_embeddings
+    ingest(vectordb, IngestManifest("test", manifest_dir=str(tmp_path / "manifests")), {"a": ["a1", "a2 edited"]})
+    assert seen_during_upsert == [["a1", "a2"]]
+    assert asyncio.run(stored_content(vectordb)) == ["a1", "a2 edited"]
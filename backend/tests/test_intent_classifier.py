@@ -0,0 +1,68 @@
+# test_intent_classifier.py
+import asyncio
+import pytest
+from intent_classifier import IntentClassifier
+
+
+@pytest.fixture
+def classifier(vectordb):
+    return IntentClassifier(vectordb)
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("Show me a diagram of the brachial plexus", "diagram"),
+    ("Can you show me an illustration of this?", "diagram"),
+    ("Can I see a picture", "diagram"),
+    ("Quiz me on tuberculosis", "mcq"),
+    ("Please test my knowledge", "mcq"),
+    ("Give me an MCQ about this", "mcq"),
+    ("Play me a video on lumbar disc herniation", "video"),
+    ("Could I watch a video about this?", "video")
+])
+def test_unambiguous_requests_are_decided_by_rules(classifier, message, intent):
+    result = classifier.classify_by_rules(message)
+    assert result["intent"] == intent and result["source"] == "rule"
+
+
+@pytest.mark.parametrize("message", [
+    # Questions about a resource, not requests for one
+    "Can you explain the video",
+    "Could you describe what the diagram shows?",
+    "What does this image show?",
+    "Is there any image finding typical of TB?",
+    "Show me a video explaining the treatment",
+    # Requests the rules can't tell apart from ordinary questions
+    "Give me a question on this",
+    "Ask me something about TB",
+    "Is there a video about this?",
+    "Show me a diagram and quiz me on it"
+])
+def test_everything_else_is_left_to_examples_or_llm(classifier, message):
+    assert classifier.classify_by_rules(message) is None
+
+
+def test_long_messages_are_not_decided_by_rules(classifier):
+    message = "Show me a diagram " + "of the spine " * 10
+    assert classifier.classify_by_rules(message) is None
+
+
+@pytest.mark.parametrize("message", [
+    "How is tuberculosis treated?",
+    "What are the risk factors for colorectal cancer and how is it screened for in adults over fifty?",
+    "Show me how the brachial plexus is organised"
+])
+def test_messages_naming_no_resource_are_none_by_rules(classifier, message):
+    result = classifier.classify_by_rules(message)
+    assert result["intent"] == "none" and result["source"] == "rule"
+
+
+def test_plain_question_never_reaches_the_embeddings_or_the_llm(chat_manager, monkeypatch):
+    async def no_llm(*args, **kwargs):
+        raise AssertionError("the LLM was called")
+
+    monkeypatch.setattr(chat_manager, "_helper_completion", no_llm)
+    result = asyncio.run(chat_manager.classify_message_intent("How is tuberculosis treated?"))
+
+    assert result["intent"] == "none"
+    assert chat_manager.vectordb.embedded_texts == []
+    assert chat_manager.intent_classifier.stats()["rule"] == 1
@@ -0,0 +1,78 @@
+# test_llm_cache.py
+import kv_cache
+from llm_cache import LLMResponseCache
+
+MESSAGES = [{"role": "user", "content": "What is angina?"}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def test_make_key_covers_model_messages_temperature_and_params():
+    key = LLMResponseCache.make_key("model", MESSAGES, 0.2)
+    assert key == LLMResponseCache.make_key("model", [dict(MESSAGES[0])], 0.2)
+    assert key != LLMResponseCache.make_key("other", MESSAGES, 0.2)
+    assert key != LLMResponseCache.make_key("model", MESSAGES, 0.3)
+    assert key != LLMResponseCache.make_key("model", [{"role": "user", "content": "What is asthma?"}], 0.2)
+    assert key != LLMResponseCache.make_key("model", MESSAGES, 0.2, max_tokens=50)
+
+
+def test_memory_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(kv_cache.time, "time", clock.time)
+    cache = LLMResponseCache(path=None)
+    cache.put("a", "answer", ttl=60)
+
+    clock.now += 59
+    assert cache.get("a") == "answer"
+    clock.now += 1
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"], stats["expired"]) == (1, 1, 1)
+
+
+def test_disk_entries_expire_after_reopen(monkeypatch, tmp_path):
+    clock = FakeClock()
+    monkeypatch.setattr(kv_cache.time, "time", clock.time)
+    path = str(tmp_path / "llm.sqlite3")
+    cache = LLMResponseCache(path=path)
+    cache.put("short", "soon stale", ttl=10)
+    cache.put("long", "still fresh", ttl=100)
+    cache.close()
+
+    clock.now += 50
+    reopened = LLMResponseCache(path=path)
+    assert reopened.get("short") is None
+    assert reopened.get("long") == "still fresh"
+    stats = reopened.stats()
+    assert (stats["disk_hits"], stats["expired"], stats["disk_entries"]) == (1, 1, 1)
+    reopened.close()
+
+
+def test_expired_entry_counted_once_across_tiers(monkeypatch, tmp_path):
+    clock = FakeClock()
+    monkeypatch.setattr(kv_cache.time, "time", clock.time)
+    cache = LLMResponseCache(path=str(tmp_path / "llm.sqlite3"))
+    cache.put("a", "answer", ttl=10)
+
+    clock.now += 10
+    assert cache.get("a") is None
+    assert cache.stats()["expired"] == 1
+    cache.close()
+
+
+def test_stats_per_call_site():
+    cache = LLMResponseCache(path=None)
+    cache.put("a", "answer", ttl=60)
+    cache.get("a", "summary")
+    cache.get("missing", "summary")
+    cache.get("a", "mcq")
+
+    call_sites = cache.stats()["call_sites"]
+    assert call_sites["summary"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+    assert call_sites["mcq"] == {"hits": 1, "misses": 0, "hit_rate": 1.0}
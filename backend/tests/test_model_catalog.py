@@ -0,0 +1,181 @@
+# test_model_catalog.py
+import asyncio
+import httpx
+import pytest
+import model_catalog
+from model_catalog import ModelCatalog
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeOpenRouter:
+    """Serves a models body with an ETag, answering 304 to a matching If-None-Match"""
+
+    def __init__(self):
+        self.body = b'{"data": [{"id": "model-a"}]}'
+        self.etag = '"v1"'
+        self.status = 200
+        self.requests = []
+        self.release = None
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.release is not None:
+            await self.release.wait()
+        if self.status != 200:
+            return httpx.Response(self.status, request=request)
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304, request=request)
+        return httpx.Response(200, content=self.body, headers={"ETag": self.etag}, request=request)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    # Patch the module's clock only; the event loop needs the real time.monotonic
+    monkeypatch.setattr(model_catalog, "time", clock)
+    return clock
+
+
+def make_catalog(upstream, **kwargs):
+    catalog = ModelCatalog(url="https://openrouter.test/models", ttl=60, stale_ttl=300, **kwargs)
+    catalog.http_client = httpx.AsyncClient(transport=httpx.MockTransport(upstream.handle))
+    return catalog
+
+
+async def settle(catalog):
+    """Wait for background refreshes to finish"""
+    await asyncio.gather(*catalog._inflight.values(), return_exceptions=True)
+
+
+def test_fresh_entry_is_served_from_cache(clock):
+    async def scenario():
+        upstream = FakeOpenRouter()
+        catalog = make_catalog(upstream)
+        first = await catalog.get("key")
+        clock.now += 59
+        assert await catalog.get("key") is first
+        assert len(upstream.requests) == 1
+        assert upstream.requests[0].headers["Authorization"] == "Bearer key"
+        assert catalog.max_age(first) == 1
+        assert (catalog.stats()["misses"], catalog.stats()["hits"]) == (1, 1)
+        await catalog.close()
+
+    asyncio.run(scenario())
+
+
+def test_stale_entry_is_served_while_refreshing_with_etag(clock):
+    async def scenario():
+        upstream = FakeOpenRouter()
+        catalog = make_catalog(upstream)
+        entry = await catalog.get("key")
+        clock.now += 120
+
+        assert await catalog.get("key") is entry
+        await settle(catalog)
+        # The upstream ETag made the refresh a 304, which only renews the entry
+        assert upstream.requests[1].headers["If-None-Match"] == '"v1"'
+        assert (catalog.stats()["stale_hits"], catalog.stats()["not_modified"]) == (1, 1)
+        assert entry["fetched_at"] == clock.now
+
+        upstream.body, upstream.etag = b'{"data": []}', '"v2"'
+        clock.now += 120
+        await catalog.get("key")
+        await settle(catalog)
+        refreshed = await catalog.get("key")
+        assert refreshed["body"] == b'{"data": []}'
+        assert refreshed["etag"] != entry["etag"]
+        await catalog.close()
+
+    asyncio.run(scenario())
+
+
+def test_entry_past_stale_window_is_refetched_before_returning(clock):
+    async def scenario():
+        upstream = FakeOpenRouter()
+        catalog = make_catalog(upstream)
+        await catalog.get("key")
+        upstream.body, upstream.etag = b'{"data": []}', '"v2"'
+        clock.now += 361
+        assert (await catalog.get("key"))["body"] == b'{"data": []}'
+        assert catalog.stats()["misses"] == 2
+        await catalog.close()
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_misses_share_one_fetch(clock):
+    async def scenario():
+        upstream = FakeOpenRouter()
+        upstream.release = asyncio.Event()
+        catalog = make_catalog(upstream)
+        waiters = [asyncio.create_task(catalog.get("key")) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        upstream.release.set()
+        entries = await asyncio.gather(*waiters)
+
+        assert len(upstream.requests) == 1
+        assert all(entry is entries[0] for entry in entries)
+        assert catalog.stats()["coalesced"] == 4
+        await catalog.close()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_fetch(clock):
+    async def scenario():
+        upstream = FakeOpenRouter()
+        upstream.release = asyncio.Event()
+        catalog = make_catalog(upstream)
+        leaver = asyncio.create_task(catalog.get("key"))
+        stayer = asyncio.create_task(catalog.get("key"))
+        await asyncio.sleep(0.01)
+        leaver.cancel()
+        upstream.release.set()
+
+        assert (await stayer)["body"] == upstream.body
+        assert len(upstream.requests) == 1
+        await catalog.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_fetch_raises_without_a_cached_entry_and_keeps_a_stale_one(clock):
+    async def scenario():
+        upstream = FakeOpenRouter()
+        upstream.status = 401
+        catalog = make_catalog(upstream)
+        with pytest.raises(httpx.HTTPStatusError):
+            await catalog.get("key")
+
+        upstream.status = 200
+        entry = await catalog.get("key")
+        upstream.status = 502
+        clock.now += 120
+        assert await catalog.get("key") is entry
+        await settle(catalog)
+        assert catalog.stats()["inflight"] == 0
+        assert await catalog.get("key") is entry
+        await catalog.close()
+
+    asyncio.run(scenario())
+
+
+def test_entries_are_cached_per_key_up_to_max_entries(clock):
+    async def scenario():
+        upstream = FakeOpenRouter()
+        catalog = make_catalog(upstream, max_entries=2)
+        for api_key in ("a", "b", "c"):
+            await catalog.get(api_key)
+        await catalog.get("a")
+        assert catalog.stats()["entries"] == 2
+        assert len(upstream.requests) == 4
+        await catalog.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,23 @@
+# test_qdrant_store.py
+import asyncio
+import pytest
+from qdrant_client import AsyncQdrantClient
+from qdrant_store import QdrantStore
+
+
+def test_existing_collection_with_other_dimensions_is_refused():
+    async def scenario():
+        client = AsyncQdrantClient(location=":memory:")
+        existing = QdrantStore(url=None, api_key=None, collection_name="test", dimensions=4, quantization="none")
+        existing.client = client
+        await existing.ensure_collection()
+
+        configured = QdrantStore(url=None, api_key=None, collection_name="test", dimensions=8, quantization="none")
+        configured.client = client
+        with pytest.raises(ValueError, match="holds 4d vectors but 8d"):
+            await configured.ensure_collection()
+
+        # The matching size still opens fine
+        await existing.ensure_collection()
+
+    asyncio.run(scenario())
@@ -0,0 +1,60 @@
+# test_rate_limiter.py
+import asyncio
+import rate_limiter
+from rate_limiter import TokenBucket, OpenAIRateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_bucket_waits_once_empty_and_refills_over_time(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    bucket = TokenBucket(capacity=10, refill_per_second=2)
+
+    assert bucket.reserve(10) == 0.0
+    assert bucket.reserve(4) == 2.0
+    clock.now += 2
+    # The refill pays off the debt but leaves nothing spare
+    assert bucket.reserve(2) == 1.0
+
+
+def test_bucket_never_refills_past_capacity(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    bucket = TokenBucket(capacity=10, refill_per_second=2)
+
+    clock.now += 60
+    assert bucket.reserve(10) == 0.0
+    assert bucket.reserve(1) == 0.5
+
+
+def test_oversized_request_is_charged_one_full_bucket(monkeypatch):
+    monkeypatch.setattr(rate_limiter.time, "monotonic", FakeClock())
+    bucket = TokenBucket(capacity=10, refill_per_second=1)
+
+    assert bucket.reserve(50) == 0.0
+    assert bucket.reserve(1) == 1.0
+
+
+def test_limiter_waits_for_the_tighter_quota(monkeypatch):
+    monkeypatch.setattr(rate_limiter.time, "monotonic", FakeClock())
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", fake_sleep)
+    limiter = OpenAIRateLimiter(requests_per_minute=60, tokens_per_minute=600)
+
+    asyncio.run(limiter.acquire(600))
+    asyncio.run(limiter.acquire(100))
+
+    # The request bucket still has room; the token bucket needs 100 / 10 per second
+    assert sleeps == [10.0]
+    assert limiter.total_wait == 10.0
@@ -0,0 +1,95 @@
+# test_sparse_index.py
+import asyncio
+import pytest
+import vectordb_manager
+from conftest import fake_embedding
+from sparse_index import SparseIndex, reciprocal_rank_fusion, tokenize
+from vector_store import Point
+
+
+def test_tokenize_keeps_medical_identifiers_and_drops_stopwords():
+    assert tokenize("What is the IL-6 level in BRCA1 carriers, 77.4?") == ["il-6", "level", "brca1", "carriers", "77.4"]
+
+
+def test_rrf_rewards_ids_ranked_well_by_both_lists():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "a"]], k=60)
+    assert [point_id for point_id, _ in fused] == ["b", "a", "c"]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
+
+
+def test_rrf_keeps_ids_found_by_one_list_only():
+    fused = dict(reciprocal_rank_fusion([["a"], ["b"]], k=60))
+    assert fused == {"a": pytest.approx(1 / 61), "b": pytest.approx(1 / 61)}
+
+
+def test_bm25_ranks_rare_terms_and_filters_by_topic(tmp_path):
+    index = SparseIndex("test", index_dir=str(tmp_path))
+    index.add("1", "rifampicin resistance in tuberculosis", topic="tb")
+    index.add("2", "tuberculosis treatment duration", topic="tb")
+    index.add("3", "tuberculosis of the spine", topic="spine")
+
+    ranked = index.search("rifampicin tuberculosis")
+    assert ranked[0][0] == "1"
+    assert {point_id for point_id, _ in index.search("tuberculosis", topic="tb")} == {"1", "2"}
+
+
+def test_removal_updates_statistics_and_survives_reload(tmp_path):
+    index = SparseIndex("test", index_dir=str(tmp_path))
+    index.add("1", "pleural effusion", topic="tb")
+    index.add("2", "pleural thickening", topic="tb")
+    index.remove(["1"])
+    index.save()
+
+    reloaded = SparseIndex("test", index_dir=str(tmp_path))
+    assert len(reloaded) == 1
+    assert reloaded.total_length == 2
+    assert "effusion" not in reloaded.postings
+    assert reloaded.search("pleural") == index.search("pleural")
+
+
+def test_reloaded_picks_up_a_file_rewritten_elsewhere(tmp_path):
+    serving = SparseIndex("test", index_dir=str(tmp_path))
+    assert serving.reloaded() is None
+
+    ingesting = SparseIndex("test", index_dir=str(tmp_path))
+    ingesting.add("1", "miliary tuberculosis", topic="tb")
+    ingesting.save()
+    # The writer's own save doesn't count as a change to reload
+    assert ingesting.reloaded() is None
+
+    fresh = serving.reloaded()
+    assert [point_id for point_id, _ in fresh.search("miliary")] == ["1"]
+    assert fresh.reloaded() is None
+
+    # Unsaved local changes are never thrown away by a reload
+    fresh.add("2", "spinal tuberculosis", topic="tb")
+    ingesting.add("3", "abdominal tuberculosis", topic="tb")
+    ingesting.save()
+    assert fresh.reloaded() is None
+
+
+def test_search_sees_chunks_indexed_by_another_process(vectordb, tmp_path, monkeypatch):
+    monkeypatch.setattr(vectordb_manager, "SPARSE_INDEX_RELOAD_INTERVAL", 0)
+    vectordb.sparse_index = SparseIndex("test", index_dir=str(tmp_path / "sparse"))
+    ingesting = SparseIndex("test", index_dir=str(tmp_path / "sparse"))
+    ingesting.add("1", "miliary tuberculosis", topic="tb")
+    ingesting.save()
+
+    asyncio.run(vectordb.refresh_sparse_index())
+    assert len(vectordb.sparse_index) == 1
+
+
+def test_startup_rebuilds_an_index_out_of_step_with_the_collection(vectordb, tmp_path):
+    async def scenario():
+        await vectordb.store.upsert([
+            Point("a", fake_embedding("a"), {"level": 3, "topic": "tb", "content": "miliary tuberculosis"}),
+            Point("b", fake_embedding("b"), {"level": 2, "topic": "tb", "content": "page text"}),
+            Point("c", fake_embedding("c"), {"level": 3, "topic": "tb", "content": "spinal tuberculosis"})
+        ])
+        vectordb.sparse_index = SparseIndex("test", index_dir=str(tmp_path / "sparse"))
+        vectordb.sparse_index.add("deleted", "stale chunk", topic="tb")
+        await vectordb.create_collection()
+        return set(vectordb.sparse_index.docs)
+
+    # Ingested on another host: the local file lacks a chunk and still holds a deleted one
+    assert asyncio.run(scenario()) == {"a", "c"}
@@ -0,0 +1,82 @@
+# test_topic_matcher.py
+import asyncio
+import pytest
+from topic_matcher import TopicMatcher
+
+
+@pytest.fixture
+def matcher():
+    return TopicMatcher()
+
+
+@pytest.mark.parametrize("text, topic", [
+    ("Tell me about tuberculosis", "tuberculosis"),
+    ("What is the first-line treatment for TB?", "tuberculosis"),
+    ("how is turners syndrome diagnosed", "turner_syndrome"),
+    ("symptoms of trigeminal neuralgia", "trigeminal_neuralgia"),
+    ("Explain trigeminal neuralgai", "trigeminal_neuralgia"),
+    ("Quiz me on lumbar disc herniation", "lumbar_disc_herniation"),
+    ("is a herniated lumbar disc painful", "lumbar_disc_herniation")
+])
+def test_names_aliases_and_misspellings_match(matcher, text, topic):
+    assert matcher.match(text) == topic
+
+
+@pytest.mark.parametrize("text", [
+    # Look-alikes of lumbar_disc_herniation
+    "What causes cervical disc herniation?",
+    "Why is LDH raised in haemolysis?",
+    "How is a slipped disc in the neck treated?",
+    # Two topics, or none
+    "Compare tuberculosis with colorectal cancer",
+    "What is sarcoidosis?"
+])
+def test_look_alikes_and_several_topics_do_not_match(matcher, text):
+    assert matcher.match(text) is None
+
+
+def test_topics_in_orders_by_first_mention(matcher):
+    assert matcher.topics_in("colon cancer or TB?") == ["colorectal_cancer", "tuberculosis"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Show me a diagram", True),
+    ("Can you give me another MCQ please?", True),
+    ("Show me a diagram of the spine", False),
+    ("What about sarcoidosis?", False)
+])
+def test_names_no_subject(text, expected):
+    assert TopicMatcher.names_no_subject(text) is expected
+
+
+def session_with_topic(chat_manager, llm_topics):
+    """A session whose topic is tuberculosis, with the chat LLM fallback answering from llm_topics"""
+    llm_calls = []
+
+    async def extract_with_llm(session_id):
+        llm_calls.append(session_id)
+        return {"success": True, "topic": llm_topics.pop(0), "confidence": 0.9, "message": None}
+
+    chat_manager._extract_topic_from_chat_llm = extract_with_llm
+    chat_manager.chat_histories["s"] = [
+        {"role": "user", "content": "Tell me about tuberculosis"},
+        {"role": "assistant", "content": "It is an infection caused by mycobacteria."}
+    ]
+    assert asyncio.run(chat_manager.extract_topic_from_chat("s"))["topic"] == "tuberculosis"
+    return llm_calls
+
+
+def test_cached_topic_carries_over_bare_requests(chat_manager):
+    llm_calls = session_with_topic(chat_manager, [])
+    chat_manager.chat_histories["s"].append({"role": "user", "content": "Show me a diagram"})
+
+    assert asyncio.run(chat_manager.extract_topic_from_chat("s"))["topic"] == "tuberculosis"
+    assert llm_calls == []
+
+
+def test_unknown_subject_is_not_answered_from_the_cache(chat_manager):
+    llm_calls = session_with_topic(chat_manager, [None])
+    chat_manager.chat_histories["s"].append({"role": "user", "content": "Now tell me about sarcoidosis"})
+
+    assert asyncio.run(chat_manager.extract_topic_from_chat("s"))["topic"] is None
+    assert llm_calls == ["s"]
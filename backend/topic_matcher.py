@@ -0,0 +1,64 @@
+# topic_matcher.py
+import re
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+from sparse_index import tokenize
+from constants import VALID_TOPICS, TOPIC_ALIASES, TOPIC_FUZZY_THRESHOLD, TOPIC_FUZZY_MIN_LENGTH
+
+# Words that make up a bare request ("show me a diagram about this") rather than naming a subject
+_REQUEST_WORDS = frozenset("""
+show give send find see want need can could would please me my i you we us our something anything
+one another more some any other new next same topic subject about explain explaining explains related
+diagram diagrams picture pictures image images illustration illustrations figure figures chart charts
+video videos clip clips watch mcq mcqs quiz question questions practice test knowledge
+""".split())
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9',]+", text.lower()))
+
+
+class TopicMatcher:
+    """Find VALID_TOPICS mentioned in text by name, alias or a close misspelling"""
+
+    def __init__(self, valid_topics: Dict[str, str] = VALID_TOPICS,
+                 aliases: Dict[str, List[str]] = TOPIC_ALIASES,
+                 threshold: float = TOPIC_FUZZY_THRESHOLD):
+        self.threshold = threshold
+        self.names = {
+            _normalize(name): topic
+            for topic, names in ((topic, [display, *aliases.get(topic, [])]) for topic, display in valid_topics.items())
+            for name in names
+        }
+
+    def topics_in(self, text: str) -> List[str]:
+        """Topics mentioned in `text`, in order of first mention"""
+        normalized = f" {_normalize(text)} "
+        words = normalized.split()
+        found = {}
+        for name, topic in self.names.items():
+            position = normalized.find(f" {name} ")
+            if position < 0 and len(name) >= TOPIC_FUZZY_MIN_LENGTH:
+                position = self._fuzzy_find(words, name)
+            if position >= 0 and (topic not in found or position < found[topic]):
+                found[topic] = position
+        return sorted(found, key=found.get)
+
+    def _fuzzy_find(self, words: List[str], name: str) -> int:
+        size = len(name.split())
+        for start in range(len(words) - size + 1):
+            candidate = " ".join(words[start:start + size])
+            if SequenceMatcher(None, candidate, name).ratio() >= self.threshold:
+                # Character offset, like an exact match's
+                return len(" ".join(words[:start])) + 1 if start else 0
+        return -1
+
+    def match(self, text: str) -> Optional[str]:
+        """The topic `text` mentions, if it mentions exactly one"""
+        topics = self.topics_in(text)
+        return topics[0] if len(topics) == 1 else None
+
+    @staticmethod
+    def names_no_subject(text: str) -> bool:
+        """True for bare requests that can't be mentioning any topic"""
+        return all(token in _REQUEST_WORDS for token in tokenize(text))
@@ -1,7 +1,10 @@
 # utils.py
 import logging
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterable, Iterator, List
+import tiktoken
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,6 +16,31 @@ def log_info(msg: str):
 def log_error(msg: str):
     logger.error(msg)
 
+@lru_cache(maxsize=None)
+def _get_encoding(encoding_name: str):
+    return tiktoken.get_encoding(encoding_name)
+
+def count_tokens(text: str, encoding_name: str = "cl100k_base") -> int:
+    """Count tokens in text using the tokenizer shared by OpenAI chat and embedding models"""
+    return len(_get_encoding(encoding_name).encode(text))
+
+def truncate_tokens(text: str, max_tokens: int, encoding_name: str = "cl100k_base") -> str:
+    """Truncate text to at most max_tokens tokens"""
+    encoding = _get_encoding(encoding_name)
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """Yield lists of up to `size` items from any iterable without materializing it"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
 def get_topic_path(topic: str) -> str:
     """Get the full path for a topic's folder"""
     from constants import TOPICS
@@ -0,0 +1,86 @@
+# vector_store.py
+from collections import namedtuple
+from typing import Any, AsyncIterator, Dict, List, Optional
+from constants import VECTOR_BACKEND
+
+# A stored vector with its payload, as written by upsert and read back by scroll
+Point = namedtuple("Point", ["id", "vector", "payload"])
+# A search result; payload is the full stored payload
+SearchHit = namedtuple("SearchHit", ["id", "score", "payload"])
+# One search of a batch
+SearchQuery = namedtuple("SearchQuery", ["vector", "conditions", "limit"])
+
+
+class VectorStore:
+    """
+    Storage and search backend behind VectorDBManager.
+
+    Filters are {field: value} dicts whose conditions must all hold; a list
+    value matches any of its values. Vectors are compared by cosine similarity.
+    """
+
+    collection_name: str
+    dimensions: int
+    quantization: str
+
+    async def ensure_collection(self):
+        """Create the collection if needed and prepare it for filtered search"""
+        raise NotImplementedError
+
+    async def load_collection_config(self):
+        """Adopt the vector size and quantization of the existing collection"""
+        raise NotImplementedError
+
+    async def upsert(self, points: List[Point]):
+        raise NotImplementedError
+
+    async def search(self, vector: List[float], conditions: Dict[str, Any], limit: int,
+                     exact: bool = False) -> List[SearchHit]:
+        """Top `limit` points matching conditions; `exact` bypasses any approximate index"""
+        raise NotImplementedError
+
+    async def search_batch(self, queries: List[SearchQuery]) -> List[List[SearchHit]]:
+        """Results for each query, in order; backends with a batch endpoint
+        answer them in one round trip"""
+        return [await self.search(query.vector, query.conditions, query.limit) for query in queries]
+
+    async def retrieve(self, ids: List[str], fields: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Payloads (restricted to `fields` if given) of the points that exist, by ID"""
+        raise NotImplementedError
+
+    def scroll(self, conditions: Optional[Dict[str, Any]] = None, batch_size: int = 256,
+               with_vectors: bool = False) -> AsyncIterator[List[Point]]:
+        """Iterate over every point matching conditions, a batch at a time"""
+        raise NotImplementedError
+
+    async def delete(self, ids: List[str]):
+        raise NotImplementedError
+
+    async def delete_by_filter(self, conditions: Dict[str, Any]):
+        raise NotImplementedError
+
+    async def count(self, conditions: Optional[Dict[str, Any]] = None) -> int:
+        raise NotImplementedError
+
+    async def wait_until_indexed(self):
+        """Block until recent writes are searchable at full speed"""
+
+    async def flush(self):
+        """Persist buffered writes; a no-op for backends that write through"""
+
+    async def close(self):
+        await self.flush()
+
+
+def make_vector_store(backend: str = VECTOR_BACKEND, **kwargs) -> VectorStore:
+    """Build the configured backend ("qdrant" or "embedded"); backends are
+    imported lazily so an embedded deployment doesn't need a Qdrant client"""
+    if backend == "qdrant":
+        from qdrant_store import QdrantStore
+        return QdrantStore(**kwargs)
+    if backend == "embedded":
+        from embedded_store import EmbeddedStore
+        kwargs.pop("url", None)
+        kwargs.pop("api_key", None)
+        return EmbeddedStore(**kwargs)
+    raise ValueError(f"Unknown vector backend: {backend}")
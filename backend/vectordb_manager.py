@@ -1,65 +1,231 @@
 # vectordb_manager.py
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Tuple, Union
+from itertools import chain
+import asyncio
+import hashlib
+import time
 import uuid
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
-from utils import log_info, log_error
-from constants import CHUNK_SIZE, PAGE_SIZE, VECTOR_SIZE, COLLECTION_NAME
+from openai import AsyncOpenAI
+from vector_store import VectorStore, Point, SearchHit, SearchQuery, make_vector_store
+from embedding_cache import EmbeddingCache
+from sparse_index import SparseIndex, reciprocal_rank_fusion
+from rate_limiter import OpenAIRateLimiter
+from utils import log_info, log_error, count_tokens, truncate_tokens, batched
+from constants import (
+    CHUNK_SIZE, PAGE_SIZE, VECTOR_SIZE, COLLECTION_NAME, QUANTIZATION, VECTOR_BACKEND,
+    HYBRID_SEARCH, HYBRID_CANDIDATES, RRF_K, SPARSE_INDEX_RELOAD_INTERVAL, SEARCH_TYPES, HIERARCHICAL_SEARCH, HIERARCHICAL_PAGES,
+    ADAPTIVE_TOP_K, ADAPTIVE_OVERFETCH, ADAPTIVE_MIN_K, ADAPTIVE_MIN_SCORE_RATIO, ADAPTIVE_ELBOW_FACTOR,
+    EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_TOKENS, EMBEDDING_MAX_INPUT_TOKENS, UPSERT_BATCH_SIZE
+)
 load_dotenv()
-client = OpenAI()
 # Setup OpenAI
-client.api_key = os.getenv("OPENAI_API_KEY")
+client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def make_point_id(*parts: Any) -> str:
+    """Deterministic point ID (a UUID string) derived from a content hash of parts"""
+    raw = "\x00".join(str(part) for part in parts)
+    return str(uuid.UUID(hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]))
+
+def adaptive_cutoff(scores: List[float], max_k: int, min_k: int = ADAPTIVE_MIN_K,
+                    min_score_ratio: float = ADAPTIVE_MIN_SCORE_RATIO,
+                    elbow_factor: float = ADAPTIVE_ELBOW_FACTOR) -> Tuple[int, str]:
+    """
+    Choose how many of the descending `scores` to keep, between min_k and
+    max_k: stop at the first score below min_score_ratio of the best one, or
+    at the "elbow" where the drop to the next score is elbow_factor times the
+    average drop across all candidates. Returns (k, reason).
+    """
+    if len(scores) <= min_k:
+        return len(scores), "fewer candidates than min_k"
+    top = scores[0]
+    drops = [scores[i] - scores[i + 1] for i in range(len(scores) - 1)]
+    average_drop = sum(drops) / len(drops)
+    for k in range(min_k, min(max_k, len(scores))):
+        if top > 0 and scores[k] < top * min_score_ratio:
+            return k, f"score {scores[k]:.3f} below {min_score_ratio:.0%} of top {top:.3f}"
+        if average_drop > 0 and drops[k - 1] >= elbow_factor * average_drop:
+            return k, f"elbow: drop {drops[k - 1]:.3f} vs average {average_drop:.3f}"
+    return min(max_k, len(scores)), "max_k"
+
 class VectorDBManager:
-    def __init__(self, url: str, api_key: str):
-        self.client = QdrantClient(url=url, api_key=api_key)
+    def __init__(self, url: str = None, api_key: str = None, embedding_cache: EmbeddingCache = None,
+                 rate_limiter: OpenAIRateLimiter = None, collection_name: str = COLLECTION_NAME,
+                 dimensions: int = VECTOR_SIZE, quantization: str = QUANTIZATION,
+                 backend: str = VECTOR_BACKEND, store: VectorStore = None,
+                 hybrid: bool = HYBRID_SEARCH, sparse_index: SparseIndex = None):
+        # Qdrant (url/api_key) or the in-process embedded store, see vector_store.py
+        self.store = store or make_vector_store(
+            backend,
+            url=url,
+            api_key=api_key,
+            collection_name=collection_name,
+            dimensions=dimensions,
+            quantization=quantization
+        )
+        self.collection_name = collection_name
         self.EMBEDDING_MODEL = "text-embedding-3-large"
-        
-        # Initialize collection
-        self.create_collection()
+        # text-embedding-3 models can return shortened embeddings via `dimensions`
+        self.dimensions = self.store.dimensions
+        self.quantization = quantization
+        self.embedding_cache = embedding_cache or EmbeddingCache()
+        self.rate_limiter = rate_limiter
+        # BM25 over content chunks, kept in step with every upsert and delete
+        if sparse_index is None and hybrid:
+            sparse_index = SparseIndex(collection_name)
+        self.sparse_index = sparse_index
+        self._sparse_checked_at = time.monotonic()
 
-    def create_collection(self):
-        """Create collection if it doesn't exist"""
+    async def create_collection(self):
+        """Create collection if it doesn't exist and prepare it for filtered
+        search; call once before use"""
         try:
-            if not self.client.collection_exists(COLLECTION_NAME):
-                self.client.create_collection(
-                    collection_name=COLLECTION_NAME,
-                    vectors_config=VectorParams(
-                        size=VECTOR_SIZE,
-                        distance=Distance.COSINE
-                    )
-                )
-                log_info(f"Collection {COLLECTION_NAME} created")
-            else:
-                log_info(f"Collection {COLLECTION_NAME} already exists")
+            await self.store.ensure_collection()
+            if self.sparse_index is not None:
+                chunks = await self.store.count({"level": 3})
+                if len(self.sparse_index) != chunks:
+                    log_info(f"Sparse index holds {len(self.sparse_index)} chunks but the collection {chunks}, rebuilding")
+                    await self.rebuild_sparse_index()
         except Exception as e:
             log_error(f"Error creating collection: {e}")
             raise e
 
-    def generate_embedding(self, text: str) -> List[float]:
+    async def rebuild_sparse_index(self):
+        """Index every stored content chunk from scratch, e.g. for a collection
+        ingested before hybrid search or on a host other than the ingesting one"""
+        self.sparse_index.clear()
+        async for points in self.store.scroll({"level": 3}, batch_size=UPSERT_BATCH_SIZE):
+            self._index_sparse(points)
+        self.sparse_index.save()
+        log_info(f"Sparse index holds {len(self.sparse_index)} chunks")
+
+    async def refresh_sparse_index(self):
+        """Pick up a sparse index file rewritten by an ingestion script since it
+        was loaded, checking at most every SPARSE_INDEX_RELOAD_INTERVAL seconds"""
+        if self.sparse_index is None or time.monotonic() - self._sparse_checked_at < SPARSE_INDEX_RELOAD_INTERVAL:
+            return
+        self._sparse_checked_at = time.monotonic()
+        reloaded = await asyncio.to_thread(self.sparse_index.reloaded)
+        if reloaded is not None:
+            # Swapped whole, so a search in progress never sees a half-loaded index
+            self.sparse_index = reloaded
+
+    def _index_sparse(self, points: List[Point]):
+        if self.sparse_index is None:
+            return
+        for point in points:
+            if point.payload.get("level") == 3:
+                self.sparse_index.add(point.id, point.payload["content"], point.payload.get("topic"))
+
+    async def flush(self):
+        """Persist buffered writes (the embedded store and sparse index write their files here)"""
+        await self.store.flush()
+        if self.sparse_index is not None:
+            self.sparse_index.save()
+
+    async def generate_embedding(self, text: str) -> List[float]:
         """Generate embedding using OpenAI"""
-        try:
-            response = client.embeddings.create(
-                input=text,
-                model=self.EMBEDDING_MODEL
-            )
-            return response.data[0].embedding
-        except Exception as e:
-            log_error(f"Error generating embedding: {e}")
-            raise e
+        return (await self.generate_embeddings([text]))[0]
 
-    def _split_into_pages(self, content: str) -> List[str]:
-        """Split content into pages based on word count"""
-        words = content.split()
-        pages = []
-        
-        for i in range(0, len(words), PAGE_SIZE):
-            page = ' '.join(words[i:i + PAGE_SIZE])
-            pages.append(page)
-        
-        return pages
+    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for many texts, serving repeats from the cache and
+        batching the remaining requests within API limits"""
+        keys = [EmbeddingCache.make_key(self.EMBEDDING_MODEL, self.dimensions, text) for text in texts]
+        # SQLite lookups block, so keep them off the event loop
+        cached = await asyncio.to_thread(self.embedding_cache.get_many, keys)
+
+        # Embed each distinct uncached text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            missing_keys = list(missing)
+            embedded = []
+            for batch, batch_tokens in self._batch_for_embedding([missing[key] for key in missing_keys]):
+                if self.rate_limiter:
+                    await self.rate_limiter.acquire(batch_tokens)
+                try:
+                    response = await client.embeddings.create(
+                        input=batch,
+                        model=self.EMBEDDING_MODEL,
+                        dimensions=self.dimensions
+                    )
+                except Exception as e:
+                    log_error(f"Error generating embeddings for batch of {len(batch)}: {e}")
+                    raise e
+                embedded.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+                log_info(f"Embedded batch of {len(batch)} texts")
+            new_entries = list(zip(missing_keys, embedded))
+            await asyncio.to_thread(self.embedding_cache.set_many, new_entries)
+            cached.update(new_entries)
+
+        return [cached[key] for key in keys]
+
+    def _batch_for_embedding(self, texts: List[str]):
+        """Group texts into batches that respect the input-count and token limits"""
+        batch = []
+        batch_tokens = 0
+        for text in texts:
+            tokens = count_tokens(text)
+            if tokens > EMBEDDING_MAX_INPUT_TOKENS:
+                log_info(f"Truncating embedding input from {tokens} to {EMBEDDING_MAX_INPUT_TOKENS} tokens")
+                text = truncate_tokens(text, EMBEDDING_MAX_INPUT_TOKENS)
+                tokens = EMBEDDING_MAX_INPUT_TOKENS
+            if batch and (len(batch) >= EMBEDDING_BATCH_SIZE or batch_tokens + tokens > EMBEDDING_BATCH_TOKENS):
+                yield batch, batch_tokens
+                batch = []
+                batch_tokens = 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            yield batch, batch_tokens
+
+    async def _upsert_points(self, points: List[Point]):
+        """Write points to the store in large batches"""
+        for i in range(0, len(points), UPSERT_BATCH_SIZE):
+            await self.store.upsert(points[i:i + UPSERT_BATCH_SIZE])
+        self._index_sparse(points)
+
+    def _build_points(self, records: List[Dict[str, Any]], embeddings: List[List[float]]) -> List[Point]:
+        """Pair records ({"id", "text", "payload"}) with their embeddings"""
+        return [
+            Point(record["id"], embedding, record["payload"])
+            for record, embedding in zip(records, embeddings)
+        ]
+
+    async def delete_points(self, point_ids: List[str]):
+        """Delete points by ID"""
+        for i in range(0, len(point_ids), UPSERT_BATCH_SIZE):
+            await self.store.delete(point_ids[i:i + UPSERT_BATCH_SIZE])
+        if self.sparse_index is not None:
+            self.sparse_index.remove(point_ids)
+        log_info(f"Deleted {len(point_ids)} points")
+
+    async def delete_by_filter(self, conditions: Dict[str, Any]):
+        """Delete every point whose payload matches all conditions"""
+        await self.store.delete_by_filter(conditions)
+        if self.sparse_index is not None:
+            self.sparse_index.remove_matching(conditions)
+        log_info(f"Deleted points matching {conditions}")
+
+    async def _embed_and_upsert(self, records: List[Dict[str, Any]]):
+        """Embed records in batches and upsert them as points"""
+        embeddings = await self.generate_embeddings([record["text"] for record in records])
+        await self._upsert_points(self._build_points(records, embeddings))
+
+    def _iter_pages(self, page_texts: Iterable[str]) -> Iterator[str]:
+        """Regroup a stream of extracted page texts into PAGE_SIZE-word pages,
+        holding at most one page of words at a time"""
+        words = []
+        for text in page_texts:
+            words.extend(text.split())
+            while len(words) >= PAGE_SIZE:
+                yield ' '.join(words[:PAGE_SIZE])
+                del words[:PAGE_SIZE]
+        if words:
+            yield ' '.join(words)
 
     def _split_into_chunks(self, content: str) -> List[str]:
         """Split content into chunks based on word count"""
@@ -72,130 +238,179 @@ class VectorDBManager:
             
         return chunks
 
-    def _get_sibling_chunks(self, chunks: List[str], chunk_index: int) -> Dict[str, str]:
-        """Get previous and next chunks as context"""
-        return {
-            "previous_chunk": chunks[chunk_index - 1] if chunk_index > 0 else "",
-            "current_chunk": chunks[chunk_index],
-            "next_chunk": chunks[chunk_index + 1] if chunk_index < len(chunks) - 1 else ""
+    def _iter_content_records(self, page_texts: Iterable[str], topic: str) -> Iterator[Dict[str, Any]]:
+        """Lazily build topic (level 1), page (level 2) and chunk (level 3) records
+        from a stream of page texts"""
+        pages = self._iter_pages(page_texts)
+        first_page = next(pages, None)
+        if first_page is None:
+            log_error(f"No content found for topic: {topic}")
+            return
+
+        yield {
+            "id": make_point_id(topic, 1, topic),
+            "text": topic,
+            "payload": {
+                "content": topic,
+                "topic": topic,
+                "level": 1
+            }
         }
 
-    def add_medical_content(self, content: str, topic: str):
-        """Add medical content with hierarchical structure"""
-        try:
-            # Level 1: Topic level
-            topic_embedding = self.generate_embedding(topic)
-            topic_point = PointStruct(
-                id=int(uuid.uuid4().hex[:8], 16),
-                vector=topic_embedding,
-                payload={
-                    "content": topic,
+        for page_num, page_content in enumerate(chain([first_page], pages), 1):
+            yield {
+                "id": make_point_id(topic, 2, page_num, page_content),
+                "text": page_content,
+                "payload": {
+                    "content": page_content,
                     "topic": topic,
-                    "level": 1
+                    "level": 2,
+                    "page_num": page_num
                 }
-            )
-            self.client.upsert(collection_name=COLLECTION_NAME, points=[topic_point])
-            log_info(f"Added topic level content for: {topic}")
-
-            # Level 2: Page level
-            pages = self._split_into_pages(content)
-            for page_num, page_content in enumerate(pages, 1):
-                page_embedding = self.generate_embedding(page_content)
-                page_point = PointStruct(
-                    id=int(uuid.uuid4().hex[:8], 16),
-                    vector=page_embedding,
-                    payload={
-                        "content": page_content,
+            }
+
+            for chunk_num, chunk_content in enumerate(self._split_into_chunks(page_content)):
+                yield {
+                    "id": make_point_id(topic, 3, page_num, chunk_num, chunk_content),
+                    "text": chunk_content,
+                    "payload": {
+                        "content": chunk_content,
                         "topic": topic,
-                        "level": 2,
-                        "page_num": page_num
+                        "level": 3,
+                        # Neighbours are found by position and hydrated at query time
+                        "page_num": page_num,
+                        "chunk_num": chunk_num
                     }
-                )
-                self.client.upsert(collection_name=COLLECTION_NAME, points=[page_point])
-                log_info(f"Added page {page_num} for topic: {topic}")
-
-                # Level 3: Chunk level
-                chunks = self._split_into_chunks(page_content)
-                for chunk_num, chunk_content in enumerate(chunks):
-                    chunk_embedding = self.generate_embedding(chunk_content)
-                    context = self._get_sibling_chunks(chunks, chunk_num)
-                    
-                    chunk_point = PointStruct(
-                        id=int(uuid.uuid4().hex[:8], 16),
-                        vector=chunk_embedding,
-                        payload={
-                            "content": chunk_content,
-                            "topic": topic,
-                            "level": 3,
-                            "page_num": page_num,
-                            "chunk_num": chunk_num,
-                            "context": context
-                        }
-                    )
-                    self.client.upsert(collection_name=COLLECTION_NAME, points=[chunk_point])
-                    log_info(f"Added chunk {chunk_num} of page {page_num} for topic: {topic}")
-                    
+                }
+
+    async def add_medical_content(self, content: Union[str, Iterable[str]], topic: str):
+        """Add medical content with hierarchical structure; content may be a
+        single string or an iterable of page texts"""
+        try:
+            page_texts = [content] if isinstance(content, str) else content
+            added = 0
+            for records in batched(self._iter_content_records(page_texts, topic), UPSERT_BATCH_SIZE):
+                await self._embed_and_upsert(records)
+                added += len(records)
+            log_info(f"Added {added} points for topic: {topic}")
         except Exception as e:
             log_error(f"Error adding content for topic {topic}: {e}")
             raise e
 
-    def search_content(self, query: str, topic: str = None, chunk_limit: int = None) -> List[Dict]:
-        """Search content with optional topic filter"""
-        try:
-            query_vector = self.generate_embedding(query)
-            
-            # Prepare filter conditions
-            filter_conditions = []
-            if topic:
-                filter_conditions.append(
-                    FieldCondition(key="topic", match=MatchValue(value=topic))
-                )
-            # Always get chunk-level content (level 3)
-            filter_conditions.append(
-                FieldCondition(key="level", match=MatchValue(value=3))
-            )
-            
-            results = self.client.search(
-                collection_name=COLLECTION_NAME,
-                query_vector=query_vector,
-                limit=chunk_limit,
-                query_filter=Filter(must=filter_conditions) if filter_conditions else None
-            )
-
-            return [{
-                "content": hit.payload["content"],
-                "topic": hit.payload["topic"],
-                "context": hit.payload["context"],
-                "score": hit.score,
-                "page_num": hit.payload["page_num"],
-                "chunk_num": hit.payload["chunk_num"]
-            } for hit in results]
-            
-        except Exception as e:
-            log_error(f"Error searching content: {e}")
+    async def search_content(self, query: str, topic: str = None, chunk_limit: int = None,
+                             hybrid: bool = None, hierarchical: bool = None, adaptive: bool = None) -> List[Dict]:
+        """Search content with optional topic filter; with a sparse index, dense
+        and BM25 rankings are merged by reciprocal rank fusion"""
+        results = await self.search_many(query, topic=topic, chunk_limit=chunk_limit, types=["content"],
+                                         hybrid=hybrid, hierarchical=hierarchical, adaptive=adaptive)
+        return results["content"]
+
+    async def _search_within_pages(self, query_vector: List[float], page_hits: List[SearchHit],
+                                   limit: int) -> List[SearchHit]:
+        """Search only the chunks of the given pages, one sub-query per topic
+        since page numbers restart in every topic"""
+        pages_by_topic = {}
+        for hit in page_hits:
+            pages_by_topic.setdefault(hit.payload["topic"], []).append(hit.payload["page_num"])
+        if not pages_by_topic:
             return []
+        hits = await self.store.search_batch([
+            SearchQuery(query_vector, {"level": 3, "topic": topic, "page_num": page_nums}, limit)
+            for topic, page_nums in pages_by_topic.items()
+        ])
+        return sorted(chain.from_iterable(hits), key=lambda hit: hit.score, reverse=True)[:limit]
+
+    async def _fuse_content(self, query: str, topic: str, dense_hits: List[SearchHit], limit: int) -> List[Dict]:
+        """Merge dense hits with the BM25 ranking, fetching payloads for chunks only BM25 found"""
+        sparse_hits = self.sparse_index.search(query, topic=topic, limit=max(limit, HYBRID_CANDIDATES))
+        fused = reciprocal_rank_fusion([
+            [hit.id for hit in dense_hits],
+            [point_id for point_id, _ in sparse_hits]
+        ])[:limit]
+
+        payloads = {hit.id: hit.payload for hit in dense_hits}
+        missing = [point_id for point_id, _ in fused if point_id not in payloads]
+        if missing:
+            payloads.update(await self.store.retrieve(missing))
+        # Scale so a chunk ranked first by both searches scores 1.0
+        best = 2.0 / (RRF_K + 1)
+        return [
+            self._content_result(point_id, payloads[point_id], score / best)
+            for point_id, score in fused
+            if point_id in payloads
+        ]
+
+    def _content_result(self, point_id: str, payload: Dict[str, Any], score: float) -> Dict:
+        return {
+            "id": point_id,
+            "content": payload["content"],
+            "topic": payload["topic"],
+            # Points ingested before neighbour references still carry their sibling text
+            "context": payload.get("context"),
+            "score": score,
+            "page_num": payload["page_num"],
+            "chunk_num": payload["chunk_num"]
+        }
+
+    async def hydrate_neighbours(self, results: List[Dict]) -> List[Dict]:
+        """Fill each hit's "context" with the chunks before and after it on its
+        page. Neighbours are looked up by (topic, page_num, chunk_num) rather
+        than point ID, so they survive re-ingesting an edited neighbour; all
+        missing ones are fetched in one filtered scroll"""
+        known = {(result["topic"], result["page_num"], result["chunk_num"]): result["content"] for result in results}
+        wanted = set()
+        for result in results:
+            if result.get("context") is None:
+                for offset in (-1, 1):
+                    position = (result["topic"], result["page_num"], result["chunk_num"] + offset)
+                    if position[2] >= 0 and position not in known:
+                        wanted.add(position)
+
+        if wanted:
+            # Matches the cross product of the wanted values, keep only the exact positions
+            conditions = {
+                "level": 3,
+                "topic": sorted({topic for topic, _, _ in wanted}),
+                "page_num": sorted({page_num for _, page_num, _ in wanted}),
+                "chunk_num": sorted({chunk_num for _, _, chunk_num in wanted})
+            }
+            try:
+                async for batch in self.store.scroll(conditions):
+                    for point in batch:
+                        position = (point.payload["topic"], point.payload["page_num"], point.payload["chunk_num"])
+                        if position in wanted:
+                            known[position] = point.payload["content"]
+            except Exception as e:
+                log_error(f"Error retrieving neighbour chunks: {e}")
+
+        for result in results:
+            if result.get("context") is None:
+                topic, page_num, chunk_num = result["topic"], result["page_num"], result["chunk_num"]
+                result["context"] = {
+                    "previous_chunk": known.get((topic, page_num, chunk_num - 1), ""),
+                    "current_chunk": result["content"],
+                    "next_chunk": known.get((topic, page_num, chunk_num + 1), "")
+                }
+        return results
+
+    def _build_diagram_record(self, image_path: str, description: str, topic: str, diagram_type: str) -> Dict[str, Any]:
+        return {
+            "id": make_point_id("diagram", topic, image_path, description),
+            "text": description,
+            "payload": {
+                "image_path": image_path,
+                "description": description,
+                "topic": topic,
+                "diagram_type": diagram_type,
+                "content_type": "diagram"  # Add this to identify diagrams
+            }
+        }
+
     async def add_diagram(self, image_path: str, description: str, topic: str, diagram_type: str):
         """Add diagram with description to vector DB"""
         try:
-            embedding = self.generate_embedding(description)
-            
-            point = PointStruct(
-                id=int(uuid.uuid4().hex[:8], 16),
-                vector=embedding,
-                payload={
-                    "image_path": image_path,
-                    "description": description,
-                    "topic": topic,
-                    "diagram_type": diagram_type,
-                    "content_type": "diagram"  # Add this to identify diagrams
-                }
-            )
-            
-            self.client.upsert(
-                collection_name=COLLECTION_NAME,  
-                points=[point]
-            )
-            
+            record = self._build_diagram_record(image_path, description, topic, diagram_type)
+            await self._embed_and_upsert([record])
             log_info(f"Added diagram for topic: {topic}")
             
         except Exception as e:
@@ -204,62 +419,37 @@ class VectorDBManager:
 
     async def search_diagrams(self, query: str, topic: str = None, limit: int = 1) -> List[Dict]:
         """Search for relevant diagrams"""
-        try:
-            query_vector = self.generate_embedding(query)
-            
-            # Build filter conditions
-            filter_conditions = [
-                FieldCondition(key="content_type", match=MatchValue(value="diagram"))  # Matches your DB field name
-            ]
-            if topic:
-                filter_conditions.append(
-                    FieldCondition(key="topic", match=MatchValue(value=topic))
-                )
-            
-            results = self.client.search(
-                collection_name=COLLECTION_NAME,
-                query_vector=query_vector,
-                limit=limit,
-                query_filter=Filter(must=filter_conditions) if filter_conditions else None
-            )
-            print(f"Results: {results}")
-            
-            return [{
-                "image_path": hit.payload.get("image_path"),
-                "description": hit.payload.get("description"),
-                "topic": hit.payload.get("topic"),
-                "diagram_type": hit.payload.get("diagram_type"),  # Keep as type in return for frontend
-                "score": hit.score
-            } for hit in results]
-            
-        except Exception as e:
-            log_error(f"Error searching diagrams: {e}")
-            return []
+        results = await self.search_many(query, topic=topic, diagram_limit=limit, types=["diagrams"])
+        return results["diagrams"]
+
+    def _diagram_result(self, hit: SearchHit) -> Dict:
+        return {
+            "image_path": hit.payload.get("image_path"),
+            "description": hit.payload.get("description"),
+            "topic": hit.payload.get("topic"),
+            "diagram_type": hit.payload.get("diagram_type"),  # Keep as type in return for frontend
+            "score": hit.score
+        }
+
+    def _build_video_record(self, url: str, description: str, topic: str, language: str) -> Dict[str, Any]:
+        return {
+            "id": make_point_id("video", topic, language, url, description),
+            # Create embedding from description and topic
+            "text": f"{description} {topic} video {language}",
+            "payload": {
+                "url": url,
+                "description": description,
+                "topic": topic,
+                "language": language,
+                "content_type": "video"
+            }
+        }
 
     async def add_video(self, url: str, description: str, topic: str, language: str):
         """Add video with description to vector DB"""
         try:
-            # Create embedding from description and topic
-            embed_text = f"{description} {topic} video {language}"
-            embedding = self.generate_embedding(embed_text)
-            
-            point = PointStruct(
-                id=int(uuid.uuid4().hex[:8], 16),
-                vector=embedding,
-                payload={
-                    "url": url,
-                    "description": description,
-                    "topic": topic,
-                    "language": language,
-                    "content_type": "video"
-                }
-            )
-            
-            self.client.upsert(
-                collection_name=COLLECTION_NAME,
-                points=[point]
-            )
-            
+            record = self._build_video_record(url, description, topic, language)
+            await self._embed_and_upsert([record])
             log_info(f"Added {language} video for topic: {topic}")
             
         except Exception as e:
@@ -268,39 +458,98 @@ class VectorDBManager:
 
     async def search_videos(self, query: str, topic: str = None, language: str = None) -> List[Dict]:
         """Search for relevant videos"""
+        results = await self.search_many(query, topic=topic, language=language, types=["videos"])
+        return results["videos"]
+
+    def _video_result(self, hit: SearchHit) -> Dict:
+        return {
+            "url": hit.payload.get("url"),
+            "description": hit.payload.get("description"),
+            "topic": hit.payload.get("topic"),
+            "language": hit.payload.get("language"),
+            "relevance_score": hit.score
+        }
+
+    async def search_many(self, query: str, topic: str = None, language: str = None,
+                          chunk_limit: int = 3, diagram_limit: int = 1, video_limit: int = 2,
+                          types: Iterable[str] = SEARCH_TYPES, hybrid: bool = None,
+                          hierarchical: bool = None, adaptive: bool = None,
+                          queries: Dict[str, str] = None) -> Dict[str, List[Dict]]:
+        """
+        Embed the query once and run the content, diagram and video searches
+        in a single batched round trip. Returns {"content", "diagrams",
+        "videos"} lists (empty for types not requested); `language` only
+        applies to videos. `queries` gives some types their own query text;
+        the distinct texts are still embedded in one request.
+
+        In hierarchical mode that round trip finds the best pages instead of
+        chunks, and a second one searches only those pages' chunks, so the
+        cost follows the number of pages rather than the number of chunks.
+
+        In adaptive mode content is over-fetched and cut where the dense scores
+        fall off (also when hybrid, as fused scores only reflect rank), so
+        chunk_limit becomes an upper bound rather than a fixed count.
+        """
+        results = {search_type: [] for search_type in SEARCH_TYPES}
         try:
-            query_vector = self.generate_embedding(query)
-            
-            filter_conditions = [
-                FieldCondition(key="content_type", match=MatchValue(value="video"))
-            ]
-            
-            if topic:
-                filter_conditions.append(
-                    FieldCondition(key="topic", match=MatchValue(value=topic))
-                )
-            
-            if language:
-                filter_conditions.append(
-                    FieldCondition(key="language", match=MatchValue(value=language))
-                )
-            
-            results = self.client.search(
-                collection_name=COLLECTION_NAME,
-                query_vector=query_vector,
-                limit=2,  # Get more to have both languages if available
-                query_filter=Filter(must=filter_conditions)
-            )
-            print(f"Results: {results}")
-            
-            return [{
-                "url": hit.payload.get("url"),
-                "description": hit.payload.get("description"),
-                "topic": hit.payload.get("topic"),
-                "language": hit.payload.get("language"),
-                "relevance_score": hit.score
-            } for hit in results]
-            
+            types = tuple(types)
+            texts = {search_type: (queries or {}).get(search_type, query) for search_type in types}
+            distinct = list(dict.fromkeys(texts.values()))
+            vectors = dict(zip(distinct, await self.generate_embeddings(distinct)))
+            if hybrid is not False:
+                await self.refresh_sparse_index()
+            if hybrid is None:
+                hybrid = self.sparse_index is not None and len(self.sparse_index) > 0
+            if hierarchical is None:
+                hierarchical = HIERARCHICAL_SEARCH
+            if adaptive is None:
+                adaptive = ADAPTIVE_TOP_K
+
+            requests = {}
+            if "content" in types:
+                # Always get chunk-level content (level 3)
+                conditions = {"level": 3}
+                if topic:
+                    conditions["topic"] = topic
+                chunk_limit = chunk_limit or 10
+                fetch = chunk_limit * ADAPTIVE_OVERFETCH if adaptive else chunk_limit
+                limit = max(fetch, HYBRID_CANDIDATES) if hybrid else fetch
+                if hierarchical:
+                    requests["pages"] = SearchQuery(vectors[texts["content"]], {**conditions, "level": 2}, HIERARCHICAL_PAGES)
+                else:
+                    requests["content"] = SearchQuery(vectors[texts["content"]], conditions, limit)
+            if "diagrams" in types:
+                conditions = {"content_type": "diagram"}  # Matches your DB field name
+                if topic:
+                    conditions["topic"] = topic
+                requests["diagrams"] = SearchQuery(vectors[texts["diagrams"]], conditions, diagram_limit)
+            if "videos" in types:
+                conditions = {"content_type": "video"}
+                if topic:
+                    conditions["topic"] = topic
+                if language:
+                    conditions["language"] = language
+                # Get more to have both languages if available
+                requests["videos"] = SearchQuery(vectors[texts["videos"]], conditions, video_limit)
+
+            hits = dict(zip(requests, await self.store.search_batch(list(requests.values()))))
+            if "pages" in hits:
+                hits["content"] = await self._search_within_pages(vectors[texts["content"]], hits.pop("pages"), limit)
+
+            if "content" in hits:
+                k = chunk_limit
+                if adaptive:
+                    # Fused scores depend only on rank, so the cutoff reads the dense cosine scores
+                    scores = [hit.score for hit in hits["content"][:fetch]]
+                    k, reason = adaptive_cutoff(scores, max_k=chunk_limit)
+                    log_info(f"Adaptive top-k kept {k} of {len(scores)} ({reason}); scores {[round(score, 3) for score in scores]}")
+                if hybrid:
+                    results["content"] = await self._fuse_content(texts["content"], topic, hits["content"], fetch)
+                else:
+                    results["content"] = [self._content_result(hit.id, hit.payload, hit.score) for hit in hits["content"]]
+                results["content"] = results["content"][:k]
+            results["diagrams"] = [self._diagram_result(hit) for hit in hits.get("diagrams", [])]
+            results["videos"] = [self._video_result(hit) for hit in hits.get("videos", [])]
         except Exception as e:
-            log_error(f"Error searching videos: {e}")
-            return []
\ No newline at end of file
+            log_error(f"Error searching {', '.join(types)}: {e}")
+        return results